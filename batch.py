@@ -0,0 +1,131 @@
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Callable, Iterable, TextIO
+from dotenv import load_dotenv
+
+from studio.factory import build_studio
+from llm.metrics import export_metrics_from_env
+from studio.studio import Studio
+from logger.logger import Logger
+from pen.pen import pen
+
+
+MODEL_OVERRIDES = ("writer_llm", "editor_llm", "marketer_llm")
+
+
+def read_jobs(lines: Iterable[str], default_language: str) -> list[dict]:
+    """Parses one job per non-blank line: {"id", "topic", "language", "writer_llm", "editor_llm", "marketer_llm"}.
+
+    Only the topic is required; `title` is accepted in its place and `request_id` in place of `id`.
+    A line that is not a JSON object becomes a job carrying the `error`, which fails without stopping the others.
+    """
+    jobs = []
+    for line_number, line in enumerate(lines, start=1):
+        if line.strip() == "":
+            continue
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as error:
+            jobs.append(parse_job({}, str(line_number), default_language) | {"error": f"Line {line_number} is not a valid job: {error}"})
+            continue
+        jobs.append(parse_job(job, str(line_number), default_language))
+    return jobs
+
+
+def parse_job(job: dict, default_id: str, default_language: str) -> dict:
+    return {
+        "id": job.get("id", job.get("request_id", default_id)),
+        "topic": job.get("topic", job.get("title")),
+        "language": job.get("language", default_language),
+        **{override: job.get(override) for override in MODEL_OVERRIDES},
+    }
+
+
+class BatchWorker:
+    """Runs jobs one after another, building a studio once per model combination and reusing it."""
+
+    def __init__(self, build: Callable[..., Studio] = build_studio, log_level: str = "INFO"):
+        self.build = build
+        self.log_level = log_level
+        self.studios = {}
+
+    def studio_for(self, job: dict) -> Studio:
+        models = tuple(job[override] for override in MODEL_OVERRIDES)
+        studio = self.studios.get(models)
+        if studio is None:
+            studio = self.build(*models, log_level=self.log_level)
+            self.studios[models] = studio
+        else:
+            studio.clear_history()
+        return studio
+
+    def run(self, job: dict) -> dict:
+        start_time = time.time()
+        record = {"id": job["id"], "topic": job["topic"], "language": job["language"]}
+        try:
+            if job.get("error"):
+                raise ValueError(job["error"])
+            if not job["topic"]:
+                raise ValueError("Job has no topic")
+            entry = self.studio_for(job).create_entry(job["topic"], job["language"])
+            record["status"] = "ok" if entry is not None else "rejected"
+            record["entry"] = entry
+        except Exception as error:
+            record["status"] = "failed"
+            record["error"] = str(error)
+        record["elapsed_seconds"] = round(time.time() - start_time, 3)
+        return record
+
+
+def run_batch(jobs: list[dict], output: TextIO, workers: int = 4, build: Callable[..., Studio] = build_studio, log_level: str = "INFO") -> dict[str, int]:
+    """Runs jobs on `workers` threads, writing one JSON line per finished job, and returns counts per status."""
+    pending = queue.Queue()
+    for job in jobs:
+        pending.put(job)
+    output_lock = threading.Lock()
+    counts = {"ok": 0, "rejected": 0, "failed": 0}
+
+    def work():
+        worker = BatchWorker(build, log_level)
+        while True:
+            try:
+                job = pending.get_nowait()
+            except queue.Empty:
+                return
+            record = worker.run(job)
+            with output_lock:
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                output.flush()
+                counts[record["status"]] += 1
+
+    threads = [threading.Thread(target=work, name=f"batch-worker-{index}") for index in range(max(1, min(workers, len(jobs))))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts
+
+
+load_dotenv()
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python batch.py <jobs.jsonl> <results.jsonl>")
+        sys.exit(2)
+    log_level = os.getenv("LOG_LEVEL", "INFO")
+    export_metrics_from_env()
+    logger = Logger("batch", pen.gray_bright, log_level)
+
+    with open(sys.argv[1], encoding="utf-8") as jobs_file:
+        jobs = read_jobs(jobs_file, os.getenv("BATCH_LANGUAGE", "Thai"))
+    start_time = time.time()
+    with open(sys.argv[2], "a", encoding="utf-8") as results_file:
+        counts = run_batch(jobs, results_file, workers=int(os.getenv("BATCH_WORKERS", "4")), log_level=log_level)
+    logger.log(f"{len(jobs)} jobs: {counts['ok']} ok, {counts['rejected']} rejected, {counts['failed']} failed")
+    logger.log_time_taken(time.time() - start_time)
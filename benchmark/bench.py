@@ -0,0 +1,136 @@
+import argparse
+import json
+import math
+import os
+import time
+
+from llm.metrics import get_registry
+from logger.logger import set_sink
+from logger.sink import Sink
+from studio.factory import build_studio
+from studio.scheduler import Scheduler
+from studio.steps import Steps
+from .mock_server import Latency, MockLLMServer
+
+
+ROLES = ("writer", "editor", "marketer")
+PROVIDER_MODELS = {"ollama": "ollama://mock-model", "openai": "openai://gpt-mock", "gemini": "google://gemini-mock"}
+
+
+class DiscardSink(Sink):
+    def emit(self, record):
+        pass
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def point_at(server: MockLLMServer):
+    """Points every provider at the mock server and disables state that would skew timings."""
+    os.environ["OLLAMA_API_BASE_URL"] = server.url
+    os.environ["OPENAI_API_BASE_URL"] = f"{server.url}/v1"
+    os.environ["GEMINI_API_BASE_URL"] = f"{server.url}/v1beta"
+    os.environ.setdefault("OPENAI_API_KEY", "mock-key")
+    os.environ.setdefault("GEMINI_API_KEY", "mock-key")
+    os.environ["LLM_CACHE_PATH"] = ""
+    os.environ["STUDIO_CHECKPOINT_PATH"] = ""
+    os.environ["OLLAMA_PRELOAD"] = "false"
+
+
+def request_seconds_by_role(provider: str) -> dict[str, float]:
+    registry = get_registry()
+    totals = dict.fromkeys(ROLES, 0.0)
+    with registry.lock:
+        for (name, (call_provider, _, role)), histogram in registry.histograms.items():
+            if name == "blogger_llm_request_seconds" and call_provider == provider and role in totals:
+                totals[role] += histogram.sum
+    return totals
+
+
+def timed(steps: Steps, durations: list[float]) -> Steps:
+    start_time = time.perf_counter()
+    try:
+        return (yield from steps)
+    finally:
+        durations.append(time.perf_counter() - start_time)
+
+
+def run_level(provider: str, articles: int, concurrency: int, language: str = "English") -> dict:
+    """Creates `articles` entries at the given concurrency and summarises throughput, latency and where the time went."""
+    model = PROVIDER_MODELS[provider]
+    studio = build_studio(model, model, model)
+    metrics_provider = studio.writer.llm.provider_name
+    requests_before = request_seconds_by_role(metrics_provider)
+    durations = []
+    start_time = time.perf_counter()
+    scheduler = Scheduler(concurrency)
+    for index in range(articles):
+        scheduler.add(timed(studio.clone().create_entry_steps(f"Topic {index}", language), durations))
+    entries = [None if isinstance(result, Exception) else result for result in scheduler.run()]
+    wall_seconds = time.perf_counter() - start_time
+    requests_after = request_seconds_by_role(metrics_provider)
+
+    completed = sum(entry is not None for entry in entries)
+    stage_seconds = {role: (requests_after[role] - requests_before[role]) / max(1, articles) for role in ROLES}
+    mean_latency = sum(durations) / max(1, len(durations))
+    return {
+        "provider": provider,
+        "concurrency": concurrency,
+        "articles": articles,
+        "completed": completed,
+        "wall_seconds": round(wall_seconds, 3),
+        "articles_per_minute": round(completed / wall_seconds * 60, 2) if wall_seconds > 0 else 0.0,
+        "p50_seconds": round(percentile(durations, 0.5), 3),
+        "p95_seconds": round(percentile(durations, 0.95), 3),
+        "stage_seconds": {role: round(seconds, 3) for role, seconds in stage_seconds.items()},
+        # Pipeline time not spent waiting on a request: parsing, scheduling, logging
+        "overhead_seconds": round(max(0.0, mean_latency - sum(stage_seconds.values())), 3),
+    }
+
+
+def format_report(reports: list[dict]) -> str:
+    header = f"{'concurrency':>11} {'done':>6} {'art/min':>8} {'p50 s':>7} {'p95 s':>7} " + " ".join(f"{role + ' s':>10}" for role in ROLES) + f" {'overhead s':>10}"
+    lines = [header]
+    for report in reports:
+        lines.append(
+            f"{report['concurrency']:>11} {report['completed']:>3}/{report['articles']:<2} {report['articles_per_minute']:>8} "
+            f"{report['p50_seconds']:>7} {report['p95_seconds']:>7} "
+            + " ".join(f"{report['stage_seconds'][role]:>10}" for role in ROLES)
+            + f" {report['overhead_seconds']:>10}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="python -m benchmark", description="Measures Studio throughput against a local mock LLM server.")
+    parser.add_argument("--provider", choices=sorted(PROVIDER_MODELS), default="ollama")
+    parser.add_argument("--articles", type=int, default=16)
+    parser.add_argument("--concurrency", default="1,2,4,8", help="comma-separated concurrency levels")
+    parser.add_argument("--latency", default="lognormal:0.2:0.5", help="fixed:S, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="print one JSON report per line instead of a table")
+    args = parser.parse_args(argv)
+
+    server = MockLLMServer(
+        latency=Latency(args.latency),
+        error_rate=args.error_rate,
+        seed=args.seed
+    )
+    with server:
+        point_at(server)
+        set_sink(DiscardSink())
+        try:
+            reports = [run_level(args.provider, args.articles, int(level)) for level in args.concurrency.split(",")]
+        finally:
+            set_sink(None)
+    if args.json:
+        for report in reports:
+            print(json.dumps(report))
+    else:
+        print(format_report(reports))
@@ -0,0 +1,291 @@
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+
+ARTICLE_REPLY = """START OF ARTICLE
+# Rubber Duck Debugging, Reimagined
+Explaining a bug out loud to a rubber duck forces you to slow down and state your assumptions.
+## Why it works
+Most bugs hide in the gap between what the code does and what you believe it does.
+## Try it today
+Keep a duck on your desk and talk it through your next failing test.
+START OF METADATA
+words: 52"""
+
+OUTLINE_REPLY = """START OF OUTLINE
+# Rubber Duck Debugging, Reimagined
+PRIMARY KEYWORD: rubber duck debugging
+## Why it works
+- the gap between what code does and what you believe
+## Try it today
+- a duck on your desk"""
+
+SECTION_REPLY = """START OF SECTION
+Explaining a bug out loud forces you to slow down and state your assumptions."""
+
+NO_EDITS_REPLY = """START OF EDITS
+NO EDITS"""
+
+EDITS_REPLY = """START OF EDITS
+<<<<<<< SEARCH
+Keep a duck on your desk and talk it through your next failing test.
+=======
+Keep a rubber duck on your desk and talk it through your next failing test, line by line.
+>>>>>>> REPLACE"""
+
+METADATA_REPLY = """{"title": "Rubber Duck Debugging, Reimagined", "slug": "rubber-duck-debugging-reimagined", "description": "Why explaining code out loud finds bugs.", "tags": ["debugging", "productivity"]}"""
+
+
+def feedback_reply(average_score: float) -> str:
+    flawless = average_score >= 5.0
+    return f"""START OF FEEDBACK JSON
+{{"flawless": {json.dumps(flawless)}, "average_score": {average_score}}}
+START OF OVERALL SCORE
+Proofreading: {average_score}
+Structure: {average_score}
+START OF SUGGESTED FEEDBACK
+- Add a concrete example.
+- Tighten the introduction."""
+
+
+class Latency:
+    """A latency distribution: fixed:S, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA, in seconds."""
+
+    def __init__(self, spec: str = "fixed:0"):
+        kind, *args = spec.split(":")
+        if kind not in ("fixed", "uniform", "lognormal") or len(args) != {"fixed": 1, "uniform": 2, "lognormal": 2}[kind]:
+            raise ValueError(f"Unsupported latency distribution: {spec}")
+        self.spec = spec
+        self.kind = kind
+        self.args = [float(arg) for arg in args]
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.args[0]
+        if self.kind == "uniform":
+            return rng.uniform(*self.args)
+        median, sigma = self.args
+        return rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+
+
+class MockLLMServer:
+    """Local stand-in for the Ollama, OpenAI and Gemini chat APIs, answering with canned studio replies.
+
+    Writer prompts get an article, or the outline, sections or edits they ask for. Editor prompts get
+    feedback whose score rises by `score_step` with every review in the conversation
+    (flawless at 5), and anything else gets metadata.
+    Each request waits a sampled `latency`; streamed replies are split into `stream_chunks`
+    pieces spread over `stream_duration`. A fraction `error_rate` of requests fails with
+    `error_status`. The first Ollama request for a model also waits `load_seconds`, as loading it
+    would, and an Ollama chat without messages only loads the model.
+    """
+
+    def __init__(
+        self,
+        latency: Latency | None = None,
+        stream_chunks: int = 8,
+        stream_duration: Latency | None = None,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        initial_score: float = 4.0,
+        score_step: float = 0.5,
+        seed: int | None = None,
+        port: int = 0,
+        load_seconds: float = 0.0
+    ):
+        self.latency = latency or Latency()
+        self.stream_chunks = max(1, stream_chunks)
+        self.stream_duration = stream_duration or Latency()
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.initial_score = initial_score
+        self.score_step = score_step
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.requests = 0
+        self.load_seconds = load_seconds
+        # Model name to the keep_alive of its latest Ollama request
+        self.loaded_models = {}
+        self.load_lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self.handler_class())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self) -> "MockLLMServer":
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), name="mock-llm-server", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def sample(self, latency: Latency) -> float:
+        with self.rng_lock:
+            return latency.sample(self.rng)
+
+    def should_fail(self) -> bool:
+        with self.rng_lock:
+            self.requests += 1
+            return self.rng.random() < self.error_rate
+
+    def load(self, payload: dict) -> float:
+        """Marks the payload's model loaded and returns how long loading it takes."""
+        with self.load_lock:
+            first_load = payload.get("model") not in self.loaded_models
+            self.loaded_models[payload.get("model")] = payload.get("keep_alive")
+        load_seconds = self.load_seconds if first_load else 0.0
+        time.sleep(load_seconds)
+        return load_seconds
+
+    def reply_for(self, prompts: list[str]) -> str:
+        """Picks the canned reply for a conversation given its user prompts, oldest first."""
+        latest = prompts[-1] if prompts else ""
+        if latest.startswith("Generate a metadata"):
+            return METADATA_REPLY
+        if "START OF OUTLINE" in latest:
+            return OUTLINE_REPLY
+        if "START OF SECTION" in latest:
+            return SECTION_REPLY
+        if "assembled from sections" in latest:
+            return NO_EDITS_REPLY
+        if "START OF EDITS" in latest:
+            return EDITS_REPLY
+        if "START OF CONTENT DRAFT" in latest:
+            reviews = sum("START OF CONTENT DRAFT" in prompt for prompt in prompts)
+            return feedback_reply(min(5.0, self.initial_score + self.score_step * (reviews - 1)))
+        if "Write a blog entry" in latest or "Revise the content draft" in latest:
+            return ARTICLE_REPLY
+        return METADATA_REPLY
+
+    def handler_class(self) -> type:
+        mock = self
+
+        class MockHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", "0"))) or b"{}")
+                path = urlsplit(self.path).path
+                if path.endswith("/cachedContents"):
+                    self.send_json(200, {"name": "cachedContents/mock", "model": payload.get("model", "")})
+                    return
+                load_seconds = None
+                if path == "/api/chat":
+                    api, prompts, stream = "ollama", [m["content"] for m in payload.get("messages", []) if m.get("role") == "user"], payload.get("stream", False)
+                    load_seconds = mock.load(payload) if "model" in payload else None
+                    if load_seconds is not None and not payload.get("messages"):
+                        self.send_json(200, {"model": payload.get("model"), "message": {"role": "assistant", "content": ""}, "done_reason": "load", "done": True})
+                        return
+                elif path.endswith("/chat/completions"):
+                    api, prompts, stream = "openai", [m["content"] for m in payload.get("messages", []) if m.get("role") == "user"], payload.get("stream", False)
+                elif re.search(r":(stream)?[Gg]enerateContent$", path):
+                    prompts = ["".join(part.get("text", "") for part in content.get("parts", [])) for content in payload.get("contents", []) if content.get("role") == "user"]
+                    api, stream = "gemini", path.endswith(":streamGenerateContent")
+                else:
+                    self.send_json(404, {"error": {"message": f"unknown path {path}"}})
+                    return
+
+                time.sleep(mock.sample(mock.latency))
+                if mock.should_fail():
+                    self.send_json(mock.error_status, {"error": {"message": "mock failure"}}, {"Retry-After": "0"})
+                    return
+                reply = mock.reply_for(prompts)
+                usage = (sum(len(prompt) for prompt in prompts) // 4 + 1, len(reply) // 4 + 1)
+                if stream:
+                    # Like OpenAI, only report usage on a stream when asked to
+                    if api == "openai" and not payload.get("stream_options", {}).get("include_usage"):
+                        usage = None
+                    self.send_stream(api, reply, usage)
+                else:
+                    body = self.response_body(api, reply, usage)
+                    if load_seconds is not None:
+                        body["load_duration"] = int(load_seconds * 1e9)
+                    self.send_json(200, body)
+
+            def response_body(self, api: str, reply: str, usage: tuple) -> dict:
+                if api == "ollama":
+                    return {"message": {"role": "assistant", "content": reply}, "done": True, "prompt_eval_count": usage[0], "eval_count": usage[1]}
+                if api == "openai":
+                    return {
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                        "usage": {"prompt_tokens": usage[0], "completion_tokens": usage[1]}
+                    }
+                return {
+                    "candidates": [{"content": {"role": "model", "parts": [{"text": reply}]}}],
+                    "usageMetadata": {"promptTokenCount": usage[0], "candidatesTokenCount": usage[1]}
+                }
+
+            def stream_event(self, api: str, piece: str, usage: tuple | None) -> bytes:
+                if api == "ollama":
+                    event = {"message": {"role": "assistant", "content": piece}, "done": usage is not None}
+                    if usage is not None:
+                        event |= {"prompt_eval_count": usage[0], "eval_count": usage[1]}
+                    return json.dumps(event).encode("utf-8") + b"\n"
+                if api == "openai":
+                    # OpenAI reports usage in a chunk of its own, after the content
+                    event = {"choices": [{"index": 0, "delta": {"content": piece}}]} if usage is None else {"choices": [], "usage": {"prompt_tokens": usage[0], "completion_tokens": usage[1]}}
+                else:
+                    event = {"candidates": [{"content": {"role": "model", "parts": [{"text": piece}]}}]}
+                    if usage is not None:
+                        event["usageMetadata"] = {"promptTokenCount": usage[0], "candidatesTokenCount": usage[1]}
+                return b"data: " + json.dumps(event).encode("utf-8") + b"\n\n"
+
+            def send_stream(self, api: str, reply: str, usage: tuple | None):
+                chunk_size = max(1, math.ceil(len(reply) / mock.stream_chunks))
+                pieces = [reply[index:index + chunk_size] for index in range(0, len(reply), chunk_size)]
+                delay = mock.sample(mock.stream_duration) / len(pieces)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson" if api == "ollama" else "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for index, piece in enumerate(pieces):
+                        self.write_chunk(self.stream_event(api, piece, usage if index == len(pieces) - 1 and api != "openai" else None))
+                        time.sleep(delay)
+                    if api == "openai":
+                        if usage is not None:
+                            self.write_chunk(self.stream_event(api, "", usage))
+                        self.write_chunk(b"data: [DONE]\n\n")
+                    self.write_chunk(b"")
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client stopped reading, e.g. once the section it wanted was complete
+                    self.close_connection = True
+
+            def write_chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def send_json(self, status: int, body: dict, headers: dict | None = None):
+                encoded = json.dumps(body).encode("utf-8")
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(encoded)))
+                    for name, value in (headers or {}).items():
+                        self.send_header(name, value)
+                    self.end_headers()
+                    self.wfile.write(encoded)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        return MockHandler
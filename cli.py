@@ -1,44 +1,44 @@
 import os
+import sys
 from dotenv import load_dotenv
 
-from profiles.profiles import profiles
 from publisher.screen import ScreenPublisher
-from studio.editor_agent import EditorAgent
-from studio.marketer_agent import MarketerAgent
-from studio.writer_agent import WriterAgent
 # from publisher.markdown import MarkdownPublisher
-from studio.studio import Studio
-from llm.factory import use_model
+from studio.factory import build_studio
+from llm.cache import cache_from_env
+from llm.metrics import export_metrics_from_env
+from logger.logger import Logger
+from pen.pen import pen
 
 
 load_dotenv()
 
 if __name__ == "__main__":
     log_level = os.getenv("LOG_LEVEL", "INFO")
+    export_metrics_from_env()
     
-    blog_topic = "Next generation of rubber duck debugging"
+    if sys.argv[1:2] == ["--resume"] and len(sys.argv) != 3:
+        print("usage: python cli.py --resume <run id>")
+        sys.exit(2)
+    resume_run_id = sys.argv[2] if sys.argv[1:2] == ["--resume"] else None
+    blog_topics = sys.argv[1:] or ["Next generation of rubber duck debugging"]
     blog_language = "Thai"
+    concurrency = int(os.getenv("STUDIO_CONCURRENCY", "4"))
     
-    writer_llm = use_model(os.getenv("WRITER_LLM", "ollama://llama2:13b"))
-    writer_llm.with_instruction(profiles["alice"].instruction())
+    blog_studio = build_studio(log_level=log_level)
+    if resume_run_id is not None:
+        contents = [blog_studio.resume(resume_run_id)]
+    elif len(blog_topics) == 1:
+        contents = [blog_studio.create_entry(blog_topics[0], blog_language)]
+    else:
+        contents = blog_studio.create_entries(blog_topics, blog_language, concurrency=concurrency)
+    publisher = ScreenPublisher()
+    for content in contents:
+        if content is not None:
+            publisher.publish(content["content"], content["metadata"])
 
-    editor_llm = use_model(os.getenv("EDITOR_LLM", "ollama://llama2:13b"))
-    editor_llm.with_instruction(profiles["bob"].instruction())
-    
-    marketer_llm = use_model(os.getenv("MARKETER_LLM", "ollama://llama2:13b"))
-    marketer_llm.with_instruction(profiles["carol"].instruction())
-    
-    writer_agent = WriterAgent(writer_llm)
-    editor_agent = EditorAgent(editor_llm)
-    marketer_agent = MarketerAgent(marketer_llm)
-    
-    blog_studio = Studio(
-        writer=writer_agent,
-        editor=editor_agent,
-        marketer=marketer_agent,
-        log_level=log_level
-    )
-    content = blog_studio.create_entry(blog_topic, blog_language)
-    if content is not None:
-        publisher = ScreenPublisher()
-        publisher.publish(content["content"], content["metadata"])
+    response_cache = cache_from_env()
+    if response_cache is not None:
+        cache_stats = response_cache.stats()
+        cache_logger = Logger("cache", pen.gray_bright)
+        cache_logger.log(f"hits: {cache_stats['hits']}, misses: {cache_stats['misses']}, saved {cache_logger.format_elapsed_time(cache_stats['saved_seconds'])}")
@@ -0,0 +1,202 @@
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterable
+from dotenv import load_dotenv
+
+from batch import BatchWorker, MODEL_OVERRIDES, parse_job
+from studio.factory import build_studio
+from llm.metrics import export_metrics_from_env
+from studio.studio import Studio
+from logger.logger import Logger
+from pen.pen import pen
+
+
+class StudioDaemon:
+    """Runs article jobs on long-lived worker threads, each keeping its studios, LLM clients and connections warm.
+
+    Jobs are queued by submit() and tracked by id. Beyond `max_jobs`, finished jobs are forgotten once
+    their result was polled or `keep_seconds` after they finished. Jobs may only override the models
+    with ones in `allowed_models`, so clients cannot make the daemon build and pin arbitrary models.
+    """
+
+    def __init__(self, workers: int = 2, build: Callable[..., Studio] = build_studio, log_level: str = "INFO", default_language: str = "Thai", max_jobs: int = 1000, keep_seconds: float = 3600, allowed_models: Iterable[str] = ()):
+        self.workers = max(1, workers)
+        self.build = build
+        self.log_level = log_level
+        self.default_language = default_language
+        self.max_jobs = max_jobs
+        self.keep_seconds = keep_seconds
+        self.allowed_models = set(allowed_models)
+        self.logger = Logger("daemon", pen.gray_bright, log_level)
+        self.pending = queue.Queue()
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.threads = []
+
+    def start(self) -> "StudioDaemon":
+        for index in range(self.workers):
+            thread = threading.Thread(target=self.work, name=f"daemon-worker-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def stop(self):
+        """Lets the workers finish their current job, then stops them."""
+        for _ in self.threads:
+            self.pending.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def work(self):
+        worker = BatchWorker(self.build, self.log_level)
+        # Build the default studio up front so the first job does not pay for it; when that fails,
+        # each job tries again and reports the error as its own
+        try:
+            worker.studio_for(dict.fromkeys(MODEL_OVERRIDES))
+        except Exception as error:
+            self.logger.log(f"could not build the default studio: {pen.red(str(error))}")
+        while True:
+            job_id = self.pending.get()
+            if job_id is None:
+                return
+            with self.lock:
+                record = self.jobs.get(job_id)
+                if record is None:
+                    continue
+                record["status"] = "running"
+                record["started_at"] = time.time()
+                job = record["job"]
+            result = worker.run(job)
+            with self.lock:
+                record.update({key: value for key, value in result.items() if key != "id"})
+                record["finished_at"] = time.time()
+            self.logger.log(f"job {job_id} {result['status']} in {self.logger.format_elapsed_time(result['elapsed_seconds'])}")
+
+    def submit(self, request: dict) -> dict:
+        """Queues a job given as {"topic", "language", "writer_llm", "editor_llm", "marketer_llm"} and returns its status."""
+        job = parse_job(request, "", self.default_language)
+        if not job["topic"]:
+            raise ValueError("Job has no topic")
+        for override in MODEL_OVERRIDES:
+            if job[override] is not None and job[override] not in self.allowed_models:
+                raise ValueError(f"Model {job[override]!r} is not allowed for {override}; add it to DAEMON_MODELS")
+        job["id"] = uuid.uuid4().hex
+        with self.lock:
+            self.jobs[job["id"]] = {"id": job["id"], "status": "queued", "submitted_at": time.time(), "job": job}
+            self.forget_old_jobs()
+            status = self.public(self.jobs[job["id"]])
+        self.pending.put(job["id"])
+        return status
+
+    def forget_old_jobs(self):
+        now = time.time()
+        forgettable = [
+            job_id for job_id, record in self.jobs.items()
+            if "finished_at" in record and (record.get("polled") or now - record["finished_at"] >= self.keep_seconds)
+        ]
+        for job_id in forgettable[:max(0, len(self.jobs) - self.max_jobs)]:
+            del self.jobs[job_id]
+
+    def status(self, job_id: str) -> dict | None:
+        with self.lock:
+            record = self.jobs.get(job_id)
+            if record is None:
+                return None
+            if "finished_at" in record:
+                record["polled"] = True
+            return self.public(record)
+
+    def list_jobs(self) -> list[dict]:
+        """Job statuses without their entries, oldest first."""
+        with self.lock:
+            return [{key: value for key, value in self.public(record).items() if key != "entry"} for record in self.jobs.values()]
+
+    def public(self, record: dict) -> dict:
+        job = record["job"]
+        return {key: value for key, value in record.items() if key not in ("job", "polled")} | {"topic": job["topic"], "language": job["language"]}
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serves the job API at http://host:port from a daemon thread:
+
+        POST /jobs queues a job, GET /jobs lists them, GET /jobs/<id> returns one with its
+        entry once done, and GET /health reports the queue.
+        """
+        daemon = self
+
+        class DaemonHandler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != "/jobs":
+                    self.send_json(404, {"error": "not found"})
+                    return
+                try:
+                    request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", "0"))) or b"{}")
+                    if not isinstance(request, dict):
+                        raise ValueError("Job must be a JSON object")
+                    status = daemon.submit(request)
+                except ValueError as error:
+                    self.send_json(400, {"error": str(error)})
+                    return
+                self.send_json(202, status, {"Location": f"/jobs/{status['id']}"})
+
+            def do_GET(self):
+                if self.path == "/health":
+                    self.send_json(200, {"status": "ok", "workers": len(daemon.threads), "queued": daemon.pending.qsize()})
+                elif self.path == "/jobs":
+                    self.send_json(200, {"jobs": daemon.list_jobs()})
+                elif self.path.startswith("/jobs/"):
+                    status = daemon.status(self.path[len("/jobs/"):])
+                    if status is None:
+                        self.send_json(404, {"error": "unknown job"})
+                    else:
+                        self.send_json(200, status)
+                else:
+                    self.send_json(404, {"error": "not found"})
+
+            def send_json(self, status: int, body: dict, headers: dict | None = None):
+                encoded = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(encoded)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), DaemonHandler)
+        threading.Thread(target=server.serve_forever, name="daemon-server", daemon=True).start()
+        return server
+
+
+load_dotenv()
+
+if __name__ == "__main__":
+    log_level = os.getenv("LOG_LEVEL", "INFO")
+    export_metrics_from_env()
+    studio_daemon = StudioDaemon(
+        workers=int(os.getenv("DAEMON_WORKERS", "2")),
+        log_level=log_level,
+        default_language=os.getenv("DAEMON_LANGUAGE", "Thai"),
+        max_jobs=int(os.getenv("DAEMON_MAX_JOBS", "1000")),
+        keep_seconds=float(os.getenv("DAEMON_KEEP_SECONDS", "3600")),
+        allowed_models=filter(None, (model.strip() for model in os.getenv("DAEMON_MODELS", "").split(",")))
+    ).start()
+    host = os.getenv("DAEMON_HOST", "127.0.0.1")
+    port = int(os.getenv("DAEMON_PORT", "8750"))
+    server = studio_daemon.serve(port, host)
+    studio_daemon.logger.log(f"accepting jobs at http://{host}:{server.server_port}/jobs")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        studio_daemon.stop()
@@ -1,30 +1,77 @@
-def extract_json_objects(text) -> list[str]:
-    objs = []
-    brace_level = 0
-    start = None
+import json
+import re
+
+
+JSON_DECODER = json.JSONDecoder()
+BARE_KEY_PATTERN = re.compile(r"([{,]\s*)([A-Za-z_][A-Za-z0-9_]*)(\s*:)")
+LINE_COMMENT_PATTERN = re.compile(r"(?<![:\"])//[^\n]*")
+TRAILING_COMMA_PATTERN = re.compile(r",(\s*[}\]])")
+# The tokens object_ends() reads: quotes, braces, and escape pairs so that escaped quotes are skipped
+BRACE_TOKEN_PATTERN = re.compile(r'\\.|["{}]', re.DOTALL)
+STRICT_OPENING_PATTERN = re.compile(r'\{\s*["}]')
+
+
+def relax_json(text: str) -> str:
+    """Rewrites the JavaScript-style objects some prompts ask for (bare keys, // comments, trailing commas) as JSON."""
+    text = LINE_COMMENT_PATTERN.sub("", text)
+    text = BARE_KEY_PATTERN.sub(r'\1"\2"\3', text)
+    return TRAILING_COMMA_PATTERN.sub(r"\1", text)
+
+
+def object_ends(text: str) -> dict[int, int]:
+    """Maps the index of every `{` to the index just past its closing brace, in one pass; unclosed braces are left out.
+
+    Quotes only count inside braces, where they delimit JSON strings; outside, they are prose.
+    """
+    ends = {}
+    opened = []
     in_string = False
-    escape = False
-
-    for i, ch in enumerate(text):
-        if ch == '"' and not escape:
-            in_string = not in_string
-
-        if ch == "\\" and not escape:
-            escape = True
-        else:
-            escape = False
-
-        if not in_string:
-            if ch == "{":
-                if brace_level == 0:
-                    start = i
-                brace_level += 1
-            elif ch == "}":
-                brace_level -= 1
-                if brace_level == 0 and start is not None:
-                    chunk = text[start:i+1]
-                    objs.append(chunk)
-
-        # continue scanning
-
-    return objs
\ No newline at end of file
+    for match in BRACE_TOKEN_PATTERN.finditer(text):
+        token = match.group()
+        if in_string:
+            if token == '"':
+                in_string = False
+        elif token == '"':
+            in_string = bool(opened)
+        elif token == "{":
+            opened.append(match.start())
+        elif token == "}" and opened:
+            ends[opened.pop()] = match.end()
+    return ends
+
+
+def parse_json_objects(text: str, first_only: bool = False) -> list:
+    """Parses the top-level JSON objects embedded in text.
+
+    Jumps between candidate braces and lets json's C decoder validate each one. A candidate
+    that is not strict JSON is retried as a relaxed rewrite (see relax_json) of the span up to
+    its closing brace before any brace inside it is tried, so an outer object with bare keys is
+    not mistaken for one of its quoted members. The closing braces are found once, on the first
+    failure, so text full of unclosed braces stays linear.
+    """
+    objs = []
+    ends = None
+    start = text.find("{")
+    while start != -1:
+        try:
+            # Strict objects open with a key or close at once; skipping the rest saves raising
+            # a JSONDecodeError, whose line and column count everything before `start`
+            if not STRICT_OPENING_PATTERN.match(text, start):
+                raise ValueError
+            obj, end = JSON_DECODER.raw_decode(text, start)
+        except ValueError:
+            if ends is None:
+                ends = object_ends(text)
+            end = ends.get(start)
+            try:
+                obj = json.loads(relax_json(text[start:end])) if end is not None else None
+            except ValueError:
+                obj = None
+            if obj is None:
+                start = text.find("{", start + 1)
+                continue
+        objs.append(obj)
+        if first_only:
+            break
+        start = text.find("{", end)
+    return objs
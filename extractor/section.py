@@ -1,21 +1,125 @@
 import re
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Iterable
+
+
+SECTION_MARKER_PATTERN = re.compile(r"(\*\*)?(?P<kind>START|END) OF (?P<title>[A-Z]+(?: [A-Z]+)*)\b(\*\*)?")
+OTHER_SECTION_START_PATTERN = re.compile(r"(\*\*)?START OF [A-Z ]+(\*\*)?")
+
+
+@lru_cache(maxsize=64)
+def section_patterns(section_title: str) -> tuple[re.Pattern, re.Pattern, re.Pattern]:
+    """Returns the section's start marker, its end marker, and a pattern for either its end or the start of another section."""
+    return (
+        re.compile(rf"(\*\*)?START OF {section_title}(\*\*)?"),
+        re.compile(rf"(\*\*)?END OF {section_title}(\*\*)?"),
+        re.compile(rf"(\*\*)?(END OF {section_title}|START OF [A-Z ]+)(\*\*)?"),
+    )
 
 
 def extract_section(text, section_title) -> str:
-    section_start_pattern = re.compile(rf"(\*\*)?START OF {section_title}(\*\*)?")
-    section_end_pattern = re.compile(rf"(\*\*)?END OF {section_title}(\*\*)?")
-    other_section_start_pattern = re.compile(r"(\*\*)?START OF [A-Z ]+(\*\*)?")
-    match = re.search(section_start_pattern, text)
+    section_start_pattern, section_end_pattern, _ = section_patterns(section_title)
+    match = section_start_pattern.search(text)
     
     if match:
         start_index = match.end()
-        end_match = re.search(section_end_pattern, text[start_index:])
+        end_match = section_end_pattern.search(text, start_index)
         if end_match:
-            end_index = start_index + end_match.start()
-            return text[start_index:end_index].strip()
-        other_section_match = re.search(other_section_start_pattern, text[start_index:])
+            return text[start_index:end_match.start()].strip()
+        other_section_match = OTHER_SECTION_START_PATTERN.search(text, start_index)
         if other_section_match:
-            end_index = start_index + other_section_match.start()
-            return text[start_index:end_index].strip()
+            return text[start_index:other_section_match.start()].strip()
         return text[start_index:].strip()
-    return ""
\ No newline at end of file
+    return ""
+
+
+def extract_sections(text) -> dict[str, str]:
+    """Extracts every START OF X section in one scan, keyed by X.
+
+    Each section ends at its own END OF X marker when there is one, otherwise at the
+    next START OF marker, following the same rules as extract_section.
+    """
+    starts = []
+    end_positions = {}
+    for match in SECTION_MARKER_PATTERN.finditer(text):
+        if match.group("kind") == "START":
+            starts.append((match.group("title"), match.start(), match.end()))
+        else:
+            end_positions.setdefault(match.group("title"), []).append(match.start())
+
+    sections = {}
+    for index, (title, _, content_start) in enumerate(starts):
+        if title in sections:
+            continue
+        title_ends = end_positions.get(title, [])
+        end_position = bisect_left(title_ends, content_start)
+        if end_position < len(title_ends):
+            content_end = title_ends[end_position]
+        elif index + 1 < len(starts):
+            content_end = starts[index + 1][1]
+        else:
+            content_end = len(text)
+        sections[title] = text[content_start:content_end].strip()
+    return sections
+
+
+class SectionStream:
+    """Accumulates streamed text and notices as soon as one section is complete."""
+
+    MARKER_LOOKBACK = 64
+
+    def __init__(self, section_title: str):
+        self.section_start_pattern, _, self.section_end_pattern = section_patterns(section_title)
+        self.text = ""
+        self.start_index = None
+        self.end_index = None
+        self.scanned = 0
+
+    def feed(self, chunk: str) -> bool:
+        """Adds a chunk and returns True once the section has ended."""
+        if self.end_index is not None:
+            return True
+        self.text += chunk
+        search_from = max(0, self.scanned - self.MARKER_LOOKBACK)
+        if self.start_index is None:
+            match = self.section_start_pattern.search(self.text, search_from)
+            if match is None or match.end() == len(self.text):
+                # Wait for more text: the marker may still gain its closing "**"
+                self.scanned = len(self.text)
+                return False
+            self.start_index = match.end()
+            search_from = self.start_index
+        # Begin past the start marker, which would otherwise match as "another section"
+        end_match = self.section_end_pattern.search(self.text, max(search_from, self.start_index))
+        self.scanned = len(self.text)
+        if end_match is None:
+            return False
+        self.end_index = end_match.start()
+        return True
+
+    def section(self) -> str:
+        if self.start_index is None:
+            return ""
+        return self.text[self.start_index:self.end_index].strip()
+
+
+def extract_section_stream(chunks: Iterable[str], section_title: str, cancel: bool = True) -> str:
+    """Streaming counterpart of extract_section.
+
+    Returns as soon as the section ends (its END OF marker or the next START OF marker).
+    With cancel, the chunk iterator is closed so the remaining response is never fetched;
+    otherwise it is drained first.
+    """
+    section_stream = SectionStream(section_title)
+    chunk_iterator = iter(chunks)
+    for chunk in chunk_iterator:
+        if section_stream.feed(chunk):
+            break
+    if cancel:
+        if hasattr(chunk_iterator, "close"):
+            chunk_iterator.close()
+    else:
+        for _ in chunk_iterator:
+            pass
+    return section_stream.section()
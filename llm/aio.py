@@ -0,0 +1,99 @@
+import asyncio
+import weakref
+
+from .multi import MultiClient
+
+
+class AsyncClient:
+    """Drives a MultiClient from an asyncio event loop: curl's sockets are watched with the loop's
+    readers and writers, so waiting for replies never blocks the loop.
+
+    One client serves every request made on its loop; a driver task runs while any are pending.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.client = MultiClient()
+        self.driver = None
+        self.wakeup = None
+
+    async def request(self, llm, payload: dict) -> dict:
+        """Sends a prepared payload and returns the decoded response; cancelling the awaiting task aborts the transfer."""
+        future = self.loop.create_future()
+
+        def on_response(resp, error):
+            if future.done():
+                return
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(resp)
+
+        handle = llm.submit(self.client, payload, on_response)
+        self.wake()
+        try:
+            return await future
+        except asyncio.CancelledError:
+            self.client.cancel(handle)
+            raise
+
+    def wake(self):
+        """Makes the driver look at newly submitted requests instead of finishing its current wait."""
+        if self.driver is None or self.driver.done():
+            self.driver = self.loop.create_task(self.drive())
+        elif self.wakeup is not None and not self.wakeup.done():
+            self.wakeup.set_result(None)
+
+    async def drive(self):
+        while True:
+            timeout = self.client.step()
+            if timeout is None:
+                return
+            if timeout == 0:
+                # Let the tasks whose replies just arrived run before stepping again
+                await asyncio.sleep(0)
+                continue
+            await self.wait(timeout)
+
+    async def wait(self, timeout: float):
+        multi = self.client.multi
+        curl_timeout_ms = multi.timeout() if self.client.requests else -1
+        if curl_timeout_ms >= 0:
+            timeout = min(timeout, curl_timeout_ms / 1000)
+        readers, writers, _ = multi.fdset() if self.client.requests else ([], [], [])
+        if self.client.requests and not readers and not writers:
+            # libcurl has no sockets yet (e.g. still resolving), so check back shortly
+            timeout = min(timeout, 0.01)
+        self.wakeup = self.loop.create_future()
+
+        def ready():
+            if not self.wakeup.done():
+                self.wakeup.set_result(None)
+
+        for fd in readers:
+            self.loop.add_reader(fd, ready)
+        for fd in writers:
+            self.loop.add_writer(fd, ready)
+        try:
+            await asyncio.wait_for(asyncio.shield(self.wakeup), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            for fd in readers:
+                self.loop.remove_reader(fd)
+            for fd in writers:
+                self.loop.remove_writer(fd)
+            self.wakeup = None
+
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def async_client() -> AsyncClient:
+    """Returns the client of the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = AsyncClient(loop)
+        _clients[loop] = client
+    return client
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict
+
+
+class ResponseCache:
+    """Content-addressed reply cache in SQLite, bounded by size (LRU) and age (TTL)."""
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, ttl_seconds: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS replies (
+                key TEXT PRIMARY KEY,
+                reply TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                elapsed REAL NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS replies_accessed_at ON replies (accessed_at)")
+        self.connection.commit()
+
+    @staticmethod
+    def key(provider_name: str, model_name: str, system_instruction: str, request: dict) -> str:
+        material = json.dumps([provider_name, model_name, system_instruction, request], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute("SELECT reply, elapsed, created_at FROM replies WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[2] > self.ttl_seconds:
+                if row is not None:
+                    self.connection.execute("DELETE FROM replies WHERE key = ?", (key,))
+                    self.connection.commit()
+                self.misses += 1
+                return None
+            self.connection.execute("UPDATE replies SET accessed_at = ? WHERE key = ?", (now, key))
+            self.connection.commit()
+            self.hits += 1
+            self.saved_seconds += row[1]
+            return row[0]
+
+    def put(self, key: str, reply: str, elapsed: float):
+        now = time.time()
+        size = len(reply.encode("utf-8"))
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO replies (key, reply, size, elapsed, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, reply, size, elapsed, now, now)
+            )
+            self.evict(now)
+            self.connection.commit()
+
+    def delete(self, key: str):
+        with self.lock:
+            self.connection.execute("DELETE FROM replies WHERE key = ?", (key,))
+            self.connection.commit()
+
+    def evict(self, now: float):
+        self.connection.execute("DELETE FROM replies WHERE created_at < ?", (now - self.ttl_seconds,))
+        total_bytes = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM replies").fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+        for key, size in self.connection.execute("SELECT key, size FROM replies ORDER BY accessed_at").fetchall():
+            if total_bytes <= self.max_bytes:
+                break
+            self.connection.execute("DELETE FROM replies WHERE key = ?", (key,))
+            total_bytes -= size
+
+    def stats(self) -> Dict[str, float]:
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "saved_seconds": self.saved_seconds}
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+_caches: Dict[str, ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def cache_from_env() -> ResponseCache | None:
+    """Returns the cache configured by LLM_CACHE_PATH, shared by every client, or None when unset."""
+    path = os.getenv("LLM_CACHE_PATH", "")
+    if path == "":
+        return None
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = ResponseCache(
+                path,
+                max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+                ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+            )
+            _caches[path] = cache
+        return cache
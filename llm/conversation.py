@@ -0,0 +1,19 @@
+class Conversation:
+    """The messages of one conversation with an LLM, kept apart from the client so one client can hold many.
+
+    `branches` is used by clients that talk to several models at once (see HedgedLLM) and
+    keep one conversation per model. `cache_salt` tells apart the cached replies of conversations
+    that send the same prompts but should get replies of their own, like best-of-N candidates.
+    `reply_cache_key` is the response cache key of the latest reply, for LLM.forget_reply().
+    """
+
+    __slots__ = ("messages", "branches", "cache_salt", "reply_cache_key")
+
+    def __init__(self, messages: list | None = None, cache_salt: str = ""):
+        self.messages = messages if messages is not None else []
+        self.branches = None
+        self.cache_salt = cache_salt
+        self.reply_cache_key = None
+
+    def __len__(self) -> int:
+        return len(self.messages)
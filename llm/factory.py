@@ -1,7 +1,19 @@
 from llm.llm import LLM
+from llm.cache import cache_from_env
 
 
 def use_model(llm: str) -> LLM:
+    """Creates the model named by `llm`; equivalent models separated by `|` are hedged across."""
+    if "|" in llm:
+        from .hedge import hedged_from_env
+        model = hedged_from_env([create_model(name.strip()) for name in llm.split("|")])
+    else:
+        model = create_model(llm)
+    model.with_cache(cache_from_env())
+    return model
+
+
+def create_model(llm: str) -> LLM:
     [namespace, model_name] = llm.split("://", 1)
     if namespace == "ollama":
         from .ollama import Ollama
@@ -1,24 +1,61 @@
 import json
 import os
+import threading
+import time
+from typing import Dict
+
+import pycurl
 
 from pen.pen import pen
+from .conversation import Conversation
+from .history import estimate_tokens
 from .llm import LLM
+from .ratelimit import HTTPStatusError
+
+
+API_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+# Gemini rejects cachedContents smaller than this
+MIN_CACHEABLE_TOKENS = 1024
+# Seconds to send the instruction inline before trying to create a failed context again
+CACHE_RETRY_SECONDS = 60
+
+
+class CachedContext:
+    """A Gemini cachedContents handle for one model and system instruction; name is None when caching failed."""
+
+    def __init__(self, name: str | None, expires_at: float, renew_at: float):
+        self.name = name
+        self.expires_at = expires_at
+        self.renew_at = renew_at
+
+
+_cached_contexts: Dict[tuple, CachedContext] = {}
+# Keys whose context one client is creating; the others send the instruction inline meanwhile
+_creating_contexts: set[tuple] = set()
+_cached_contexts_lock = threading.Lock()
+
 
 class Gemini(LLM):
     def __init__(self, model_name: str):
+        api_base_url = os.getenv("GEMINI_API_BASE_URL", API_BASE_URL)
         super().__init__(
             provider_name="gemini",
             provider_color=pen.blue_bright,
-            url=f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:generateContent?key={os.getenv('GEMINI_API_KEY')}",
+            url=f"{api_base_url}/models/{model_name}:generateContent?key={os.getenv('GEMINI_API_KEY')}",
             headers={},
             connection_timeout_seconds=int(os.getenv('CONNECTION_TIMEOUT_SECONDS', "15")),
             operation_timeout_seconds=int(os.getenv('OPERATION_TIMEOUT_SECONDS', "30"))
         )
-        self.history = []
         self.model_name = model_name
+        self.stream_url = f"{api_base_url}/models/{model_name}:streamGenerateContent?alt=sse&key={os.getenv('GEMINI_API_KEY')}"
+        self.stream_format = "sse"
+        self.api_base_url = api_base_url
+        self.cached_contents_url = f"{api_base_url}/cachedContents?key={os.getenv('GEMINI_API_KEY')}"
+        self.prompt_cache_ttl_seconds = int(os.getenv("PROMPT_CACHE_TTL_SECONDS", "3600"))
 
-    def send_message(self, prompt):
-        conversation = {
+    def prepare_message(self, prompt, conversation: Conversation | None = None) -> dict:
+        conversation = self.conversation_for(conversation)
+        message = {
             "role": "user",
             "parts": [
                 {
@@ -26,27 +63,121 @@ class Gemini(LLM):
                 }
             ]
         }
-        self.history.append(conversation)
+        self.remember(message, conversation)
         
+        cached_context_name = self.cached_context_name()
+        if cached_context_name is not None:
+            payload = {
+                "cachedContent": cached_context_name,
+                "contents": conversation.messages
+            }
+        else:
+            payload = {
+                "system_instruction": {
+                    "parts": [
+                        {
+                        "text": self.system_instruction
+                        }
+                    ]
+                },
+                "contents": conversation.messages
+            }
+        
+        self.logger.debug_block("Gemini Request Content", lambda: json.dumps(payload, ensure_ascii=False, indent=2))
+        return payload
+
+    def cached_context_name(self) -> str | None:
+        """Returns the cachedContents handle holding the system instruction, creating it or extending its TTL when due."""
+        if not self.prompt_caching or estimate_tokens(self.system_instruction) < MIN_CACHEABLE_TOKENS:
+            return None
+        key = (self.model_name, self.instruction_fingerprint())
+        with _cached_contexts_lock:
+            cached_context = _cached_contexts.get(key)
+            now = time.time()
+            if key in _creating_contexts or (cached_context is not None and now < cached_context.renew_at):
+                return cached_context.name if cached_context is not None and now < cached_context.expires_at else None
+            _creating_contexts.add(key)
+        # Requested outside the lock so other clients and instructions are not held up by it
+        try:
+            cached_context = self.renew_cached_context(cached_context)
+            with _cached_contexts_lock:
+                _cached_contexts[key] = cached_context
+        finally:
+            with _cached_contexts_lock:
+                _creating_contexts.discard(key)
+        return cached_context.name
+
+    def renew_cached_context(self, cached_context: CachedContext | None) -> CachedContext:
+        """Extends a live context's TTL in place, so no superseded context is left accruing storage; otherwise creates one."""
+        if cached_context is None or cached_context.name is None or time.time() >= cached_context.expires_at:
+            return self.create_cached_context()
+        expires_at, renew_at = self.cached_context_expiry()
+        try:
+            resp = self.chat(
+                {"ttl": f"{self.prompt_cache_ttl_seconds}s"},
+                url=f"{self.api_base_url}/{cached_context.name}?updateMask=ttl&key={os.getenv('GEMINI_API_KEY')}",
+                method="PATCH"
+            )
+        except (pycurl.error, HTTPStatusError, ValueError) as error:
+            self.logger.debug(f"could not extend context cache {cached_context.name}: {error}")
+            return self.create_cached_context()
+        if "name" not in resp:
+            self.logger.debug(f"could not extend context cache {cached_context.name}: {resp.get('error', {}).get('message', 'unknown error')}")
+            return self.create_cached_context()
+        self.logger.debug(f"extended context cache {cached_context.name}")
+        return CachedContext(cached_context.name, expires_at, renew_at)
+
+    def cached_context_expiry(self) -> tuple[float, float]:
+        """When a context created or extended now expires, and when to extend it again."""
+        expires_at = time.time() + self.prompt_cache_ttl_seconds
+        # Renew ahead of expiry so a request never references a context that is about to vanish
+        return expires_at, expires_at - min(300, self.prompt_cache_ttl_seconds / 10)
+
+    def create_cached_context(self) -> CachedContext:
+        expires_at, renew_at = self.cached_context_expiry()
+        retry_at = time.time() + CACHE_RETRY_SECONDS
         payload = {
-            "system_instruction": {
+            "model": f"models/{self.model_name}",
+            "systemInstruction": {
                 "parts": [
                     {
-                    "text": self.system_instruction
+                        "text": self.system_instruction
                     }
                 ]
             },
-            "contents": self.history
+            "ttl": f"{self.prompt_cache_ttl_seconds}s"
         }
-        
-        self.logger.debug_block("Gemini Request Content", json.dumps(payload, ensure_ascii=False, indent=2))
+        try:
+            resp = self.chat(payload, url=self.cached_contents_url)
+        except (pycurl.error, HTTPStatusError, ValueError) as error:
+            self.logger.debug(f"context cache unavailable: {error}")
+            return CachedContext(None, retry_at, retry_at)
+        if "name" not in resp:
+            self.logger.debug(f"context cache unavailable: {resp.get('error', {}).get('message', 'unknown error')}")
+            return CachedContext(None, retry_at, retry_at)
+        self.logger.debug(f"created context cache {resp['name']}")
+        return CachedContext(resp["name"], expires_at, renew_at)
+
+    def token_usage(self, resp: dict) -> tuple[int | None, int | None]:
+        usage = resp.get("usageMetadata") or {}
+        return usage.get("promptTokenCount"), usage.get("candidatesTokenCount")
 
-        resp = self.chat(payload)
+    def read_stream_event(self, event: dict) -> str:
+        candidates = event.get("candidates") or [{}]
+        parts = candidates[0].get("content", {}).get("parts", [])
+        return "".join(part.get("text", "") for part in parts)
+
+    def read_response(self, resp: dict) -> str:
         content = resp["candidates"][0]["content"]["parts"][0]["text"]
+        cached_tokens = resp.get("usageMetadata", {}).get("cachedContentTokenCount", 0)
+        self.logger.debug(f"cached prompt tokens: {cached_tokens}")
         
         self.logger.debug_block("Gemini Response Content", content)
         
         return content
 
-    def clear_history(self):
-        self.history = []
\ No newline at end of file
+    def message_text(self, message: dict) -> str:
+        return "".join(part.get("text", "") for part in message["parts"])
+
+    def replace_message_text(self, message: dict, text: str) -> dict:
+        return message | {"parts": [{"text": text}]}
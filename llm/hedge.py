@@ -0,0 +1,246 @@
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict
+
+from pen.pen import pen
+from .cache import ResponseCache
+from .conversation import Conversation
+from .history import HistoryPolicy
+from .llm import LLM
+
+
+class LatencyTracker:
+    """Recent request durations of one model: successes, and lower bounds for requests cancelled when a hedge won."""
+
+    def __init__(self, window: int = 200):
+        self.durations = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self.lock:
+            self.durations.append(seconds)
+
+    def percentile(self, fraction: float, min_samples: int) -> float | None:
+        """Nearest-rank percentile, or None until `min_samples` durations have been seen."""
+        with self.lock:
+            if len(self.durations) < min_samples:
+                return None
+            ordered = sorted(self.durations)
+        return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class HedgeBudget:
+    """Caps backup requests at `ratio` times the primary requests, so spend grows by at most that factor."""
+
+    def __init__(self, ratio: float):
+        self.ratio = min(1.0, max(0.0, ratio))
+        self.requests = 0
+        self.hedges = 0
+        self.lock = threading.Lock()
+
+    def count_request(self):
+        with self.lock:
+            self.requests += 1
+
+    def try_spend(self) -> bool:
+        with self.lock:
+            if self.hedges + 1 > self.ratio * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+
+_trackers: Dict[tuple, LatencyTracker] = {}
+_budgets: Dict[tuple, HedgeBudget] = {}
+_registry_lock = threading.Lock()
+
+
+def tracker_for(llm: LLM) -> LatencyTracker:
+    key = (llm.provider_name, llm.model_name)
+    with _registry_lock:
+        return _trackers.setdefault(key, LatencyTracker())
+
+
+def budget_for(members: list[LLM], ratio: float) -> HedgeBudget:
+    key = tuple((member.provider_name, member.model_name) for member in members)
+    with _registry_lock:
+        return _budgets.setdefault(key, HedgeBudget(ratio))
+
+
+class HedgedRequest:
+    """Handle of one hedged request: the member requests in flight and the timer of the next backup."""
+
+    def __init__(self, hedged: "HedgedLLM", client, payload: dict, callback: Callable[[dict | None, Exception | None], None]):
+        self.hedged = hedged
+        self.client = client
+        self.payloads = payload["hedged"]
+        self.callback = callback
+        self.in_flight = {}
+        self.start_times = {}
+        self.next_member = 0
+        self.timer = None
+        self.done = False
+        self.last_error = None
+
+    def start_next(self, backup: bool):
+        member_index = self.next_member
+        self.next_member += 1
+        member = self.hedged.members[member_index]
+        if backup:
+            self.hedged.logger.log(f"hedging with {pen.yellow_bright(member.model_name)}")
+        start_time = time.monotonic()
+        self.start_times[member_index] = start_time
+        self.in_flight[member_index] = member.submit(
+            self.client,
+            self.payloads[member_index],
+            lambda resp, error: self.on_response(member_index, start_time, resp, error)
+        )
+        self.schedule_backup()
+
+    def schedule_backup(self):
+        if self.next_member >= len(self.hedged.members):
+            return
+        delay = self.hedged.hedge_delay()
+        self.timer = self.client.call_later(delay, self.on_timer)
+
+    def on_timer(self):
+        self.timer = None
+        if not self.done and self.hedged.budget.try_spend():
+            self.start_next(backup=True)
+
+    def on_response(self, member_index: int, start_time: float, resp: dict | None, error: Exception | None):
+        self.in_flight.pop(member_index, None)
+        if self.done:
+            return
+        member = self.hedged.members[member_index]
+        if error is None:
+            now = time.monotonic()
+            tracker_for(member).observe(now - start_time)
+            # The losers would have taken at least this long; leaving them out would skew the percentile low
+            for loser_index in self.in_flight:
+                tracker_for(self.hedged.members[loser_index]).observe(now - self.start_times[loser_index])
+            self.finish({"member": member_index, "response": resp}, None)
+            return
+        self.hedged.logger.log(f"{member.model_name} failed: {pen.red(str(error))}")
+        self.last_error = error
+        if self.in_flight:
+            return
+        # Nothing left in flight: fail over to the next member right away when the budget allows
+        if self.next_member < len(self.hedged.members) and self.hedged.budget.try_spend():
+            self.cancel_timer()
+            self.start_next(backup=True)
+            return
+        self.finish(None, error)
+
+    def finish(self, resp: dict | None, error: Exception | None):
+        self.done = True
+        self.cancel()
+        self.callback(resp, error)
+
+    def cancel_timer(self):
+        if self.timer is not None:
+            self.client.cancel(self.timer)
+            self.timer = None
+
+    def cancel(self):
+        """Cancels the backup timer and every member request still in flight."""
+        self.done = True
+        self.cancel_timer()
+        for request in list(self.in_flight.values()):
+            self.client.cancel(request)
+        self.in_flight.clear()
+
+
+class HedgedLLM(LLM):
+    """Sends each request to the first of several equivalent models, adding a backup request to the next
+    one when no answer has arrived within the `percentile` latency of the models so far.
+
+    The first answer wins and the others are cancelled. The conversation keeps a branch per
+    member, so any of them can answer the next prompt; its messages are the primary's.
+    """
+
+    def __init__(self, members: list[LLM], percentile: float = 0.95, budget_ratio: float = 0.1, initial_delay_seconds: float = 10.0, min_samples: int = 10):
+        primary = members[0]
+        super().__init__(provider_name="hedged", provider_color=pen.white_bright, url=primary.url, headers={})
+        self.members = members
+        self.model_name = "|".join(member.model_name for member in members)
+        self.percentile = percentile
+        self.initial_delay_seconds = initial_delay_seconds
+        self.min_samples = min_samples
+        self.budget = budget_for(members, budget_ratio)
+        # Hedging races complete replies; a streamed reply could not be handed back once a backup won
+        self.streaming = False
+
+    def hedge_delay(self) -> float:
+        """How long to wait for an answer before sending a backup, from the primary's observed latency."""
+        observed = tracker_for(self.members[0]).percentile(self.percentile, self.min_samples)
+        return self.initial_delay_seconds if observed is None else observed
+
+    def with_instruction(self, instruction: str):
+        super().with_instruction(instruction)
+        for member in self.members:
+            member.with_instruction(instruction)
+
+    def with_history_policy(self, policy: HistoryPolicy):
+        super().with_history_policy(policy)
+        for member in self.members:
+            member.with_history_policy(policy)
+
+    def with_role(self, role: str):
+        super().with_role(role)
+        for member in self.members:
+            member.with_role(role)
+
+    def with_cache(self, cache: ResponseCache | None):
+        super().with_cache(cache)
+        for member in self.members:
+            member.with_cache(None)
+
+    def prepare_message(self, prompt, conversation: Conversation | None = None) -> dict:
+        conversation = self.conversation_for(conversation)
+        if conversation.branches is None:
+            # Restored messages are in the primary's format, so only members of the same provider can take them over
+            primary = self.members[0]
+            conversation.branches = [
+                Conversation(list(conversation.messages) if member.provider_name == primary.provider_name else [])
+                for member in self.members
+            ]
+        payload = {"hedged": [member.prepare_message(prompt, branch) for member, branch in zip(self.members, conversation.branches)]}
+        conversation.messages = conversation.branches[0].messages
+        return payload
+
+    def submit(self, client, payload: dict, callback: Callable[[dict | None, Exception | None], None]) -> HedgedRequest:
+        self.budget.count_request()
+        request = HedgedRequest(self, client, payload, callback)
+        request.start_next(backup=False)
+        return request
+
+    def chat(self, payload, url: str | None = None) -> dict:
+        # Imported here because the multi client depends on this package's base class module
+        from .multi import MultiClient
+
+        outcome = []
+        client = MultiClient(select_timeout_seconds=0.1)
+        self.submit(client, payload, lambda resp, error: outcome.append((resp, error)))
+        while not outcome:
+            client.poll()
+        resp, error = outcome[0]
+        if error is not None:
+            raise error
+        return resp
+
+    def read_response(self, resp: dict) -> str:
+        return self.members[resp["member"]].read_response(resp["response"])
+
+
+def hedged_from_env(members: list[LLM]) -> HedgedLLM:
+    return HedgedLLM(
+        members,
+        percentile=float(os.getenv("HEDGE_PERCENTILE", "95")) / 100,
+        budget_ratio=float(os.getenv("HEDGE_BUDGET_RATIO", "0.1")),
+        initial_delay_seconds=float(os.getenv("HEDGE_INITIAL_DELAY_SECONDS", "10")),
+        min_samples=int(os.getenv("HEDGE_MIN_SAMPLES", "10"))
+    )
@@ -0,0 +1,111 @@
+import os
+import re
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .llm import LLM
+
+
+def estimate_tokens(text: str, chars_per_token: float = 4.0) -> int:
+    """Rough token count; good enough to keep payloads under a budget without a tokenizer."""
+    return int(len(text) / chars_per_token) + 1
+
+
+class HistoryPolicy:
+    """Decides which past messages are re-sent. The default keeps everything."""
+
+    def apply(self, history: list[dict], llm: "LLM") -> list[dict]:
+        return history
+
+
+class KeepLast(HistoryPolicy):
+    """Keeps the first message (the original request) and the last `count` messages."""
+
+    def __init__(self, count: int, keep_first: bool = True):
+        self.count = max(1, count)
+        self.keep_first = keep_first
+
+    def apply(self, history: list[dict], llm: "LLM") -> list[dict]:
+        if len(history) <= self.count + (1 if self.keep_first else 0):
+            return history
+        recent = history[-self.count:]
+        return [history[0]] + recent if self.keep_first else recent
+
+
+class DropSupersededDrafts(HistoryPolicy):
+    """Replaces the body of every draft but the latest with a short placeholder."""
+
+    PLACEHOLDER = "[earlier draft omitted; superseded by a later submission]"
+
+    def __init__(self, start_marker: str = "START OF CONTENT DRAFT", end_marker: str = "END OF CONTENT DRAFT"):
+        self.draft_pattern = re.compile(rf"({re.escape(start_marker)}[^\n]*\n).*?(\n{re.escape(end_marker)})", re.DOTALL)
+
+    def apply(self, history: list[dict], llm: "LLM") -> list[dict]:
+        compacted = []
+        for message in history[:-1]:
+            text = llm.message_text(message)
+            replaced = self.draft_pattern.sub(lambda match: match.group(1) + self.PLACEHOLDER + match.group(2), text)
+            compacted.append(message if replaced == text else llm.replace_message_text(message, replaced))
+        return compacted + history[-1:]
+
+
+class TokenBudget(HistoryPolicy):
+    """Keeps the estimated size of system instruction plus history under `max_tokens`.
+
+    Older messages are dropped first (the original request is kept while possible), then
+    whatever remains besides the latest message is truncated to its opening lines.
+    """
+
+    TRUNCATION_NOTE = "\n[... truncated to fit the history budget]"
+
+    def __init__(self, max_tokens: int, chars_per_token: float = 4.0):
+        self.max_tokens = max_tokens
+        self.chars_per_token = chars_per_token
+
+    def size(self, history: list[dict], llm: "LLM") -> int:
+        text = llm.system_instruction + "".join(llm.message_text(message) for message in history)
+        return estimate_tokens(text, self.chars_per_token)
+
+    def apply(self, history: list[dict], llm: "LLM") -> list[dict]:
+        if self.size(history, llm) <= self.max_tokens:
+            return history
+        kept = list(history)
+        while len(kept) > 2 and self.size(kept, llm) > self.max_tokens:
+            del kept[1]
+        if len(kept) > 1 and self.size(kept, llm) > self.max_tokens:
+            overflow_chars = int((self.size(kept, llm) - self.max_tokens) * self.chars_per_token)
+            first_text = llm.message_text(kept[0])
+            keep_chars = max(0, len(first_text) - overflow_chars - len(self.TRUNCATION_NOTE))
+            kept[0] = llm.replace_message_text(kept[0], first_text[:keep_chars] + self.TRUNCATION_NOTE)
+        if len(kept) != len(history):
+            llm.logger.debug(f"history compacted from {len(history)} to {len(kept)} messages")
+        return kept
+
+
+class ChainedPolicy(HistoryPolicy):
+    """Applies several policies in order."""
+
+    def __init__(self, *policies: HistoryPolicy):
+        self.policies = policies
+
+    def apply(self, history: list[dict], llm: "LLM") -> list[dict]:
+        for policy in self.policies:
+            history = policy.apply(history, llm)
+        return history
+
+
+def history_policy_from_env(role: str) -> HistoryPolicy:
+    """Builds the policy for a role from <ROLE>_HISTORY_POLICY and <ROLE>_HISTORY_TOKEN_BUDGET."""
+    role = role.upper()
+    policies = []
+    spec = os.getenv(f"{role}_HISTORY_POLICY", "all")
+    if spec == "drafts":
+        policies.append(DropSupersededDrafts())
+    elif spec.startswith("last:"):
+        policies.append(KeepLast(int(spec[len("last:"):])))
+    elif spec != "all":
+        raise ValueError(f"Unsupported history policy for {role}: {spec}")
+    token_budget = os.getenv(f"{role}_HISTORY_TOKEN_BUDGET", "")
+    if token_budget != "":
+        policies.append(TokenBudget(int(token_budget)))
+    return ChainedPolicy(*policies)
@@ -1,57 +1,392 @@
 from abc import abstractmethod
+import asyncio
+import hashlib
+import itertools
 import json
 import os
-from typing import Dict
+from collections import deque
+from typing import Callable, Dict, Iterator
 import time
 import pycurl
 from io import BytesIO
 
 from logger.logger import Logger
+from .aio import async_client
+from .cache import ResponseCache
+from .conversation import Conversation
+from .history import HistoryPolicy, estimate_tokens
+from .metrics import CallMetrics, call_status, get_registry
+from .ratelimit import ResponseHeaders, limiter_for, retry_policy_from_env
+from .pool import pool_for
+from .stream import StreamDecoder
 
 
 class LLM:
+    """Client of one provider model. Conversation state lives in Conversation objects passed to each call,
+    so one client can serve many conversations at once; calls without one use the client's own."""
+
+    # Request fields that steer transport or provider-side caching but do not change the reply
+    CACHE_IGNORED_KEYS = ("stream", "stream_options", "keep_alive", "prompt_cache_key", "cachedContent")
+
     def __init__(self, provider_name: str, provider_color: str, url: str, headers: Dict[str, str], connection_timeout_seconds: int = 15, operation_timeout_seconds: int = 20):
+        self.provider_name = provider_name
         self.url = url
         self.headers = { "Content-Type": "application/json" } | headers
         self.model_name = "unnamed-model"
+        self.role = "unassigned"
         self.connection_timeout_seconds = connection_timeout_seconds
         self.operation_timeout_seconds = operation_timeout_seconds
         self.logger = Logger(provider_name, provider_color)
         self.curl_verbose = 0 if os.getenv("CURL_VERBOSE", "false").upper() == "FALSE" else 1
         self.system_instruction = ""
+        self.streaming = os.getenv("LLM_STREAM", "false").upper() == "TRUE"
+        self.stream_idle_timeout_seconds = int(os.getenv("STREAM_IDLE_TIMEOUT_SECONDS", "30"))
+        self.stream_url = url
+        self.stream_format = "ndjson"
+        self.cache = None
+        self.history_policy = HistoryPolicy()
+        self.prompt_caching = os.getenv("PROMPT_CACHE", "true").upper() == "TRUE"
+        self.rate_limiter = limiter_for(provider_name)
+        self.retry_policy = retry_policy_from_env()
+        self.conversation = Conversation()
+
+    @property
+    def history(self) -> list:
+        """Messages of the client's own conversation."""
+        return self.conversation.messages
+
+    @history.setter
+    def history(self, messages: list):
+        self.conversation.messages = messages
+
+    def conversation_for(self, conversation: Conversation | None) -> Conversation:
+        return self.conversation if conversation is None else conversation
+
+    def chat(self, payload, url: str | None = None, method: str = "POST") -> dict:
+        """Sends a request through the provider's rate limiter, retrying throttled and failed attempts."""
+        reserved_tokens = self.estimate_request_tokens(payload)
+        for attempt in itertools.count():
+            self.rate_limiter.acquire(reserved_tokens)
+            try:
+                resp = self.perform_chat(payload, url, method)
+            except Exception as error:
+                self.rate_limiter.release(reserved_tokens, error=error)
+                if not self.retry_policy.should_retry(error, attempt):
+                    raise
+                self.wait_before_retry(error, attempt)
+                continue
+            self.rate_limiter.release(reserved_tokens, used_tokens=self.used_tokens(resp))
+            return resp
+
+    def perform_chat(self, payload, url: str | None = None, method: str = "POST") -> dict:
+        start_of_content_writing_time = time.time()
+        pool = pool_for(url or self.url)
+        curl_client = pool.acquire()
+        response_buffer = BytesIO()
+        headers = ResponseHeaders()
+        try:
+            self.prepare_request(curl_client, payload, response_buffer.write, url=url, header_function=headers, method=method)
+            curl_client.perform()
+        except pycurl.error:
+            self.record_call(self.call_metrics(curl_client, "error"))
+            curl_client.close()
+            raise
+        status_error = headers.error(response_buffer.getvalue())
+        call = self.call_metrics(curl_client, "ok" if status_error is None else call_status(status_error))
+        pool.release(curl_client)
+        if status_error is not None:
+            self.record_call(call)
+            raise status_error
+        response_data = response_buffer.getvalue().decode('utf-8')
+        end_of_content_writing_time = time.time()
+        self.logger.log_time_taken(end_of_content_writing_time - start_of_content_writing_time)
+        resp = json.loads(response_data)
+        self.record_call(call, resp)
+        return resp
+
+    def chat_stream(self, payload) -> Iterator[dict]:
+        """Yields decoded events of a streamed response as they arrive; closing the iterator aborts the transfer.
+
+        Attempts that fail before the first event are retried like chat(); a stream that breaks
+        after events were handed out is not, since they cannot be taken back.
+        """
+        reserved_tokens = self.estimate_request_tokens(payload)
+        for attempt in itertools.count():
+            self.rate_limiter.acquire(reserved_tokens)
+            released = False
+            yielded = False
+            usage = [None]
+            try:
+                for event in self.perform_chat_stream(payload, usage):
+                    yielded = True
+                    yield event
+            except Exception as error:
+                released = True
+                self.rate_limiter.release(reserved_tokens, error=error)
+                if yielded or not self.retry_policy.should_retry(error, attempt):
+                    raise
+                self.wait_before_retry(error, attempt)
+                continue
+            finally:
+                if not released:
+                    self.rate_limiter.release(reserved_tokens, used_tokens=self.used_tokens(usage[0]) if usage[0] else None)
+            return
 
-    def chat(self, payload) -> dict:
+    def perform_chat_stream(self, payload, usage: list) -> Iterator[dict]:
         start_of_content_writing_time = time.time()
-        curl_client = pycurl.Curl()
+        pool = pool_for(self.stream_url)
+        curl_client = pool.acquire()
+        decoder = StreamDecoder(self.stream_format)
+        events = deque()
+        headers = ResponseHeaders()
+        error_body = BytesIO()
+
+        def write(data: bytes):
+            if headers.status is not None and headers.status >= 400:
+                error_body.write(data)
+            else:
+                events.extend(decoder.feed(data))
+
+        self.prepare_request(curl_client, payload, write, url=self.stream_url, header_function=headers)
+        # A stream may legitimately run for minutes, so only give up when it stalls
+        curl_client.setopt(pycurl.TIMEOUT, 0)
+        curl_client.setopt(pycurl.LOW_SPEED_LIMIT, 1)
+        curl_client.setopt(pycurl.LOW_SPEED_TIME, self.stream_idle_timeout_seconds)
+        multi = pycurl.CurlMulti()
+        multi.add_handle(curl_client)
+        completed = False
+        status = "cancelled"
+        try:
+            while not completed:
+                while multi.perform()[0] == pycurl.E_CALL_MULTI_PERFORM:
+                    pass
+                _, succeeded, failures = multi.info_read()
+                if failures:
+                    status = "error"
+                    _, error_number, error_message = failures[0]
+                    raise pycurl.error(error_number, error_message)
+                completed = bool(succeeded)
+                if completed:
+                    status_error = headers.error(error_body.getvalue())
+                    if status_error is not None:
+                        status = call_status(status_error)
+                        raise status_error
+                    status = "ok"
+                    events.extend(decoder.close())
+                while events:
+                    event = events.popleft()
+                    if self.token_usage(event) != (None, None):
+                        usage[0] = event
+                    yield event
+                if not completed:
+                    multi.select(1.0)
+        finally:
+            multi.remove_handle(curl_client)
+            multi.close()
+            call = self.call_metrics(curl_client, status)
+            self.record_call(call, usage[0])
+            if completed:
+                pool.release(curl_client)
+            else:
+                curl_client.close()
+            end_of_content_writing_time = time.time()
+            self.logger.log_time_taken(end_of_content_writing_time - start_of_content_writing_time)
+
+    def prepare_request(
+        self,
+        curl_client: pycurl.Curl,
+        payload,
+        write_function: Callable[[bytes], None],
+        url: str | None = None,
+        header_function: Callable[[bytes], None] | None = None,
+        method: str = "POST"
+    ):
         curl_client.setopt(pycurl.CONNECTTIMEOUT, self.connection_timeout_seconds)
         curl_client.setopt(pycurl.TIMEOUT, self.operation_timeout_seconds)
-        curl_client.setopt_string(pycurl.URL, self.url)
+        curl_client.setopt_string(pycurl.URL, url or self.url)
         curl_client.setopt(pycurl.IPRESOLVE, pycurl.IPRESOLVE_V4)
         curl_client.setopt(pycurl.POST, 1)
-        curl_client.setopt_string(pycurl.POSTFIELDS, json.dumps(payload))
+        curl_client.setopt_string(pycurl.POSTFIELDS, self.serialize_payload(payload))
+        # Always set, since pooled handles keep the method of their previous request
+        curl_client.setopt_string(pycurl.CUSTOMREQUEST, method)
         header_list = [f"{key}: {value}" for key, value in self.headers.items()]
         curl_client.setopt(pycurl.HTTPHEADER, header_list)
-        response_buffer = BytesIO()
-        curl_client.setopt(pycurl.WRITEFUNCTION, response_buffer.write)
+        curl_client.setopt(pycurl.WRITEFUNCTION, write_function)
+        if header_function is not None:
+            curl_client.setopt(pycurl.HEADERFUNCTION, header_function)
         curl_client.setopt(pycurl.FOLLOWLOCATION, True)
         curl_client.setopt(pycurl.ACCEPT_ENCODING, "gzip, deflate")
         curl_client.setopt(pycurl.VERBOSE, self.curl_verbose)
         curl_client.setopt_string(pycurl.PROXY, "")
-        curl_client.perform()
-        curl_client.close()
-        response_data = response_buffer.getvalue().decode('utf-8')
-        end_of_content_writing_time = time.time()
-        self.logger.log_time_taken(end_of_content_writing_time - start_of_content_writing_time)
-        return json.loads(response_data)
+
+    def call_metrics(self, curl_client: pycurl.Curl, status: str = "ok") -> CallMetrics:
+        """Reads the timings of the transfer that just ran on curl_client."""
+        call = CallMetrics(self.provider_name, self.model_name, self.role, status)
+        call.read_timings(curl_client)
+        return call
+
+    def record_call(self, call: CallMetrics, resp: dict | None = None):
+        if resp is not None:
+            call.prompt_tokens, call.completion_tokens = self.token_usage(resp)
+            call.load_seconds, call.generation_seconds = self.server_timings(resp)
+        get_registry().record(call)
+        if call.load_seconds is not None and call.load_seconds >= 1.0:
+            self.logger.log(f"loading {self.model_name} took {self.logger.format_elapsed_time(call.load_seconds)} of this call")
+        self.logger.debug(lambda: (
+            f"{call.status}: connect {call.connect_seconds:.3f}s, tls {call.tls_seconds:.3f}s, "
+            f"first byte {call.ttfb_seconds:.3f}s, total {call.total_seconds:.3f}s, "
+            f"model load {call.load_seconds}s, generation {call.generation_seconds}s, "
+            f"sent {call.request_bytes} bytes, received {call.response_bytes} bytes, "
+            f"tokens {call.prompt_tokens} in / {call.completion_tokens} out"
+        ))
+
+    def server_timings(self, resp: dict) -> tuple[float | None, float | None]:
+        """Returns the (model load, generation) seconds a response reports, for providers that run the model locally."""
+        return None, None
+
+    def used_tokens(self, resp: dict) -> int | None:
+        """Total tokens a response reports, for settling the rate limiter's token budget."""
+        counts = [count for count in self.token_usage(resp) if count is not None]
+        return sum(counts) if counts else None
+
+    def estimate_request_tokens(self, payload) -> int:
+        return estimate_tokens(self.serialize_payload(payload))
+
+    def retry_delay(self, error: Exception, attempt: int) -> float:
+        delay = self.retry_policy.delay(error, attempt)
+        self.logger.log(f"request failed ({error}), retry {attempt + 1} of {self.retry_policy.max_retries} in {delay:.1f}s")
+        return delay
+
+    def wait_before_retry(self, error: Exception, attempt: int):
+        time.sleep(self.retry_delay(error, attempt))
+
+    def token_usage(self, resp: dict) -> tuple[int | None, int | None]:
+        """Returns the (prompt, completion) token counts a response or streamed event reports."""
+        return None, None
+
+    def serialize_payload(self, payload) -> str:
+        # Fixed separators and insertion order keep the instruction-first prefix byte-identical across calls
+        return json.dumps(payload, separators=(",", ":"))
 
     def with_instruction(self, instruction: str):
         self.system_instruction = instruction
-    
+
+    def instruction_fingerprint(self) -> str:
+        return hashlib.sha256(self.system_instruction.encode("utf-8")).hexdigest()[:16]
+
+    def with_role(self, role: str):
+        """Names the studio role this client serves, for metrics."""
+        self.role = role
+
+    def with_cache(self, cache: ResponseCache | None):
+        self.cache = cache
+
+    def with_history_policy(self, policy: HistoryPolicy):
+        self.history_policy = policy
+
+    def remember(self, message: dict, conversation: Conversation | None = None):
+        """Appends a message to the conversation, then lets the history policy bound it."""
+        conversation = self.conversation_for(conversation)
+        conversation.messages = self.history_policy.apply(conversation.messages + [message], self)
+
+    def message_text(self, message: dict) -> str:
+        return message["content"]
+
+    def replace_message_text(self, message: dict, text: str) -> dict:
+        return message | {"content": text}
+
+    def cache_key(self, payload: dict, cache_salt: str = "") -> str:
+        # Streaming and non-streaming requests for the same conversation share a reply
+        request = {key: value for key, value in payload.items() if key not in self.CACHE_IGNORED_KEYS}
+        if cache_salt:
+            request["cache_salt"] = cache_salt
+        return ResponseCache.key(self.provider_name, self.model_name, self.system_instruction, request)
+
+    def cached_reply(self, payload: dict, conversation: Conversation | None = None) -> str | None:
+        if self.cache is None:
+            return None
+        conversation = self.conversation_for(conversation)
+        conversation.reply_cache_key = self.cache_key(payload, conversation.cache_salt)
+        reply = self.cache.get(conversation.reply_cache_key)
+        if reply is not None:
+            self.logger.debug("reply served from cache")
+        return reply
+
+    def store_reply(self, payload: dict, reply: str, elapsed: float, conversation: Conversation | None = None):
+        if self.cache is not None:
+            self.cache.put(self.cache_key(payload, self.conversation_for(conversation).cache_salt), reply, elapsed)
+
+    def forget_reply(self, conversation: Conversation | None = None):
+        """Drops the conversation's latest reply from the cache, so asking again gets a fresh one."""
+        conversation = self.conversation_for(conversation)
+        if self.cache is not None and conversation.reply_cache_key is not None:
+            self.cache.delete(conversation.reply_cache_key)
+            conversation.reply_cache_key = None
+
+    def send_message(self, prompt, conversation: Conversation | None = None) -> str:
+        payload = self.prepare_message(prompt, conversation)
+        reply = self.cached_reply(payload, conversation)
+        if reply is not None:
+            return reply
+        start_time = time.time()
+        reply = self.read_response(self.chat(payload))
+        self.store_reply(payload, reply, time.time() - start_time, conversation)
+        return reply
+
+    async def send_message_async(self, prompt, conversation: Conversation | None = None) -> str:
+        """Like send_message, but waits for the reply on the running event loop instead of blocking it."""
+        # Preparing may call the provider (Gemini's cached contexts) and the cache is SQLite, so both run off the loop
+        payload = await asyncio.to_thread(self.prepare_message, prompt, conversation)
+        if self.cache is not None:
+            reply = await asyncio.to_thread(self.cached_reply, payload, conversation)
+            if reply is not None:
+                return reply
+        start_time = time.time()
+        reply = self.read_response(await async_client().request(self, payload))
+        if self.cache is not None:
+            await asyncio.to_thread(self.store_reply, payload, reply, time.time() - start_time, conversation)
+        return reply
+
+    def send_message_stream(self, prompt, conversation: Conversation | None = None) -> Iterator[str]:
+        """Sends the prompt as a streamed request and yields the reply text piece by piece."""
+        payload = self.prepare_stream_message(prompt, conversation)
+        reply = self.cached_reply(payload, conversation)
+        if reply is not None:
+            yield reply
+            return
+        start_time = time.time()
+        pieces = []
+        for event in self.chat_stream(payload):
+            text = self.read_stream_event(event)
+            if text:
+                pieces.append(text)
+                yield text
+        # Only reached when the stream was read to the end, so partial replies are never cached
+        self.store_reply(payload, "".join(pieces), time.time() - start_time, conversation)
+
+    def prepare_stream_message(self, prompt, conversation: Conversation | None = None) -> dict:
+        return self.prepare_message(prompt, conversation)
+
+    def submit(self, client, payload: dict, callback: Callable[[dict | None, Exception | None], None]):
+        """Starts the request on a MultiClient and returns a handle for client.cancel()."""
+        return client.submit(self, payload, callback)
+
     @abstractmethod
-    def send_message(self, prompt, preferred_language="English"):
+    def prepare_message(self, prompt, conversation: Conversation | None = None) -> dict:
+        """Records the prompt in the conversation and builds the request payload."""
         pass
 
     @abstractmethod
-    def clear_history(self):
+    def read_response(self, resp: dict) -> str:
+        """Extracts the reply text from a decoded provider response."""
+        pass
+
+    @abstractmethod
+    def read_stream_event(self, event: dict) -> str:
+        """Extracts the text delta from one streamed event."""
         pass
 
+    def clear_history(self):
+        """Starts the client's own conversation afresh; other holders of the old one keep it."""
+        self.conversation = Conversation()
+
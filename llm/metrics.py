@@ -0,0 +1,210 @@
+import atexit
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+import pycurl
+
+from .ratelimit import THROTTLING_STATUSES
+
+
+# The integer variants replace the deprecated floating point ones in newer libcurl
+SIZE_UPLOAD = getattr(pycurl, "SIZE_UPLOAD_T", pycurl.SIZE_UPLOAD)
+SIZE_DOWNLOAD = getattr(pycurl, "SIZE_DOWNLOAD_T", pycurl.SIZE_DOWNLOAD)
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+TOKENS_BUCKETS = (16, 64, 256, 1024, 4096, 16384, 65536)
+
+# Histogram name, help text, buckets and the CallMetrics field it observes
+HISTOGRAMS = (
+    ("blogger_llm_connect_seconds", "Time until the TCP connection was established", SECONDS_BUCKETS, "connect_seconds"),
+    ("blogger_llm_tls_seconds", "Time spent on the TLS handshake", SECONDS_BUCKETS, "tls_seconds"),
+    ("blogger_llm_ttfb_seconds", "Time until the first response byte", SECONDS_BUCKETS, "ttfb_seconds"),
+    ("blogger_llm_request_seconds", "Total time of the request", SECONDS_BUCKETS, "total_seconds"),
+    ("blogger_llm_load_seconds", "Time the server spent loading the model, as it reported", SECONDS_BUCKETS, "load_seconds"),
+    ("blogger_llm_generation_seconds", "Time the server spent on the prompt and the reply, as it reported", SECONDS_BUCKETS, "generation_seconds"),
+    ("blogger_llm_request_bytes", "Bytes sent in the request body", BYTES_BUCKETS, "request_bytes"),
+    ("blogger_llm_response_bytes", "Bytes received in the response body", BYTES_BUCKETS, "response_bytes"),
+    ("blogger_llm_prompt_tokens", "Prompt tokens reported by the provider", TOKENS_BUCKETS, "prompt_tokens"),
+    ("blogger_llm_completion_tokens", "Completion tokens reported by the provider", TOKENS_BUCKETS, "completion_tokens"),
+)
+
+
+class CallMetrics:
+    """Measurements of one LLM request; token counts and server timings are None when the provider did not report them."""
+
+    __slots__ = (
+        "provider", "model", "role", "status",
+        "connect_seconds", "tls_seconds", "ttfb_seconds", "total_seconds",
+        "request_bytes", "response_bytes", "prompt_tokens", "completion_tokens",
+        "load_seconds", "generation_seconds",
+    )
+
+    def __init__(self, provider: str, model: str, role: str, status: str = "ok"):
+        self.provider = provider
+        self.model = model
+        self.role = role
+        self.status = status
+        self.connect_seconds = 0.0
+        self.tls_seconds = 0.0
+        self.ttfb_seconds = 0.0
+        self.total_seconds = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.prompt_tokens = None
+        self.completion_tokens = None
+        self.load_seconds = None
+        self.generation_seconds = None
+
+    def read_timings(self, curl_client: pycurl.Curl):
+        """Copies timings and sizes from a finished transfer; call before the handle is reset or closed."""
+        connect_time = curl_client.getinfo(pycurl.CONNECT_TIME)
+        app_connect_time = curl_client.getinfo(pycurl.APPCONNECT_TIME)
+        self.connect_seconds = connect_time
+        self.tls_seconds = max(0.0, app_connect_time - connect_time) if app_connect_time > 0 else 0.0
+        self.ttfb_seconds = curl_client.getinfo(pycurl.STARTTRANSFER_TIME)
+        self.total_seconds = curl_client.getinfo(pycurl.TOTAL_TIME)
+        self.request_bytes = int(curl_client.getinfo(SIZE_UPLOAD))
+        self.response_bytes = int(curl_client.getinfo(SIZE_DOWNLOAD))
+
+    def labels(self) -> tuple:
+        return (self.provider, self.model, self.role)
+
+
+def call_status(error: Exception) -> str:
+    """Outcome label of a failed request: throttled, http_<status> or error."""
+    status = getattr(error, "status", None)
+    if status in THROTTLING_STATUSES:
+        return "throttled"
+    return f"http_{status}" if status is not None else "error"
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def format_labels(labels: dict) -> str:
+    escaped = (f'{key}="{escape_label(str(value))}"' for key, value in labels.items())
+    return "{" + ",".join(escaped) + "}"
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Aggregates CallMetrics into histograms per provider, model and role, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms: Dict[tuple, Histogram] = {}
+        self.requests: Dict[tuple, int] = {}
+        self.textfile_path = None
+        self.textfile_interval_seconds = 15.0
+        self.textfile_written_at = 0.0
+
+    def record(self, call: CallMetrics):
+        labels = call.labels()
+        with self.lock:
+            self.requests[labels + (call.status,)] = self.requests.get(labels + (call.status,), 0) + 1
+            for name, _, buckets, field in HISTOGRAMS:
+                value = getattr(call, field)
+                if value is None:
+                    continue
+                histogram = self.histograms.get((name, labels))
+                if histogram is None:
+                    histogram = Histogram(buckets)
+                    self.histograms[(name, labels)] = histogram
+                histogram.observe(value)
+            write_textfile = self.textfile_path is not None and time.monotonic() - self.textfile_written_at >= self.textfile_interval_seconds
+            if write_textfile:
+                self.textfile_written_at = time.monotonic()
+        if write_textfile:
+            self.write_textfile()
+
+    def render(self) -> str:
+        lines = []
+        with self.lock:
+            lines.append("# HELP blogger_llm_requests_total LLM requests by outcome")
+            lines.append("# TYPE blogger_llm_requests_total counter")
+            for (provider, model, role, status), count in sorted(self.requests.items()):
+                labels = format_labels({"provider": provider, "model": model, "role": role, "status": status})
+                lines.append(f"blogger_llm_requests_total{labels} {count}")
+            for name, help_text, _, _ in HISTOGRAMS:
+                series = sorted((labels, histogram) for (histogram_name, labels), histogram in self.histograms.items() if histogram_name == name)
+                if not series:
+                    continue
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for (provider, model, role), histogram in series:
+                    base = {"provider": provider, "model": model, "role": role}
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{format_labels(base | {'le': bound})} {cumulative}")
+                    lines.append(f"{name}_sum{format_labels(base)} {histogram.sum}")
+                    lines.append(f"{name}_count{format_labels(base)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str | None = None):
+        """Writes the metrics for node_exporter's textfile collector, atomically."""
+        path = path or self.textfile_path
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as textfile:
+            textfile.write(self.render())
+        os.replace(temporary_path, path)
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serves the metrics at http://host:port/metrics from a daemon thread."""
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+        return server
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    return _registry
+
+
+def export_metrics_from_env():
+    """Starts the exporters configured by METRICS_PORT and METRICS_TEXTFILE."""
+    port = os.getenv("METRICS_PORT", "")
+    if port != "":
+        _registry.serve(int(port), os.getenv("METRICS_HOST", "127.0.0.1"))
+    textfile_path = os.getenv("METRICS_TEXTFILE", "")
+    if textfile_path != "":
+        _registry.textfile_path = textfile_path
+        _registry.textfile_interval_seconds = float(os.getenv("METRICS_TEXTFILE_INTERVAL_SECONDS", "15"))
+        atexit.register(_registry.write_textfile)
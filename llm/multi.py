@@ -0,0 +1,212 @@
+import json
+import time
+from io import BytesIO
+from typing import TYPE_CHECKING, Callable
+
+import pycurl
+
+from .metrics import call_status
+from .pool import pool_for
+from .ratelimit import ResponseHeaders
+
+if TYPE_CHECKING:
+    from .llm import LLM
+
+
+class Request:
+    """One logical request, which may take several attempts."""
+
+    __slots__ = ("llm", "payload", "callback", "tokens", "attempt", "ready_at", "curl_client", "pool", "buffer", "headers", "start_time")
+
+    def __init__(self, llm: "LLM", payload: dict, callback: Callable[[dict | None, Exception | None], None]):
+        self.llm = llm
+        self.payload = payload
+        self.callback = callback
+        self.tokens = llm.estimate_request_tokens(payload)
+        self.attempt = 0
+        self.ready_at = 0.0
+        self.curl_client = None
+
+
+class Timer:
+    __slots__ = ("due", "callback")
+
+    def __init__(self, due: float, callback: Callable[[], None]):
+        self.due = due
+        self.callback = callback
+
+
+class MultiClient:
+    """Runs many LLM requests concurrently on a single thread through one pycurl CurlMulti.
+
+    Requests wait for their provider's rate limiter without blocking the loop, and failed
+    attempts are retried after a backoff according to the client's retry policy.
+    """
+
+    def __init__(self, select_timeout_seconds: float = 1.0):
+        self.multi = pycurl.CurlMulti()
+        self.select_timeout_seconds = select_timeout_seconds
+        self.requests = {}
+        # Submitted requests not yet started: held back by a rate limiter or backing off
+        self.waiting = []
+        self.timers = []
+
+    def submit(self, llm: "LLM", payload: dict, callback: Callable[[dict | None, Exception | None], None]) -> Request:
+        """Queues a request; callback(resp, error) is invoked from poll() when it completes."""
+        request = Request(llm, payload, callback)
+        self.waiting.append(request)
+        self.start_ready()
+        return request
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> Timer:
+        """Runs callback from poll() once `delay` seconds have passed, unless the timer is cancelled first."""
+        timer = Timer(time.monotonic() + delay, callback)
+        self.timers.append(timer)
+        return timer
+
+    def cancel(self, request):
+        """Aborts a request, a timer or a composite handle (anything with a cancel method) without invoking callbacks."""
+        if isinstance(request, Timer):
+            if request in self.timers:
+                self.timers.remove(request)
+            return
+        if not isinstance(request, Request):
+            request.cancel()
+            return
+        if request in self.waiting:
+            self.waiting.remove(request)
+            return
+        if self.requests.pop(request.curl_client, None) is None:
+            return
+        self.multi.remove_handle(request.curl_client)
+        request.curl_client.close()
+        request.llm.rate_limiter.abandon()
+
+    def pending(self) -> int:
+        return len(self.requests) + len(self.waiting) + len(self.timers)
+
+    def run_due_timers(self) -> float | None:
+        """Fires due timers and returns how long until the next one."""
+        now = time.monotonic()
+        due = [timer for timer in self.timers if timer.due <= now]
+        for timer in due:
+            # A callback may cancel timers that are also due
+            if timer in self.timers:
+                self.timers.remove(timer)
+                timer.callback()
+        return min((timer.due - now for timer in self.timers), default=None)
+
+    def start_ready(self) -> float | None:
+        """Starts every waiting request its limiter lets through; returns how long until the next may start."""
+        now = time.monotonic()
+        next_wait = None
+        still_waiting = []
+        for request in self.waiting:
+            wait = request.ready_at - now
+            if wait <= 0:
+                wait = request.llm.rate_limiter.try_acquire(request.tokens)
+                if wait == 0:
+                    self.start(request)
+                    continue
+            still_waiting.append(request)
+            next_wait = wait if next_wait is None else min(next_wait, wait)
+        self.waiting = still_waiting
+        return next_wait
+
+    def start(self, request: Request):
+        request.pool = pool_for(request.llm.url)
+        request.curl_client = request.pool.acquire()
+        request.buffer = BytesIO()
+        request.headers = ResponseHeaders()
+        request.start_time = time.time()
+        request.llm.prepare_request(request.curl_client, request.payload, request.buffer.write, header_function=request.headers)
+        self.requests[request.curl_client] = request
+        self.multi.add_handle(request.curl_client)
+
+    def poll(self):
+        """Starts what the limiters allow, advances all transfers, dispatches callbacks of finished ones, then waits."""
+        timeout = self.step()
+        if not timeout:
+            return
+        if not self.requests:
+            time.sleep(timeout)
+            return
+        select_started = time.monotonic()
+        if self.multi.select(timeout) == 0 and time.monotonic() - select_started < 0.001:
+            # select() returns at once while libcurl has no sockets yet (e.g. still resolving)
+            time.sleep(0.01)
+
+    def step(self) -> float | None:
+        """Does the non-blocking part of poll() and returns how long to wait for sockets or timers.
+
+        Returns None when nothing is pending and 0 when callbacks ran, so the caller should step again at once.
+        """
+        if not self.pending():
+            return None
+        next_timer = self.run_due_timers()
+        next_wait = self.start_ready()
+        if next_timer is not None:
+            next_wait = next_timer if next_wait is None else min(next_wait, next_timer)
+        finished = False
+        if self.requests:
+            while True:
+                status, _ = self.multi.perform()
+                if status != pycurl.E_CALL_MULTI_PERFORM:
+                    break
+            while True:
+                _, succeeded, failed = self.multi.info_read()
+                for curl_client in succeeded:
+                    self.finish(curl_client, None)
+                for curl_client, error_number, error_message in failed:
+                    self.finish(curl_client, pycurl.error(error_number, error_message))
+                if not succeeded and not failed:
+                    break
+                finished = True
+        if not self.pending():
+            return None
+        if finished:
+            return 0.0
+        return self.select_timeout_seconds if next_wait is None else max(0.0, min(self.select_timeout_seconds, next_wait))
+
+    def run(self):
+        while self.pending():
+            self.poll()
+
+    def finish(self, curl_client: pycurl.Curl, error: Exception | None):
+        request = self.requests.pop(curl_client, None)
+        if request is None:
+            return
+        llm = request.llm
+        self.multi.remove_handle(curl_client)
+        if error is None:
+            error = request.headers.error(request.buffer.getvalue())
+        call = llm.call_metrics(curl_client, "ok" if error is None else call_status(error))
+        if isinstance(error, pycurl.error):
+            curl_client.close()
+        else:
+            request.pool.release(curl_client)
+        if error is not None:
+            llm.record_call(call)
+            llm.rate_limiter.release(request.tokens, error=error)
+            self.retry_or_fail(request, error)
+            return
+        llm.logger.log_time_taken(time.time() - request.start_time)
+        try:
+            resp = json.loads(request.buffer.getvalue().decode('utf-8'))
+        except ValueError as decode_error:
+            llm.record_call(call)
+            llm.rate_limiter.release(request.tokens, error=decode_error)
+            request.callback(None, decode_error)
+            return
+        llm.record_call(call, resp)
+        llm.rate_limiter.release(request.tokens, used_tokens=llm.used_tokens(resp))
+        request.callback(resp, None)
+
+    def retry_or_fail(self, request: Request, error: Exception):
+        if not request.llm.retry_policy.should_retry(error, request.attempt):
+            request.callback(None, error)
+            return
+        request.ready_at = time.monotonic() + request.llm.retry_delay(error, request.attempt)
+        request.attempt += 1
+        request.curl_client = None
+        self.waiting.append(request)
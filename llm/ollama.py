@@ -1,5 +1,6 @@
 import os
 import re
+from .conversation import Conversation
 from .llm import LLM
 from pen.pen import pen
 
@@ -14,15 +15,16 @@ class Ollama(LLM):
             connection_timeout_seconds=int(os.getenv('CONNECTION_TIMEOUT_SECONDS', "15")),
             operation_timeout_seconds=int(os.getenv('OPERATION_TIMEOUT_SECONDS', "30"))
         )
-        self.history = []
         self.model_name = model_name
+        self.keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
 
-    def send_message(self, prompt):
-        conversation = {
+    def prepare_message(self, prompt, conversation: Conversation | None = None) -> dict:
+        conversation = self.conversation_for(conversation)
+        message = {
             "role": "user",
             "content": prompt
         }
-        self.history.append(conversation)
+        self.remember(message, conversation)
         
         payload = {
             "model": self.model_name,
@@ -33,10 +35,37 @@ class Ollama(LLM):
                     "role": "system",
                     "content": self.system_instruction
                 }
-            ] + self.history
+            ] + conversation.messages,
+            # Every request resets Ollama's unload timer to this, so send it even when it is the default
+            "keep_alive": self.keep_alive
         }
+        return payload
 
-        resp = self.chat(payload)
+    def load_message(self) -> dict:
+        """A chat without messages, which makes Ollama load the model and reply at once."""
+        return {"model": self.model_name, "messages": [], "keep_alive": self.keep_alive}
+
+    def prepare_stream_message(self, prompt, conversation: Conversation | None = None) -> dict:
+        payload = self.prepare_message(prompt, conversation)
+        payload["stream"] = True
+        return payload
+
+    def token_usage(self, resp: dict) -> tuple[int | None, int | None]:
+        return resp.get("prompt_eval_count"), resp.get("eval_count")
+
+    def server_timings(self, resp: dict) -> tuple[float | None, float | None]:
+        # Ollama reports durations in nanoseconds
+        load_duration = resp.get("load_duration")
+        generation_durations = [resp[key] for key in ("prompt_eval_duration", "eval_duration") if key in resp]
+        return (
+            load_duration / 1e9 if load_duration is not None else None,
+            sum(generation_durations) / 1e9 if generation_durations else None
+        )
+
+    def read_stream_event(self, event: dict) -> str:
+        return event.get("message", {}).get("content", "")
+
+    def read_response(self, resp: dict) -> str:
         content = resp["message"]["content"]
 
         content = content.strip()
@@ -58,6 +87,3 @@ class Ollama(LLM):
         self.logger.debug_block("DEBUG Ollama Response Content", content)
 
         return content
-
-    def clear_history(self):
-        self.history = []
\ No newline at end of file
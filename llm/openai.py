@@ -1,27 +1,32 @@
 import os
+from .conversation import Conversation
 from .llm import LLM
 from pen.pen import pen
 
 
+API_BASE_URL = "https://api.openai.com/v1"
+
+
 class OpenAI(LLM):
     def __init__(self, model_name: str):
         super().__init__(
             provider_name="openai",
             provider_color=pen.yellow_bright,
-            url=f"https://api.openai.com/v1/chat/completions",
+            url=f"{os.getenv('OPENAI_API_BASE_URL', API_BASE_URL)}/chat/completions",
             headers={ "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}" },
             connection_timeout_seconds=int(os.getenv('CONNECTION_TIMEOUT_SECONDS', "15")),
             operation_timeout_seconds=int(os.getenv('OPERATION_TIMEOUT_SECONDS', "30"))
         )
-        self.history = []
         self.model_name = model_name
+        self.stream_format = "sse"
 
-    def send_message(self, prompt):
-        conversation = {
+    def prepare_message(self, prompt, conversation: Conversation | None = None) -> dict:
+        conversation = self.conversation_for(conversation)
+        message = {
             "role": "user",
             "content": prompt
         }
-        self.history.append(conversation)
+        self.remember(message, conversation)
         
         payload = {
             "model": self.model_name,
@@ -30,15 +35,34 @@ class OpenAI(LLM):
                     "role": "system",
                     "content": self.system_instruction
                 }
-            ] + self.history
+            ] + conversation.messages
         }
+        if self.prompt_caching:
+            # Routes requests sharing this instruction to the same prefix cache
+            payload["prompt_cache_key"] = f"profile-{self.instruction_fingerprint()}"
+        return payload
+
+    def prepare_stream_message(self, prompt, conversation: Conversation | None = None) -> dict:
+        payload = self.prepare_message(prompt, conversation)
+        payload["stream"] = True
+        # Without this, streams carry no usage and the call's token counts go unrecorded
+        payload["stream_options"] = {"include_usage": True}
+        return payload
 
-        resp = self.chat(payload)
+    def token_usage(self, resp: dict) -> tuple[int | None, int | None]:
+        usage = resp.get("usage") or {}
+        return usage.get("prompt_tokens"), usage.get("completion_tokens")
+
+    def read_stream_event(self, event: dict) -> str:
+        if not event.get("choices"):
+            return ""
+        return event["choices"][0].get("delta", {}).get("content") or ""
+
+    def read_response(self, resp: dict) -> str:
         content = resp["choices"][0]["message"]["content"]
+        cached_tokens = resp.get("usage", {}).get("prompt_tokens_details", {}).get("cached_tokens", 0)
+        self.logger.debug(f"cached prompt tokens: {cached_tokens}")
         
         self.logger.debug_block("DEBUG OpenAI Response Content", content)
         
         return content
-
-    def clear_history(self):
-        self.history = []
\ No newline at end of file
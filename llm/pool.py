@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+from typing import Dict
+from urllib.parse import urlsplit
+
+import pycurl
+
+
+class ConnectionPool:
+    """Keeps reusable curl easy handles for one host, sharing DNS, TLS sessions and connections."""
+
+    def __init__(self, max_size: int = 4, idle_seconds: float = 60):
+        self.max_size = max_size
+        self.idle_seconds = idle_seconds
+        self.share = pycurl.CurlShare()
+        self.share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_DNS)
+        self.share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_SSL_SESSION)
+        self.share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_CONNECT)
+        self.idle = []
+        self.lock = threading.Lock()
+
+    def acquire(self) -> pycurl.Curl:
+        with self.lock:
+            self.evict_idle()
+            if self.idle:
+                curl_client, _ = self.idle.pop()
+                # reset() keeps pycurl's reference to the share, so detach it first
+                curl_client.unsetopt(pycurl.SHARE)
+                curl_client.reset()
+            else:
+                curl_client = pycurl.Curl()
+        curl_client.setopt(pycurl.SHARE, self.share)
+        return curl_client
+
+    def release(self, curl_client: pycurl.Curl):
+        with self.lock:
+            if len(self.idle) < self.max_size:
+                self.idle.append((curl_client, time.monotonic()))
+                return
+        curl_client.close()
+
+    def evict_idle(self):
+        deadline = time.monotonic() - self.idle_seconds
+        fresh = []
+        for curl_client, released_at in self.idle:
+            if released_at < deadline:
+                curl_client.close()
+            else:
+                fresh.append((curl_client, released_at))
+        self.idle = fresh
+
+    def close(self):
+        with self.lock:
+            for curl_client, _ in self.idle:
+                curl_client.close()
+            self.idle = []
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def pool_for(url: str) -> ConnectionPool:
+    """Returns the shared pool for the scheme and host of the given URL."""
+    parts = urlsplit(url)
+    key = f"{parts.scheme}://{parts.netloc}"
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(
+                max_size=int(os.getenv("CONNECTION_POOL_SIZE", "4")),
+                idle_seconds=float(os.getenv("CONNECTION_POOL_IDLE_SECONDS", "60"))
+            )
+            _pools[key] = pool
+        return pool
+
+
+def close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
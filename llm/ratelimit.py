@@ -0,0 +1,220 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict
+
+import pycurl
+
+
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+# Statuses that mean the provider wants less traffic, not just that one request failed
+THROTTLING_STATUSES = (429, 503)
+RETRYABLE_CURL_ERRORS = (pycurl.E_OPERATION_TIMEDOUT, pycurl.E_GOT_NOTHING, pycurl.E_SEND_ERROR, pycurl.E_RECV_ERROR)
+
+
+class HTTPStatusError(Exception):
+    """A provider answered with an HTTP error status."""
+
+    def __init__(self, status: int, body: str, retry_after: float | None = None):
+        super().__init__(f"HTTP {status}: {body[:200]}")
+        self.status = status
+        self.body = body
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: str) -> float | None:
+    """Reads a Retry-After value given in seconds or as an HTTP date."""
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class ResponseHeaders:
+    """curl header callback keeping the status and Retry-After of the final response."""
+
+    def __init__(self):
+        self.status = None
+        self.retry_after = None
+
+    def __call__(self, line: bytes):
+        text = line.decode("iso-8859-1").strip()
+        if text.startswith("HTTP/"):
+            # A new status line (after 100 Continue or a redirect) starts a new response
+            parts = text.split()
+            self.status = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else None
+            self.retry_after = None
+        elif ":" in text:
+            name, value = text.split(":", 1)
+            if name.strip().lower() == "retry-after":
+                self.retry_after = parse_retry_after(value.strip())
+
+    def error(self, body: bytes) -> HTTPStatusError | None:
+        if self.status is None or self.status < 400:
+            return None
+        return HTTPStatusError(self.status, body.decode("utf-8", errors="replace"), self.retry_after)
+
+
+def is_throttling(error: Exception) -> bool:
+    return isinstance(error, HTTPStatusError) and error.status in THROTTLING_STATUSES
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, HTTPStatusError):
+        return error.status in RETRYABLE_STATUSES
+    return isinstance(error, pycurl.error) and error.args[0] in RETRYABLE_CURL_ERRORS
+
+
+class TokenBucket:
+    """Refills `per_minute` units a minute up to a burst of one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self.available = per_minute
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self.refill(now)
+        # A request larger than the whole bucket goes through once the bucket is full
+        amount = min(amount, self.capacity)
+        return 0.0 if self.available >= amount else (amount - self.available) / self.rate
+
+    def take(self, amount: float):
+        self.available -= amount
+
+
+class RateLimiter:
+    """Request and token budgets plus an adaptive concurrency limit, shared by every client of one provider.
+
+    The concurrency limit grows by one per limit's worth of successful requests and halves
+    whenever the provider throttles (additive increase, multiplicative decrease). A throttled
+    response with Retry-After pauses the whole provider for that long. Zero means unlimited.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0, max_concurrency: int = 0, min_concurrency: int = 1):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.max_concurrency = max_concurrency if max_concurrency > 0 else None
+        self.min_concurrency = max(1, min_concurrency)
+        # None until a maximum is configured or the provider first throttles
+        self.concurrency_limit = float(self.max_concurrency) if self.max_concurrency else None
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.condition = threading.Condition()
+
+    def try_acquire(self, tokens: int = 0) -> float:
+        """Reserves a slot and budget for one request and returns 0, or returns how long to wait before trying again."""
+        with self.condition:
+            now = time.monotonic()
+            wait = max(0.0, self.blocked_until - now)
+            if self.concurrency_limit is not None and self.in_flight >= int(self.concurrency_limit):
+                # Woken early by release(); this only bounds the wait of callers that poll
+                wait = max(wait, 0.05)
+            if self.requests is not None:
+                wait = max(wait, self.requests.wait_time(1, now))
+            if self.tokens is not None:
+                wait = max(wait, self.tokens.wait_time(tokens, now))
+            if wait > 0:
+                return wait
+            if self.requests is not None:
+                self.requests.take(1)
+            if self.tokens is not None:
+                self.tokens.take(tokens)
+            self.in_flight += 1
+            return 0.0
+
+    def acquire(self, tokens: int = 0):
+        """Blocks until try_acquire succeeds."""
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0:
+                return
+            with self.condition:
+                self.condition.wait(wait)
+
+    def release(self, reserved_tokens: int = 0, used_tokens: int | None = None, error: Exception | None = None):
+        """Returns the slot taken by try_acquire and adapts to how the request went."""
+        with self.condition:
+            self.in_flight = max(0, self.in_flight - 1)
+            if self.tokens is not None and used_tokens is not None:
+                # Settle the estimate against what the provider actually counted
+                self.tokens.take(used_tokens - reserved_tokens)
+            if error is not None and is_throttling(error):
+                current = self.concurrency_limit if self.concurrency_limit is not None else self.in_flight + 1
+                self.concurrency_limit = max(self.min_concurrency, current / 2)
+                if error.retry_after:
+                    self.blocked_until = max(self.blocked_until, time.monotonic() + error.retry_after)
+            elif error is None and self.concurrency_limit is not None:
+                self.concurrency_limit += 1 / self.concurrency_limit
+                if self.max_concurrency is not None:
+                    self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit)
+            self.condition.notify_all()
+
+    def abandon(self):
+        """Returns the slot of a request cancelled before it finished; says nothing about the provider, so the limit stays."""
+        with self.condition:
+            self.in_flight = max(0, self.in_flight - 1)
+            self.condition.notify_all()
+
+
+class RetryPolicy:
+    """Retries throttling, server errors and dropped transfers with jittered exponential backoff."""
+
+    def __init__(self, max_retries: int = 4, base_seconds: float = 0.5, max_seconds: float = 30.0):
+        self.max_retries = max_retries
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+
+    def should_retry(self, error: Exception, attempt: int) -> bool:
+        return attempt < self.max_retries and is_retryable(error)
+
+    def delay(self, error: Exception, attempt: int) -> float:
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            # Honor the provider, spreading clients out a little so they do not return in lockstep
+            return retry_after + random.uniform(0, self.base_seconds)
+        return random.uniform(0, min(self.max_seconds, self.base_seconds * 2 ** attempt))
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter_for(provider_name: str) -> RateLimiter:
+    """Returns the limiter shared by every client of a provider, configured by <PROVIDER>_REQUESTS_PER_MINUTE,
+    <PROVIDER>_TOKENS_PER_MINUTE and <PROVIDER>_MAX_CONCURRENCY."""
+    with _limiters_lock:
+        limiter = _limiters.get(provider_name)
+        if limiter is None:
+            prefix = provider_name.upper()
+            limiter = RateLimiter(
+                requests_per_minute=float(os.getenv(f"{prefix}_REQUESTS_PER_MINUTE", "0")),
+                tokens_per_minute=float(os.getenv(f"{prefix}_TOKENS_PER_MINUTE", "0")),
+                max_concurrency=int(os.getenv(f"{prefix}_MAX_CONCURRENCY", "0"))
+            )
+            _limiters[provider_name] = limiter
+        return limiter
+
+
+def reset_limiters():
+    with _limiters_lock:
+        _limiters.clear()
+
+
+def retry_policy_from_env() -> RetryPolicy:
+    return RetryPolicy(
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", "4")),
+        base_seconds=float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5")),
+        max_seconds=float(os.getenv("LLM_RETRY_MAX_SECONDS", "30"))
+    )
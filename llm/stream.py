@@ -0,0 +1,35 @@
+import codecs
+import json
+
+
+class StreamDecoder:
+    """Splits a streamed HTTP body into JSON events, either NDJSON lines or SSE `data:` lines."""
+
+    def __init__(self, stream_format: str = "ndjson"):
+        self.stream_format = stream_format
+        self.text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self.pending = ""
+
+    def feed(self, data: bytes) -> list[dict]:
+        self.pending += self.text_decoder.decode(data)
+        *lines, self.pending = self.pending.split("\n")
+        return self.parse_lines(lines)
+
+    def close(self) -> list[dict]:
+        lines = [self.pending + self.text_decoder.decode(b"", final=True)]
+        self.pending = ""
+        return self.parse_lines(lines)
+
+    def parse_lines(self, lines: list[str]) -> list[dict]:
+        events = []
+        for line in lines:
+            line = line.strip()
+            if self.stream_format == "sse":
+                if not line.startswith("data:"):
+                    continue
+                line = line[5:].strip()
+                if line == "[DONE]":
+                    continue
+            if line:
+                events.append(json.loads(line))
+        return events
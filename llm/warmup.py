@@ -0,0 +1,87 @@
+import atexit
+import threading
+import time
+
+from logger.logger import Logger
+from pen.pen import pen
+from .llm import LLM
+from .multi import MultiClient
+from .ollama import Ollama
+
+
+# Ollama keeps a model with a negative keep_alive loaded until a request says otherwise
+PINNED_KEEP_ALIVE = -1
+
+_pinned: list[tuple[Ollama, str | int]] = []
+_pinned_lock = threading.Lock()
+_release_registered = False
+
+
+def ollama_clients(llms: list[LLM]) -> list[Ollama]:
+    """Ollama clients among `llms`, including the members of hedged clients."""
+    clients = []
+    for llm in llms:
+        if isinstance(llm, Ollama):
+            clients.append(llm)
+        clients.extend(ollama_clients(getattr(llm, "members", [])))
+    return clients
+
+
+def load_models(clients: list[Ollama], logger: Logger) -> dict[str, float]:
+    """Asks Ollama to load every distinct model at once and returns the seconds each took; failures are only logged."""
+    models = {(client.url, client.model_name): client for client in clients}
+    multi = MultiClient()
+    load_seconds = {}
+    start_time = time.monotonic()
+    for client in models.values():
+        def loaded(resp: dict | None, error: Exception | None, client: Ollama = client):
+            if error is not None:
+                logger.log(f"could not load {pen.yellow_bright(client.model_name)}: {pen.red(str(error))}")
+                return
+            load_seconds[client.model_name] = time.monotonic() - start_time
+        multi.submit(client, client.load_message(), loaded)
+    multi.run()
+    return load_seconds
+
+
+def preload_models(llms: list[LLM], pin: bool = True, log_level: str = "INFO") -> dict[str, float]:
+    """Loads the Ollama models behind `llms` concurrently, so no agent's first call pays for the load.
+
+    With `pin`, the clients ask Ollama to keep their models loaded until release_models(),
+    which runs at exit, instead of unloading them after OLLAMA_KEEP_ALIVE of idling.
+    """
+    global _release_registered
+    clients = ollama_clients(llms)
+    if not clients:
+        return {}
+    logger = Logger("warmup", pen.magenta_bright, log_level)
+    if pin:
+        with _pinned_lock:
+            for client in clients:
+                if client.keep_alive != PINNED_KEEP_ALIVE:
+                    _pinned.append((client, client.keep_alive))
+                    client.keep_alive = PINNED_KEEP_ALIVE
+            if not _release_registered:
+                atexit.register(release_models)
+                _release_registered = True
+    logger.log(f"Loading {len({(client.url, client.model_name) for client in clients})} Ollama models ...")
+    load_seconds = load_models(clients, logger)
+    for model_name, seconds in load_seconds.items():
+        logger.log(f"{pen.yellow_bright(model_name)} ready after {logger.format_elapsed_time(seconds)}")
+    return load_seconds
+
+
+def release_models():
+    """Restores the keep_alive of pinned clients and tells Ollama, so their models unload after it as usual."""
+    with _pinned_lock:
+        pinned = list(_pinned)
+        _pinned.clear()
+    if not pinned:
+        return
+    for client, keep_alive in pinned:
+        client.keep_alive = keep_alive
+    multi = MultiClient()
+    for client in {(client.url, client.model_name): client for client, _ in pinned}.values():
+        # A failed release only leaves the model loaded; the server stays usable
+        multi.submit(client, client.load_message(), lambda resp, error: None)
+    multi.run()
@@ -1,9 +1,38 @@
-import os
+import threading
+from typing import Callable
 
-from pen.pen import pen
+from .sink import LogRecord, Sink, sink_from_env
+
+
+Message = str | Callable[[], str]
+
+_sink: Sink | None = None
+_sink_lock = threading.Lock()
+
+
+def get_sink() -> Sink:
+    global _sink
+    if _sink is None:
+        # Agents log from worker threads; only one of them may build the sink
+        with _sink_lock:
+            if _sink is None:
+                _sink = sink_from_env()
+    return _sink
+
+
+def set_sink(sink: Sink | None):
+    """Routes every logger to the given sink; None goes back to the one configured by the environment."""
+    global _sink
+    _sink = sink
+
+
+def resolve(message: Message) -> str:
+    return message() if callable(message) else message
 
 
 class Logger:
+    """Namespaced logger. Messages may be zero-argument callables, which are only built when the level is enabled."""
+
     def __init__(self, namespace: str, color: callable, log_level: str = "INFO"):
         self.namespace = namespace
         self.color = color
@@ -11,27 +40,29 @@ class Logger:
         
     def set_level(self, level: str):
         self.log_level = level.upper()
+
+    def is_debug(self) -> bool:
+        return self.log_level == "DEBUG"
+
+    def emit(self, level: str, message: Message, title: str | None = None):
+        get_sink().emit(LogRecord(self.namespace, self.color, level, resolve(message), title))
         
-    def debug(self, message: str):
-        if self.log_level == "DEBUG":
-            print(f"[{self.color(self.namespace)}] {pen.gray(message)}", flush=True)
+    def debug(self, message: Message):
+        if self.is_debug():
+            self.emit("DEBUG", message)
     
-    def debug_block(self, title: str, content: str):
-        if self.log_level == "DEBUG":
-            line_length = len(title) + len(self.namespace) + 3
-            block_delimiter = f"{pen.gray('=' * line_length)}"
-            print(f"[{self.color(self.namespace)}] {title}\n{block_delimiter}\n{pen.gray(content)}\n{block_delimiter}", flush=True)
+    def debug_block(self, title: str, content: Message):
+        if self.is_debug():
+            self.emit("DEBUG", content, title)
 
-    def log(self, message: str):
-        print(f"[{self.color(self.namespace)}] {message}", flush=True)
+    def log(self, message: Message):
+        self.emit("INFO", message)
 
-    def log_block(self, title: str, content: str):
-        line_length = len(title) + len(self.namespace) + 3
-        block_delimiter = '=' * line_length
-        print(f"[{self.color(self.namespace)}] {title}\n{block_delimiter}\n{content}\n{block_delimiter}", flush=True)
+    def log_block(self, title: str, content: Message):
+        self.emit("INFO", content, title)
 
     def log_time_taken(self, time_taken_in_second: float):
-        print(f"[{self.color(self.namespace)}] time taken {self.format_elapsed_time(time_taken_in_second)}", flush=True)
+        self.emit("INFO", lambda: f"time taken {self.format_elapsed_time(time_taken_in_second)}")
 
     def format_elapsed_time(self, seconds: float):
         if seconds < 60:
@@ -0,0 +1,152 @@
+import atexit
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import traceback
+from abc import ABC, abstractmethod
+from typing import Callable
+
+from pen.pen import pen
+
+
+class LogRecord:
+    __slots__ = ("created", "namespace", "color", "level", "message", "title")
+
+    def __init__(self, namespace: str, color: Callable[[str], str], level: str, message: str, title: str | None = None):
+        self.created = time.time()
+        self.namespace = namespace
+        self.color = color
+        self.level = level
+        self.message = message
+        self.title = title
+
+
+class Sink(ABC):
+    @abstractmethod
+    def emit(self, record: LogRecord):
+        pass
+
+    def flush(self):
+        pass
+
+
+class ConsoleSink(Sink):
+    """Colored, human readable output on stdout."""
+
+    def format(self, record: LogRecord) -> str:
+        prefix = f"[{record.color(record.namespace)}]"
+        debug = record.level == "DEBUG"
+        if record.title is None:
+            return f"{prefix} {pen.gray(record.message) if debug else record.message}"
+        line_length = len(record.title) + len(record.namespace) + 3
+        block_delimiter = pen.gray("=" * line_length) if debug else "=" * line_length
+        content = pen.gray(record.message) if debug else record.message
+        return f"{prefix} {record.title}\n{block_delimiter}\n{content}\n{block_delimiter}"
+
+    def emit(self, record: LogRecord):
+        print(self.format(record), flush=True)
+
+
+ANSI_ESCAPE_PATTERN = re.compile(r"\x1b\[[0-9;]*m")
+
+
+class JsonLinesSink(Sink):
+    """One JSON object per record, without ANSI colors, for files, pipes and log collectors.
+
+    With `autoflush` every record is flushed as it is written, so a collector reading the pipe
+    sees it at once; BufferedSink turns it off and flushes once per batch instead.
+    """
+
+    def __init__(self, stream=None, autoflush: bool = True):
+        self.stream = stream
+        self.autoflush = autoflush
+
+    def format(self, record: LogRecord) -> str:
+        entry = {"time": record.created, "level": record.level, "namespace": record.namespace}
+        if record.title is not None:
+            entry["title"] = record.title
+        # Callers highlight values with pen; those escape codes are noise outside a terminal
+        entry["message"] = ANSI_ESCAPE_PATTERN.sub("", record.message)
+        return json.dumps(entry, ensure_ascii=False)
+
+    def emit(self, record: LogRecord):
+        stream = self.stream or sys.stdout
+        stream.write(self.format(record) + "\n")
+        if self.autoflush:
+            stream.flush()
+
+    def flush(self):
+        (self.stream or sys.stdout).flush()
+
+
+class BufferedSink(Sink):
+    """Hands records to a background thread that writes them in batches through another sink."""
+
+    def __init__(self, sink: Sink, batch_size: int = 256):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.records = queue.SimpleQueue()
+        self.pending = 0
+        self.written = threading.Condition()
+        self.thread = threading.Thread(target=self.run, name="log-writer", daemon=True)
+        self.thread.start()
+        atexit.register(self.flush)
+
+    def emit(self, record: LogRecord):
+        with self.written:
+            self.pending += 1
+        self.records.put(record)
+
+    def run(self):
+        while True:
+            batch = [self.records.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.records.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                for record in batch:
+                    self.sink.emit(record)
+                self.sink.flush()
+            except Exception:
+                # A broken sink must not kill the writer thread and leave flush() waiting forever
+                traceback.print_exc()
+            finally:
+                with self.written:
+                    self.pending -= len(batch)
+                    self.written.notify_all()
+
+    def flush(self):
+        """Blocks until every queued record has been written."""
+        with self.written:
+            self.written.wait_for(lambda: self.pending == 0)
+
+
+class BatchingConsoleSink(ConsoleSink):
+    """ConsoleSink variant that leaves flushing to its caller."""
+
+    def emit(self, record: LogRecord):
+        sys.stdout.write(self.format(record) + "\n")
+
+    def flush(self):
+        sys.stdout.flush()
+
+
+def sink_from_env() -> Sink:
+    """LOG_FORMAT picks text, json or auto (json when stdout is not a terminal); LOG_BUFFERED moves writes to a thread."""
+    log_format = os.getenv("LOG_FORMAT", "text").lower()
+    if log_format == "auto":
+        log_format = "text" if sys.stdout.isatty() else "json"
+    buffered = os.getenv("LOG_BUFFERED", "false").upper() == "TRUE"
+    if log_format == "json":
+        sink = JsonLinesSink(autoflush=not buffered)
+    elif log_format == "text":
+        sink = BatchingConsoleSink() if buffered else ConsoleSink()
+    else:
+        raise ValueError(f"Unsupported LOG_FORMAT: {log_format}")
+    return BufferedSink(sink) if buffered else sink
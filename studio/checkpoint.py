@@ -0,0 +1,72 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict
+
+
+class CheckpointStore:
+    """Latest state of each Studio run in SQLite, keyed by run id."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS checkpoints (
+                run_id TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        self.connection.commit()
+
+    def save(self, run_id: str, state: dict):
+        material = json.dumps(state, ensure_ascii=False)
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO checkpoints (run_id, state, updated_at) VALUES (?, ?, ?)",
+                (run_id, material, time.time())
+            )
+            self.connection.commit()
+
+    def load(self, run_id: str) -> dict | None:
+        with self.lock:
+            row = self.connection.execute("SELECT state FROM checkpoints WHERE run_id = ?", (run_id,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def delete(self, run_id: str):
+        with self.lock:
+            self.connection.execute("DELETE FROM checkpoints WHERE run_id = ?", (run_id,))
+            self.connection.commit()
+
+    def run_ids(self) -> list[str]:
+        """Run ids, most recently updated first."""
+        with self.lock:
+            rows = self.connection.execute("SELECT run_id FROM checkpoints ORDER BY updated_at DESC").fetchall()
+        return [row[0] for row in rows]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+_stores: Dict[str, CheckpointStore] = {}
+_stores_lock = threading.Lock()
+
+
+def checkpoint_store_from_env() -> CheckpointStore | None:
+    """Returns the store configured by STUDIO_CHECKPOINT_PATH, shared by every studio, or None when unset."""
+    path = os.getenv("STUDIO_CHECKPOINT_PATH", "")
+    if path == "":
+        return None
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = CheckpointStore(path)
+            _stores[path] = store
+        return store
@@ -1,39 +1,148 @@
-import json
+import os
+
+from llm.conversation import Conversation
 from llm.llm import LLM
-from extractor.section import extract_section
+from extractor.section import extract_sections
 from pen.pen import pen
 from logger.logger import Logger
-from extractor.json_object import extract_json_objects
+from extractor.json_object import parse_json_objects
+from .sections import DraftSection, SectionReview, split_sections
+from .steps import Prompt, Steps, run_steps, run_steps_async
 
 
 class EditorAgent():
-    def __init__(self, llm: LLM, log_level: str = "INFO"):
+    def __init__(self, llm: LLM, log_level: str = "INFO", review_mode: str | None = None):
         self.llm = llm
+        self.conversation = Conversation()
         self.logger = Logger("editor", pen.green_bright, log_level)
+        # "full" reviews the whole draft every round, "incremental" only the sections changed since the last review
+        self.review_mode = review_mode or os.getenv("EDITOR_REVIEW_MODE", "full")
+        if self.review_mode not in ("full", "incremental"):
+            raise ValueError(f"Unsupported editor review mode: {self.review_mode}")
+        self.section_reviews: dict[str, SectionReview] = {}
 
     def name(self) -> str:
         return self.llm.model_name
 
+    def clone(self) -> "EditorAgent":
+        """Returns an agent sharing this one's LLM client but with a conversation of its own."""
+        return EditorAgent(self.llm, self.logger.log_level, self.review_mode)
+
+    def clear_history(self):
+        self.conversation = Conversation()
+        self.section_reviews = {}
+
     def review_content(self, content: str) -> dict:
+        return run_steps(self.review_content_steps(content))
+
+    async def review_content_async(self, content: str) -> dict:
+        return await run_steps_async(self.review_content_steps(content))
+
+    def review_content_steps(self, content: str) -> Steps:
+        if self.review_mode == "incremental":
+            return (yield from self.review_sections_steps(content))
         self.logger.log("Reviewing content draft ...")
         entry_submission = f"""The content draft below has been submitted in JSON format. Please review the following content, focusing on title and body, and provide your detailed feedback and suggested edits to enhance its quality:
 START OF CONTENT DRAFT--------------
 {content}
 END OF CONTENT DRAFT----------------"""
         
-        feedback = self.llm.send_message(entry_submission)
-        
-        score_json_str = extract_section(feedback, "FEEDBACK JSON")
+        feedback = yield Prompt(self.llm, entry_submission, conversation=self.conversation)
+        return self.parse_feedback(feedback)
+
+    def parse_feedback(self, feedback: str) -> dict:
+        sections = extract_sections(feedback)
+        score_json_str = sections.get("FEEDBACK JSON", "")
         if score_json_str == "":
-            score_json = extract_json_objects(feedback)
+            score_json = parse_json_objects(feedback, first_only=True)
         else:
-            score_json = extract_json_objects(score_json_str)
-        overall_score = extract_section(feedback, "OVERALL SCORE")
-        suggested_feedback = extract_section(feedback, "SUGGESTED FEEDBACK")
+            score_json = parse_json_objects(score_json_str, first_only=True)
+        overall_score = sections.get("OVERALL SCORE", "")
+        suggested_feedback = sections.get("SUGGESTED FEEDBACK", "")
         
         result = {
-            "score": json.loads(score_json[0]),
+            "score": score_json[0],
             "overall_score": overall_score,
             "suggested_feedback": suggested_feedback
         }
         return result
+
+    def review_sections_steps(self, content: str) -> Steps:
+        """Reviews only the sections whose text changed since they were last scored, then merges cached and fresh scores.
+
+        The result has the same shape as a full review. Sections the editor did not score
+        individually take the score of the whole reply. Only the first review goes into the
+        editor's conversation; later ones are sent on their own, with the unchanged sections
+        summarized, so their input does not grow with every round.
+        """
+        sections = split_sections(content)
+        changed = [section for section in sections if section.digest not in self.section_reviews]
+        if not changed:
+            self.logger.log("No section changed since the last review, reusing its scores ...")
+            return self.merge_section_reviews(sections, None, [])
+
+        section_scores_format = '"sections": [{"id": "S1", "flawless": true/false, "average_score": float out of 5, "feedback": "short note"}, ...]'
+        if len(changed) == len(sections):
+            self.logger.log(f"Reviewing content draft ({len(sections)} sections) ...")
+            draft = "\n\n".join(f"[{section.id}]\n{section.text}" for section in sections)
+            submission = f"""The content draft below has been submitted in JSON format, split into sections labelled [S1], [S2], and so on. Please review the following content, focusing on title and body, and provide your detailed feedback and suggested edits to enhance its quality. In the FEEDBACK JSON, besides flawless and average_score for the whole draft, add {section_scores_format} scoring every section on its own:
+START OF CONTENT DRAFT--------------
+{draft}
+END OF CONTENT DRAFT----------------"""
+        else:
+            self.logger.log(f"Reviewing {len(changed)} of {len(sections)} sections changed since the last review ...")
+            unchanged = "\n".join(self.summarize_section(section) for section in sections if section not in changed)
+            draft = "\n\n".join(f"[{section.id}]\n{section.text}" for section in changed)
+            submission = f"""The content draft has been revised. Only the changed sections are submitted below, labelled [S1], [S2], and so on by their position in the draft. The other sections were already reviewed and are unchanged:
+{unchanged}
+
+Please review the changed sections in the context of the whole draft, and provide your detailed feedback and suggested edits to enhance their quality. In the FEEDBACK JSON, flawless and average_score are for the changed sections; add {section_scores_format} scoring each changed section on its own:
+START OF CONTENT DRAFT--------------
+{draft}
+END OF CONTENT DRAFT----------------"""
+
+        conversation = self.conversation if not self.section_reviews else Conversation()
+        feedback = yield Prompt(self.llm, submission, conversation=conversation)
+        result = self.parse_feedback(feedback)
+        reply_score = result["score"]
+        section_scores = {entry.get("id"): entry for entry in reply_score.get("sections", []) if isinstance(entry, dict)}
+        for section in changed:
+            entry = section_scores.get(section.id, {})
+            self.section_reviews[section.digest] = SectionReview(
+                float(entry.get("average_score", reply_score["average_score"])),
+                bool(entry.get("flawless", reply_score["flawless"])),
+                str(entry.get("feedback", ""))
+            )
+        return self.merge_section_reviews(sections, result, changed)
+
+    def saved_section_reviews(self) -> dict[str, list]:
+        """Section scores in a JSON-friendly form, for checkpoints."""
+        return {digest: [review.average_score, review.flawless, review.feedback] for digest, review in self.section_reviews.items()}
+
+    def restore_section_reviews(self, saved: dict[str, list]):
+        self.section_reviews = {digest: SectionReview(*values) for digest, values in saved.items()}
+
+    def summarize_section(self, section: DraftSection) -> str:
+        review = self.section_reviews[section.digest]
+        first_line = next((line for line in section.text.splitlines()[1:] if line.strip()), "")
+        verdict = "flawless" if review.flawless else f"scored {review.average_score}"
+        return f"- [{section.id}] {section.heading} ({verdict}): {first_line[:100]}"
+
+    def merge_section_reviews(self, sections: list[DraftSection], result: dict | None, changed: list[DraftSection]) -> dict:
+        """Combines the reviews of every section into one result, weighting scores by section length."""
+        reviews = [self.section_reviews[section.digest] for section in sections]
+        total_length = sum(len(section.text) for section in sections) or 1
+        average_score = sum(review.average_score * len(section.text) for section, review in zip(sections, reviews)) / total_length
+        flawless = all(review.flawless for review in reviews)
+        # Notes on sections left as they were still apply
+        carried_feedback = "\n".join(
+            f"- {section.heading}: {review.feedback}"
+            for section, review in zip(sections, reviews)
+            if review.feedback and not review.flawless and section not in changed
+        )
+        suggested_feedback = "\n".join(part for part in ((result or {}).get("suggested_feedback", ""), carried_feedback) if part)
+        return {
+            "score": {"flawless": flawless, "average_score": round(average_score, 2)},
+            "overall_score": (result or {}).get("overall_score", "") or f"Average score across sections: {round(average_score, 2)}",
+            "suggested_feedback": suggested_feedback or "No suggested edits."
+        }
@@ -0,0 +1,43 @@
+import os
+
+from llm.factory import use_model
+from llm.history import history_policy_from_env
+from llm.llm import LLM
+from profiles.profiles import profiles
+from .editor_agent import EditorAgent
+from .marketer_agent import MarketerAgent
+from .studio import Studio
+from .writer_agent import WriterAgent
+
+
+def role_model(role: str, model: str | None = None) -> LLM:
+    """Creates the LLM for a role, from `model` or <ROLE>_LLM, with the role's profile and history policy."""
+    profile_name = {"writer": "alice", "editor": "bob", "marketer": "carol"}[role]
+    llm = use_model(model or os.getenv(f"{role.upper()}_LLM", "ollama://llama2:13b"))
+    llm.with_instruction(profiles[profile_name].instruction())
+    llm.with_history_policy(history_policy_from_env(role))
+    llm.with_role(role)
+    return llm
+
+
+def build_studio(
+    writer_model: str | None = None,
+    editor_model: str | None = None,
+    marketer_model: str | None = None,
+    log_level: str = "INFO"
+) -> Studio:
+    """Builds a studio from the environment; each model defaults to its <ROLE>_LLM setting."""
+    candidate_writers = [
+        WriterAgent(role_model("writer", candidate_model.strip()), log_level)
+        for candidate_model in filter(None, os.getenv("WRITER_CANDIDATE_LLMS", "").split(","))
+    ]
+    studio = Studio(
+        writer=WriterAgent(role_model("writer", writer_model), log_level),
+        editor=EditorAgent(role_model("editor", editor_model), log_level),
+        marketer=MarketerAgent(role_model("marketer", marketer_model), log_level),
+        log_level=log_level,
+        candidate_writers=candidate_writers
+    )
+    if os.getenv("OLLAMA_PRELOAD", "true").upper() == "TRUE":
+        studio.warm_up()
+    return studio
@@ -1,26 +1,44 @@
-import json
+from llm.conversation import Conversation
 from llm.llm import LLM
-from extractor.json_object import extract_json_objects
+from extractor.json_object import parse_json_objects
 from logger.logger import Logger
 from pen.pen import pen
+from .steps import Prompt, Steps, run_steps, run_steps_async
 
 
 class MarketerAgent():
     def __init__(self, llm: LLM, log_level: str = "INFO"):
         self.llm = llm
+        self.conversation = Conversation()
         self.logger = Logger("marketer", pen.magenta_bright, log_level)
     
     def name(self) -> str:
         return self.llm.model_name
 
+    def clone(self) -> "MarketerAgent":
+        """Returns an agent sharing this one's LLM client but with a conversation of its own."""
+        return MarketerAgent(self.llm, self.logger.log_level)
+
+    def clear_history(self):
+        self.conversation = Conversation()
+
     def create_metadata(self, content) -> dict:
+        return run_steps(self.create_metadata_steps(content))
+
+    async def create_metadata_async(self, content) -> dict:
+        return await run_steps_async(self.create_metadata_steps(content))
+
+    def create_metadata_steps(self, content) -> Steps:
         self.logger.log("Creating metadata for content ...")
-        resp = self.llm.send_message(
+        resp = yield Prompt(
+            self.llm,
             f"""Generate a metadata for the following content draft, following the PROFESSIONAL CONTENT MANDATE, and OUTPUT CONSTRAINTS provided in your system instructions:
 
 START OF CONTENT DRAFT--------------
 {content}
-END OF CONTENT DRAFT----------------""")
-        json_data = extract_json_objects(resp)
+END OF CONTENT DRAFT----------------""",
+            conversation=self.conversation
+        )
+        json_data = parse_json_objects(resp, first_only=True)
 
-        return json.loads(json_data[0])
+        return json_data[0]
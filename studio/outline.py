@@ -0,0 +1,78 @@
+import re
+
+
+HEADING_PATTERN = re.compile(r"^(?P<level>#{1,2})\s+(?P<text>.+?)\s*#*\s*$")
+KEYWORD_PATTERN = re.compile(r"^\**PRIMARY KEYWORD\**\s*:\**\s*(?P<keyword>.+)$", re.IGNORECASE)
+
+
+class OutlineSection:
+    __slots__ = ("heading", "notes")
+
+    def __init__(self, heading: str, notes: list[str] | None = None):
+        self.heading = heading
+        self.notes = notes or []
+
+
+class Outline:
+    """Title, primary keyword and ## sections planned for an article, each with notes on what it covers."""
+
+    __slots__ = ("title", "primary_keyword", "sections")
+
+    def __init__(self, title: str, primary_keyword: str, sections: list[OutlineSection]):
+        self.title = title
+        self.primary_keyword = primary_keyword
+        self.sections = sections
+
+    def render(self) -> str:
+        lines = [f"# {self.title}", f"PRIMARY KEYWORD: {self.primary_keyword}"]
+        for section in self.sections:
+            lines.append(f"## {section.heading}")
+            lines.extend(f"- {note}" for note in section.notes)
+        return "\n".join(lines)
+
+    def join(self, bodies: list[str]) -> str:
+        """Assembles the article from one body per section, in outline order."""
+        parts = [f"# {self.title}"]
+        for section, body in zip(self.sections, bodies):
+            parts.append(f"## {section.heading}\n\n{strip_heading(body, section.heading)}")
+        return "\n\n".join(parts)
+
+
+def parse_outline(text: str, min_sections: int = 2) -> Outline:
+    """Reads a "# title" line, a "PRIMARY KEYWORD:" line and "## heading" lines, each followed by "- note" lines."""
+    title, primary_keyword, sections = None, "", []
+    for line in text.splitlines():
+        line = line.strip()
+        heading = HEADING_PATTERN.match(line)
+        keyword = KEYWORD_PATTERN.match(line)
+        if heading is not None and heading.group("level") == "#":
+            title = heading.group("text")
+        elif heading is not None:
+            sections.append(OutlineSection(heading.group("text")))
+        elif keyword is not None:
+            primary_keyword = keyword.group("keyword").strip()
+        elif line.startswith(("-", "*")) and sections:
+            sections[-1].notes.append(line.lstrip("-* ").strip())
+    if title is None:
+        raise ValueError("Outline has no # title")
+    if len(sections) < min_sections:
+        raise ValueError(f"Outline has {len(sections)} sections, expected at least {min_sections}")
+    return Outline(title, primary_keyword, sections)
+
+
+def find_primary_keyword(text: str) -> str:
+    """Returns the keyword of the first "PRIMARY KEYWORD:" line, bulleted or not, or "" when there is none."""
+    for line in text.splitlines():
+        keyword = KEYWORD_PATTERN.match(line.strip().lstrip("-* "))
+        if keyword is not None:
+            return keyword.group("keyword").strip().strip("*").strip()
+    return ""
+
+
+def strip_heading(body: str, heading: str) -> str:
+    """Drops a leading heading line the model repeated, since join() adds the outline's own."""
+    body = body.strip()
+    first_line, _, rest = body.partition("\n")
+    if first_line.startswith("#") and first_line.lstrip("#").strip().lower() == heading.lower():
+        return rest.strip()
+    return body
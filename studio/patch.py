@@ -0,0 +1,67 @@
+import re
+
+
+EDIT_BLOCK_PATTERN = re.compile(r"^<{5,} SEARCH[ \t]*\n(?P<search>.*?)\n?^={5,}[ \t]*\n(?P<replace>.*?)\n?^>{5,} REPLACE[ \t]*$", re.DOTALL | re.MULTILINE)
+
+# How to ask a model for edits that parse_edits() understands
+EDIT_INSTRUCTIONS = """Reply with the changes only, as one or more edit blocks in a section starting with a line of **START OF EDITS**. Each edit block has this form, where the SEARCH text is copied exactly from the draft, long enough to occur only once, and the REPLACE text takes its place:
+
+<<<<<<< SEARCH
+exact text from the draft
+=======
+revised text
+>>>>>>> REPLACE"""
+
+
+class PatchError(ValueError):
+    """Edits that cannot be applied to the draft unambiguously."""
+
+
+class Edit:
+    """Replace the one occurrence of `search` in the draft with `replace`."""
+
+    __slots__ = ("search", "replace")
+
+    def __init__(self, search: str, replace: str):
+        self.search = search
+        self.replace = replace
+
+
+def parse_edits(text: str) -> list[Edit]:
+    """Reads SEARCH/REPLACE blocks:
+
+    <<<<<<< SEARCH
+    text to find
+    =======
+    text to put in its place
+    >>>>>>> REPLACE
+    """
+    return [Edit(match.group("search"), match.group("replace")) for match in EDIT_BLOCK_PATTERN.finditer(text)]
+
+
+def apply_edits(draft: str, edits: list[Edit]) -> str:
+    """Applies edits in order; each search text must occur exactly once, ignoring trailing whitespace on lines."""
+    if not edits:
+        raise PatchError("No edits to apply")
+    for index, edit in enumerate(edits, start=1):
+        if edit.search.strip() == "":
+            raise PatchError(f"Edit {index} has nothing to search for")
+        start, end = locate(draft, edit.search, index)
+        draft = draft[:start] + edit.replace + draft[end:]
+    return draft
+
+
+def locate(draft: str, search: str, index: int) -> tuple[int, int]:
+    count = draft.count(search)
+    if count == 1:
+        start = draft.index(search)
+        return start, start + len(search)
+    if count > 1:
+        raise PatchError(f"Edit {index} matches {count} places")
+    # Models often drop or add trailing spaces, so retry line by line without them
+    lines = [re.escape(line.rstrip()) for line in search.strip("\n").split("\n")]
+    pattern = re.compile(r"[ \t]*\n".join(lines) + r"[ \t]*", re.MULTILINE)
+    matches = list(pattern.finditer(draft))
+    if len(matches) != 1:
+        raise PatchError(f"Edit {index} matches {len(matches)} places")
+    return matches[0].start(), matches[0].end()
@@ -0,0 +1,130 @@
+import os
+import re
+from abc import abstractmethod
+
+
+WORD_PATTERN = re.compile(r"\w+(?:['’-]\w+)*")
+TITLE_PATTERN = re.compile(r"^#\s+\S", re.MULTILINE)
+# Blocks that are not prose paragraphs: headings, lists, quotes, tables, code fences and images
+NON_PROSE_PATTERN = re.compile(r"^\s*(#|[-*+]\s|\d+[.)]\s|>|\||```|!\[)")
+
+
+def count_words(text: str) -> int:
+    return len(WORD_PATTERN.findall(text))
+
+
+class PreScreenRule:
+    """One check a draft must pass before it is worth an editor review."""
+
+    @abstractmethod
+    def check(self, draft: str, primary_keyword: str) -> str | None:
+        """Returns feedback for the writer when the draft fails, otherwise None."""
+        pass
+
+
+class HasArticle(PreScreenRule):
+    def check(self, draft: str, primary_keyword: str) -> str | None:
+        if draft.strip() == "":
+            return "The reply had no article. Write the complete article in markdown in a section starting with a line of **START OF ARTICLE**."
+        return None
+
+
+class HasTitle(PreScreenRule):
+    def check(self, draft: str, primary_keyword: str) -> str | None:
+        if draft.strip() and TITLE_PATTERN.search(draft) is None:
+            return "The article has no title. Start it with a single `# ` title line."
+        return None
+
+
+class MinimumWords(PreScreenRule):
+    """Fails drafts with fewer than `minimum` words."""
+
+    def __init__(self, minimum: int):
+        self.minimum = minimum
+
+    def check(self, draft: str, primary_keyword: str) -> str | None:
+        words = count_words(draft)
+        if draft.strip() and words < self.minimum:
+            return f"The article has {words} words, far below the target. Expand it to at least {self.minimum} words with more depth, examples and sections."
+        return None
+
+
+class MaximumParagraphWords(PreScreenRule):
+    """Fails drafts with a prose paragraph longer than `maximum` words."""
+
+    def __init__(self, maximum: int):
+        self.maximum = maximum
+
+    def check(self, draft: str, primary_keyword: str) -> str | None:
+        long_paragraphs = []
+        for paragraph in re.split(r"\n\s*\n", draft):
+            if NON_PROSE_PATTERN.match(paragraph):
+                continue
+            words = count_words(paragraph)
+            if words > self.maximum:
+                long_paragraphs.append(f"\"{' '.join(paragraph.split()[:8])} ...\" ({words} words)")
+        if long_paragraphs:
+            return f"Split paragraphs longer than {self.maximum} words into shorter ones: " + "; ".join(long_paragraphs) + "."
+        return None
+
+
+class KeywordDensity(PreScreenRule):
+    """Fails drafts whose primary keyword density is outside `low` to `high` percent of all words; skipped when the keyword is not known."""
+
+    def __init__(self, low: float, high: float):
+        self.low = low
+        self.high = high
+
+    def check(self, draft: str, primary_keyword: str) -> str | None:
+        keyword_words = WORD_PATTERN.findall(primary_keyword.lower())
+        total_words = count_words(draft)
+        if not keyword_words or total_words == 0:
+            return None
+        pattern = re.compile(r"\b" + r"\W+".join(re.escape(word) for word in keyword_words) + r"\b", re.IGNORECASE)
+        occurrences = len(pattern.findall(draft))
+        density = occurrences * len(keyword_words) * 100 / total_words
+        if density < self.low:
+            return f"The primary keyword \"{primary_keyword}\" appears {occurrences} times, a density of {density:.2f}%. Use it naturally more often to reach {self.low}% to {self.high}%."
+        if density > self.high:
+            return f"The primary keyword \"{primary_keyword}\" appears {occurrences} times, a density of {density:.2f}%. Use it less often, or use variations, to stay within {self.low}% to {self.high}%."
+        return None
+
+
+class PreScreen:
+    """Rule-based checks run on a draft before the editor; with no rules every draft passes."""
+
+    def __init__(self, *rules: PreScreenRule):
+        self.rules = rules
+
+    def check(self, draft: str, primary_keyword: str) -> list[str]:
+        """Returns the feedback of every rule the draft fails; `primary_keyword` is "" when the writer did not name one."""
+        return [failure for failure in (rule.check(draft, primary_keyword) for rule in self.rules) if failure is not None]
+
+    def review(self, failures: list[str]) -> dict:
+        """Turns failures into a result shaped like EditorAgent.review_content's, to send the draft back to the writer."""
+        return {
+            "prescreened": True,
+            "score": {"flawless": False, "average_score": 0.0},
+            "overall_score": f"The draft failed {len(failures)} automatic checks and was not reviewed by the editor.",
+            "suggested_feedback": "\n".join(f"- {failure}" for failure in failures)
+        }
+
+
+def prescreen_from_env() -> PreScreen:
+    """Builds the pre-screen from DRAFT_PRESCREEN, e.g. "article,title,words:1200,paragraph:150,density:0.8:1.5" for English articles."""
+    rules = []
+    for spec in filter(None, os.getenv("DRAFT_PRESCREEN", "").split(",")):
+        name, *args = spec.strip().split(":")
+        if name == "article" and not args:
+            rules.append(HasArticle())
+        elif name == "title" and not args:
+            rules.append(HasTitle())
+        elif name == "words" and len(args) == 1:
+            rules.append(MinimumWords(int(args[0])))
+        elif name == "paragraph" and len(args) == 1:
+            rules.append(MaximumParagraphWords(int(args[0])))
+        elif name == "density" and len(args) == 2:
+            rules.append(KeywordDensity(float(args[0]), float(args[1])))
+        else:
+            raise ValueError(f"Unsupported draft pre-screen rule: {spec}")
+    return PreScreen(*rules)
@@ -0,0 +1,153 @@
+import time
+
+from llm.multi import MultiClient
+from .steps import Parallel, Prompt, Steps, send_reply
+
+
+class Task:
+    """One step generator being driven by the scheduler."""
+
+    __slots__ = ("steps", "index", "group", "request", "children", "done")
+
+    def __init__(self, steps: Steps, index: int | None = None, group: "Group | None" = None):
+        self.steps = steps
+        self.index = index
+        self.group = group
+        self.request = None
+        self.children = None
+        self.done = False
+
+
+class Group:
+    """The children of a Parallel yielded by `parent`."""
+
+    __slots__ = ("parent", "parallel", "tasks", "results", "remaining")
+
+    def __init__(self, parent: Task, parallel: Parallel):
+        self.parent = parent
+        self.parallel = parallel
+        self.tasks = [Task(steps, index, self) for index, steps in enumerate(parallel.steps)]
+        self.results = [None] * len(self.tasks)
+        self.remaining = len(self.tasks)
+
+
+class Scheduler:
+    """Interleaves many step generators on one thread, keeping at most `concurrency` of them in flight.
+
+    Children of a Parallel run alongside their parent's slot and do not count against `concurrency`.
+    """
+
+    def __init__(self, concurrency: int = 4, client: MultiClient | None = None):
+        self.concurrency = max(1, concurrency)
+        self.client = client or MultiClient()
+        self.queued = []
+        self.active = 0
+        self.results = []
+
+    def add(self, steps: Steps) -> int:
+        """Queues a step generator and returns the index of its slot in `results`."""
+        index = len(self.results)
+        self.results.append(None)
+        self.queued.append(Task(steps, index))
+        return index
+
+    def run(self) -> list:
+        """Runs every queued generator; a failed one leaves its exception as its result."""
+        self.start_queued()
+        while self.active:
+            self.client.poll()
+            self.start_queued()
+        return self.results
+
+    def start_queued(self):
+        while self.queued and self.active < self.concurrency:
+            task = self.queued.pop(0)
+            self.active += 1
+            self.advance(task, lambda: next(task.steps))
+
+    def advance(self, task: Task, resume):
+        try:
+            yielded = resume()
+        except StopIteration as stop:
+            self.complete(task, stop.value)
+            return
+        except Exception as error:
+            self.complete(task, error)
+            return
+        if isinstance(yielded, Parallel):
+            self.start_group(task, yielded)
+        else:
+            self.submit(task, yielded)
+
+    def start_group(self, task: Task, parallel: Parallel):
+        group = Group(task, parallel)
+        task.children = group
+        if not group.tasks:
+            self.finish_group(group)
+            return
+        for child in group.tasks:
+            if not child.done:
+                self.advance(child, lambda child=child: next(child.steps))
+
+    def finish_group(self, group: Group):
+        group.parent.children = None
+        self.advance(group.parent, lambda: group.parent.steps.send(group.results))
+
+    def submit(self, task: Task, prompt: Prompt):
+        llm = prompt.llm
+        start_time = time.time()
+
+        def on_response(resp, error):
+            task.request = None
+            if error is None:
+                try:
+                    reply = llm.read_response(resp)
+                    llm.store_reply(payload, reply, time.time() - start_time, prompt.conversation)
+                except Exception as read_error:
+                    error = read_error
+            if error is not None:
+                self.advance(task, lambda: task.steps.throw(error))
+            else:
+                self.advance(task, lambda: send_reply(task.steps, prompt, reply))
+
+        try:
+            payload = llm.prepare_message(prompt.text, prompt.conversation)
+        except Exception as prepare_error:
+            self.advance(task, lambda error=prepare_error: task.steps.throw(error))
+            return
+        reply = llm.cached_reply(payload, prompt.conversation)
+        if reply is not None:
+            self.advance(task, lambda: send_reply(task.steps, prompt, reply))
+            return
+        task.request = llm.submit(self.client, payload, on_response)
+
+    def complete(self, task: Task, result):
+        task.done = True
+        group = task.group
+        if group is None:
+            self.results[task.index] = result
+            self.active -= 1
+            return
+        group.results[task.index] = result
+        group.remaining -= 1
+        until = group.parallel.until
+        if until is not None and not isinstance(result, Exception) and until(result):
+            for sibling in group.tasks:
+                if not sibling.done:
+                    self.cancel(sibling)
+                    group.remaining -= 1
+        if group.remaining == 0:
+            self.finish_group(group)
+
+    def cancel(self, task: Task):
+        """Stops a task: aborts its request in flight, cancels its own children and closes its generator."""
+        task.done = True
+        if task.request is not None:
+            self.client.cancel(task.request)
+            task.request = None
+        if task.children is not None:
+            for child in task.children.tasks:
+                if not child.done:
+                    self.cancel(child)
+            task.children = None
+        task.steps.close()
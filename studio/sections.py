@@ -0,0 +1,51 @@
+import hashlib
+import re
+
+
+HEADING_LINE_PATTERN = re.compile(r"^## ", re.MULTILINE)
+
+
+class DraftSection:
+    """A part of a draft from one ## heading to the next; the first one holds the title and introduction."""
+
+    __slots__ = ("id", "heading", "text", "digest")
+
+    def __init__(self, id: str, heading: str, text: str):
+        self.id = id
+        self.heading = heading
+        self.text = text
+        self.digest = section_digest(text)
+
+
+class SectionReview:
+    """The editor's verdict on one section, kept by digest until the section changes."""
+
+    __slots__ = ("average_score", "flawless", "feedback")
+
+    def __init__(self, average_score: float, flawless: bool, feedback: str = ""):
+        self.average_score = average_score
+        self.flawless = flawless
+        self.feedback = feedback
+
+
+def section_digest(text: str) -> str:
+    # Trailing whitespace changes nothing a reader would notice
+    normalized = "\n".join(line.rstrip() for line in text.strip().splitlines())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def split_sections(draft: str) -> list[DraftSection]:
+    """Splits a markdown draft at its ## headings, numbering the parts S1, S2, ..."""
+    starts = [match.start() for match in HEADING_LINE_PATTERN.finditer(draft)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    sections = []
+    for index, start in enumerate(starts):
+        end = starts[index + 1] if index + 1 < len(starts) else len(draft)
+        text = draft[start:end].strip()
+        if text == "" and index == 0:
+            continue
+        first_line = text.split("\n", 1)[0]
+        heading = first_line.lstrip("#").strip() if first_line.startswith("#") else "(opening)"
+        sections.append(DraftSection(f"S{len(sections) + 1}", heading, text))
+    return sections
@@ -0,0 +1,136 @@
+import asyncio
+from typing import Callable, Generator
+
+from extractor.section import SectionStream
+from llm.conversation import Conversation
+from llm.llm import LLM
+
+
+class Prompt:
+    """A message an agent step wants sent through its LLM as part of `conversation`; the reply text is sent back into the step.
+
+    When `section` is set and the LLM streams, the reply is cut off as soon as that section ends, so it
+    names the last section the step reads. A cut-off reply is not cached; one read to its end is.
+    Only run_steps streams: prompts inside Parallel, on the Scheduler (create_entries) and on
+    run_steps_async are sent unstreamed and read whole, whatever LLM_STREAM says.
+    """
+
+    def __init__(self, llm: LLM, text: str, section: str | None = None, conversation: Conversation | None = None):
+        self.llm = llm
+        self.text = text
+        self.section = section
+        self.conversation = conversation
+
+
+class Parallel:
+    """Yielded by a step to run several step generators concurrently; the step receives their results in order.
+
+    A child that fails contributes its exception as its result. Once `until` returns True for a
+    finished child's result, the children still running are cancelled and contribute None.
+    """
+
+    def __init__(self, steps: list, until: Callable[[object], bool] | None = None):
+        self.steps = steps
+        self.until = until
+
+
+Steps = Generator[Prompt | Parallel, object, object]
+
+
+def run_steps(steps: Steps):
+    """Runs a step generator to completion, sending each prompt synchronously."""
+    try:
+        prompt = next(steps)
+        while True:
+            if isinstance(prompt, Parallel):
+                prompt = steps.send(run_parallel(prompt))
+            else:
+                prompt = send_reply(steps, prompt, send_prompt(prompt))
+    except StopIteration as stop:
+        return stop.value
+
+
+def send_reply(steps: Steps, prompt: Prompt, reply: str):
+    """Sends a reply into the step that asked for it.
+
+    When the step fails on the reply, e.g. it cannot be parsed, the reply is dropped from the
+    response cache so a resumed run asks again instead of replaying it.
+    """
+    try:
+        return steps.send(reply)
+    except StopIteration:
+        raise
+    except Exception:
+        prompt.llm.forget_reply(prompt.conversation)
+        raise
+
+
+def send_prompt(prompt: Prompt) -> str:
+    if prompt.section is None or not prompt.llm.streaming:
+        return prompt.llm.send_message(prompt.text, prompt.conversation)
+    section_stream = SectionStream(prompt.section)
+    chunks = prompt.llm.send_message_stream(prompt.text, prompt.conversation)
+    for chunk in chunks:
+        if section_stream.feed(chunk):
+            break
+    # Stop the transfer; the rest of the reply would be discarded anyway
+    chunks.close()
+    return section_stream.text
+
+
+def run_parallel(parallel: Parallel) -> list:
+    # Imported here because the scheduler itself depends on this module
+    from .scheduler import Scheduler
+
+    def gather():
+        return (yield parallel)
+
+    scheduler = Scheduler(concurrency=1)
+    scheduler.add(gather())
+    [results] = scheduler.run()
+    if isinstance(results, Exception):
+        raise results
+    return results
+
+
+async def run_steps_async(steps: Steps):
+    """Runs a step generator to completion on the running event loop; cancelling the task aborts the request in flight."""
+    try:
+        prompt = next(steps)
+        while True:
+            try:
+                if isinstance(prompt, Parallel):
+                    result = await run_parallel_async(prompt)
+                else:
+                    result = await prompt.llm.send_message_async(prompt.text, prompt.conversation)
+            except asyncio.CancelledError:
+                steps.close()
+                raise
+            except Exception as error:
+                prompt = steps.throw(error)
+                continue
+            if isinstance(prompt, Parallel):
+                prompt = steps.send(result)
+            else:
+                prompt = send_reply(steps, prompt, result)
+    except StopIteration as stop:
+        return stop.value
+
+
+async def run_parallel_async(parallel: Parallel) -> list:
+    tasks = [asyncio.ensure_future(run_steps_async(child)) for child in parallel.steps]
+    results = [None] * len(tasks)
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index = tasks.index(task)
+                results[index] = task.exception() if task.exception() is not None else task.result()
+                if parallel.until is not None and not isinstance(results[index], Exception) and parallel.until(results[index]):
+                    pending = set()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return results
@@ -0,0 +1,114 @@
+import os
+
+
+class RevisionState:
+    """What the revision loop knows before deciding on another round."""
+
+    def __init__(self, scores: list[float], revision_round: int, quality_threshold: float, has_candidate: bool):
+        # Average score of the first draft followed by one per revision so far
+        self.scores = scores
+        self.revision_round = revision_round
+        self.quality_threshold = quality_threshold
+        self.has_candidate = has_candidate
+
+    def gains(self) -> list[float]:
+        """Change in the best score so far contributed by each revision."""
+        gains = []
+        if not self.scores:
+            return gains
+        best = self.scores[0]
+        for score in self.scores[1:]:
+            gains.append(max(0.0, score - best))
+            best = max(best, score)
+        return gains
+
+
+class StopDecision:
+    def __init__(self, stop: bool, reason: str):
+        self.stop = stop
+        self.reason = reason
+
+
+class StoppingPolicy:
+    """Decides whether another revision round is worth paying for. The default always continues."""
+
+    def decide(self, state: RevisionState) -> StopDecision:
+        return StopDecision(False, "no early stopping")
+
+
+class Plateau(StoppingPolicy):
+    """Stops once an acceptable draft exists and the last `patience` rounds each improved the best score by less than `min_delta`."""
+
+    def __init__(self, patience: int = 2, min_delta: float = 0.1):
+        self.patience = max(1, patience)
+        self.min_delta = min_delta
+
+    def decide(self, state: RevisionState) -> StopDecision:
+        recent = state.gains()[-self.patience:]
+        if not state.has_candidate or len(recent) < self.patience:
+            return StopDecision(False, "waiting for a plateau")
+        if all(gain < self.min_delta for gain in recent):
+            return StopDecision(True, f"score plateaued: last {self.patience} rounds gained less than {self.min_delta}")
+        return StopDecision(False, f"score still improving by at least {self.min_delta}")
+
+
+class GainCap(StoppingPolicy):
+    """Stops once an acceptable draft exists and the expected gain of another round, the mean of the last `window` gains, is below `min_gain`."""
+
+    def __init__(self, min_gain: float = 0.1, window: int = 3):
+        self.min_gain = min_gain
+        self.window = max(1, window)
+
+    def decide(self, state: RevisionState) -> StopDecision:
+        recent = state.gains()[-self.window:]
+        if not state.has_candidate or not recent:
+            return StopDecision(False, "no gain observed yet")
+        expected_gain = sum(recent) / len(recent)
+        if expected_gain < self.min_gain:
+            return StopDecision(True, f"expected gain {expected_gain:.2f} per round is below {self.min_gain}")
+        return StopDecision(False, f"expected gain {expected_gain:.2f} per round")
+
+
+class AcceptAfter(StoppingPolicy):
+    """Stops as soon as an acceptable draft exists after at least `rounds` revisions."""
+
+    def __init__(self, rounds: int):
+        self.rounds = max(0, rounds)
+
+    def decide(self, state: RevisionState) -> StopDecision:
+        completed_rounds = state.revision_round - 1
+        if state.has_candidate and completed_rounds >= self.rounds:
+            return StopDecision(True, f"accepted a draft over {state.quality_threshold} after {completed_rounds} rounds")
+        return StopDecision(False, "no acceptable draft yet" if not state.has_candidate else f"fewer than {self.rounds} rounds done")
+
+
+class AnyPolicy(StoppingPolicy):
+    """Stops when any of the policies says so, with that policy's reason."""
+
+    def __init__(self, *policies: StoppingPolicy):
+        self.policies = policies
+
+    def decide(self, state: RevisionState) -> StopDecision:
+        reasons = []
+        for policy in self.policies:
+            decision = policy.decide(state)
+            if decision.stop:
+                return decision
+            reasons.append(decision.reason)
+        return StopDecision(False, "; ".join(reasons) or "no early stopping")
+
+
+def stopping_policy_from_env() -> StoppingPolicy:
+    """Builds the policy from REVISION_STOPPING_POLICY, e.g. "plateau:2:0.1,gain:0.1,accept-after:2"."""
+    policies = []
+    for spec in filter(None, os.getenv("REVISION_STOPPING_POLICY", "").split(",")):
+        name, *args = spec.strip().split(":")
+        if name == "plateau":
+            policies.append(Plateau(*(cast(arg) for cast, arg in zip((int, float), args))))
+        elif name == "gain":
+            policies.append(GainCap(*(cast(arg) for cast, arg in zip((float, int), args))))
+        elif name == "accept-after" and len(args) == 1:
+            policies.append(AcceptAfter(int(args[0])))
+        else:
+            raise ValueError(f"Unsupported revision stopping policy: {spec}")
+    return AnyPolicy(*policies)
@@ -1,89 +1,286 @@
+import asyncio
 import json
 import os
+import uuid
 from .editor_agent import EditorAgent
 from .marketer_agent import MarketerAgent
 from .writer_agent import WriterAgent
+from .scheduler import Scheduler
+from .steps import Parallel, Steps, run_steps, run_steps_async
+from .checkpoint import CheckpointStore, checkpoint_store_from_env
+from .prescreen import PreScreen, prescreen_from_env
+from .stopping import RevisionState, StoppingPolicy, stopping_policy_from_env
+from llm.conversation import Conversation
+from llm.llm import LLM
+from llm.warmup import preload_models
 from publisher.markdown import MarkdownPublisher
 from logger.logger import Logger
 from pen.pen import pen
 
 
 class Studio:
-    def __init__(self, writer: WriterAgent, editor: EditorAgent, marketer: MarketerAgent, log_level: str = "INFO"):
+    def __init__(
+        self,
+        writer: WriterAgent,
+        editor: EditorAgent,
+        marketer: MarketerAgent,
+        log_level: str = "INFO",
+        candidates: int | None = None,
+        candidate_writers: list[WriterAgent] | None = None,
+        stopping_policy: StoppingPolicy | None = None,
+        checkpoints: CheckpointStore | None = None,
+        prescreen: PreScreen | None = None
+    ):
         self.writer = writer
         self.editor = editor
         self.marketer = marketer
+        self.log_level = log_level
+        self.candidates = candidates if candidates is not None else int(os.getenv("DRAFT_CANDIDATES", "1"))
+        # Writers the candidates are spread across; defaults to the main writer
+        self.candidate_writers = candidate_writers or [writer]
+        self.stopping_policy = stopping_policy or stopping_policy_from_env()
+        self.checkpoints = checkpoints or checkpoint_store_from_env()
+        self.prescreen = prescreen or prescreen_from_env()
         self.logger = Logger("studio", pen.cyan_bright, log_level)
-        
-    def create_entry(self, topic: str, preferred_language: str) -> dict | None:
-        candidate = None
 
+    def clone(self) -> "Studio":
+        """Returns a studio whose agents share this one's LLM clients but have their own conversations, for running another pipeline alongside."""
+        return Studio(
+            writer=self.writer.clone(),
+            editor=self.editor.clone(),
+            marketer=self.marketer.clone(),
+            log_level=self.log_level,
+            candidates=self.candidates,
+            candidate_writers=[candidate_writer.clone() for candidate_writer in self.candidate_writers],
+            stopping_policy=self.stopping_policy,
+            checkpoints=self.checkpoints,
+            prescreen=self.prescreen
+        )
+
+    def llms(self) -> list[LLM]:
+        return [agent.llm for agent in (self.writer, self.editor, self.marketer, *self.candidate_writers)]
+
+    def warm_up(self, pin: bool = True) -> dict[str, float]:
+        """Loads the agents' local models concurrently before the first prompt; see llm.warmup.preload_models."""
+        return preload_models(self.llms(), pin, self.log_level)
+
+    def clear_history(self):
+        """Forgets every agent's conversation so the studio can be reused for another topic."""
+        for agent in (self.writer, self.editor, self.marketer, *self.candidate_writers):
+            agent.clear_history()
+
+    def create_entry(self, topic: str, preferred_language: str, run_id: str | None = None) -> dict | None:
+        """Creates an entry; with a checkpoint store, progress is saved under `run_id` (random when not given) for `resume`."""
+        return run_steps(self.create_entry_steps(topic, preferred_language, run_id))
+
+    def create_entries(self, topics: list[str], preferred_language: str, concurrency: int = 4) -> list[dict | None]:
+        """Creates an entry per topic, overlapping up to `concurrency` pipelines on one thread."""
+        scheduler = Scheduler(concurrency)
+        for topic in topics:
+            scheduler.add(self.clone().create_entry_steps(topic, preferred_language))
+        entries = []
+        for topic, result in zip(topics, scheduler.run()):
+            if isinstance(result, Exception):
+                self.logger.log(f"Failed to create entry for topic {pen.yellow_bright(topic)}: {pen.red(str(result))}")
+                result = None
+            entries.append(result)
+        return entries
+
+    async def create_entry_async(self, topic: str, preferred_language: str, run_id: str | None = None) -> dict | None:
+        """Like create_entry, but awaits replies on the running event loop; wrap it in asyncio.wait_for for a deadline.
+
+        Concurrent calls must each use their own clone() of the studio.
+        """
+        return await run_steps_async(self.create_entry_steps(topic, preferred_language, run_id))
+
+    async def create_entries_async(self, topics: list[str], preferred_language: str, concurrency: int = 4) -> list[dict | None]:
+        """Creates an entry per topic with up to `concurrency` pipelines in flight on the running event loop."""
+        slots = asyncio.Semaphore(concurrency)
+
+        async def create(topic: str) -> dict | None:
+            async with slots:
+                try:
+                    return await self.clone().create_entry_async(topic, preferred_language)
+                except Exception as error:
+                    self.logger.log(f"Failed to create entry for topic {pen.yellow_bright(topic)}: {pen.red(str(error))}")
+                    return None
+
+        return list(await asyncio.gather(*(create(topic) for topic in topics)))
+
+    def best_draft_steps(self, topic: str, preferred_language: str) -> Steps:
+        """Writes and reviews `candidates` drafts concurrently and returns (writer slot, writer, editor, draft, result) for the best.
+
+        Each candidate gets its own writer and editor clones so the winner's histories carry on
+        into the revision loop. The first flawless candidate cancels the others.
+        """
+        self.logger.log(f"Writing {self.candidates} candidate drafts ...")
+        candidate_steps = []
+        for index in range(self.candidates):
+            # Candidates send the same prompts, so each needs replies of its own from the response cache
+            writer = self.candidate_writers[index % len(self.candidate_writers)].clone(cache_salt=f"candidate-{index}")
+            candidate_steps.append(self.draft_candidate_steps(writer, self.editor.clone(), topic, preferred_language))
+        outcomes = yield Parallel(candidate_steps, until=lambda outcome: outcome[3]["score"]["flawless"])
+        writer_slots = len(self.candidate_writers)
+
+        best, best_index = None, None
+        for index, outcome in enumerate(outcomes):
+            if outcome is None:
+                self.logger.debug(f"candidate {index + 1} cancelled")
+            elif isinstance(outcome, Exception):
+                self.logger.log(f"Candidate {index + 1} failed: {pen.red(str(outcome))}")
+            else:
+                score = outcome[3]["score"]
+                self.logger.log(f"Candidate {index + 1} by {pen.yellow_bright(outcome[0].name())} received average score: {score['average_score']}")
+                if best is None or (score["flawless"], score["average_score"]) > (best[3]["score"]["flawless"], best[3]["score"]["average_score"]):
+                    best, best_index = outcome, index
+        if best is None:
+            raise RuntimeError("Every candidate draft failed")
+        self.logger.debug_block("SELECTED DRAFT", best[2])
+        return (best_index % writer_slots, *best)
+
+    def draft_candidate_steps(self, writer: WriterAgent, editor: EditorAgent, topic: str, preferred_language: str) -> Steps:
+        draft = yield from writer.write_content_steps(topic, preferred_language)
+        result = yield from self.review_steps(editor, draft, writer.primary_keyword)
+        return writer, editor, draft, result
+
+    def review_steps(self, editor: EditorAgent, draft: str, primary_keyword: str) -> Steps:
+        """Reviews a draft, unless it fails the pre-screen: then it goes back to the writer without an editor round trip."""
+        failures = self.prescreen.check(draft, primary_keyword)
+        if failures:
+            self.logger.log(f"Draft failed {len(failures)} pre-screen checks. Returning it to the writer ...")
+            return self.prescreen.review(failures)
+        return (yield from editor.review_content_steps(draft))
+
+    def create_entry_steps(self, topic: str, preferred_language: str, run_id: str | None = None) -> Steps:
+        state = {
+            "run_id": run_id or uuid.uuid4().hex,
+            "topic": topic,
+            "language": preferred_language,
+            "stage": "write",
+            "writer_slot": None,
+            "draft": None,
+            "primary_keyword": "",
+            "result": None,
+            "candidate": None,
+            "scores": [],
+            "revision_round": 1,
+            "entry": None
+        }
+        return (yield from self.entry_steps(state, self.writer, self.editor))
+
+    def resume(self, run_id: str) -> dict | None:
+        """Continues a checkpointed run from its last completed step."""
+        return run_steps(self.resume_steps(run_id))
+
+    async def resume_async(self, run_id: str) -> dict | None:
+        return await run_steps_async(self.resume_steps(run_id))
+
+    def resume_steps(self, run_id: str) -> Steps:
+        state = self.checkpoints.load(run_id) if self.checkpoints is not None else None
+        if state is None:
+            raise KeyError(f"No checkpoint for run {run_id}")
+        if state["stage"] == "done":
+            return state["entry"]
+        self.logger.log(f"Resuming run {pen.yellow_bright(run_id)} at {state['stage']} stage, revision round {state['revision_round']}")
+        writer_slot = state["writer_slot"]
+        writer = self.writer if writer_slot is None else self.candidate_writers[writer_slot].clone()
+        editor = self.editor if writer_slot is None else self.editor.clone()
+        histories = state.pop("histories")
+        editor.restore_section_reviews(state.pop("section_reviews", {}))
+        for agent, history in ((writer, histories["writer"]), (editor, histories["editor"]), (self.marketer, histories["marketer"])):
+            agent.conversation = Conversation(list(history))
+        return (yield from self.entry_steps(state, writer, editor))
+
+    def save_checkpoint(self, state: dict, writer: WriterAgent, editor: EditorAgent):
+        if self.checkpoints is None:
+            return
+        histories = {"writer": writer.conversation.messages, "editor": editor.conversation.messages, "marketer": self.marketer.conversation.messages}
+        self.checkpoints.save(state["run_id"], state | {"histories": histories, "section_reviews": editor.saved_section_reviews()})
+
+    def entry_steps(self, state: dict, writer: WriterAgent, editor: EditorAgent) -> Steps:
+        """Runs a pipeline from whatever stage `state` is at, checkpointing after every step."""
         review_limit = int(os.getenv("BLOG_REVIEW_LIMIT", "5"))
         quality_threshold = float(os.getenv("MINIMUM_QUALITY_SCORE", "4.5"))
-        self.logger.log(f"writer: {pen.yellow_bright(self.writer.name())}")
-        self.logger.log(f"editor: {pen.yellow_bright(self.editor.name())}")
+        self.logger.log(f"writer: {pen.yellow_bright(writer.name())}")
+        self.logger.log(f"editor: {pen.yellow_bright(editor.name())}")
         self.logger.log(f"marketer: {pen.yellow_bright(self.marketer.name())}")
         self.logger.log(f"minimum quality score: {pen.yellow_bright(str(quality_threshold))}")
         self.logger.log(f"review limit: {pen.yellow_bright(str(review_limit))}")
+        if self.checkpoints is not None:
+            self.logger.log(f"run id: {pen.yellow_bright(state['run_id'])}")
 
-        self.logger.log(f"Starting blog post creation for topic: {pen.yellow_bright(topic)}")
-        draft = self.writer.write_content(topic, preferred_language)
-        
-        self.logger.debug_block("SUBMITTED DRAFT", draft)
-        
-        self.logger.log("Draft created. Initiating review ...")
-        result = self.editor.review_content(draft)
-        self.logger.debug_block("FEEDBACK", result["suggested_feedback"])
-        flawless = result["score"]['flawless']
-        content_quality = result["score"]['average_score']
-        self.logger.log(f"Writer received average score: {content_quality}")
+        if state["stage"] == "write":
+            self.logger.log(f"Starting blog post creation for topic: {pen.yellow_bright(state['topic'])}")
+            if self.candidates > 1:
+                state["writer_slot"], writer, editor, state["draft"], state["result"] = yield from self.best_draft_steps(state["topic"], state["language"])
+                state["primary_keyword"] = writer.primary_keyword
+                self.record_review(state, quality_threshold)
+                state["stage"] = "revise"
+            else:
+                state["draft"] = yield from writer.write_content_steps(state["topic"], state["language"])
+                state["primary_keyword"] = writer.primary_keyword
+                self.logger.debug_block("SUBMITTED DRAFT", state["draft"])
+                self.logger.log("Draft created. Initiating review ...")
+                state["stage"] = "review"
+            self.save_checkpoint(state, writer, editor)
 
-        if content_quality >= quality_threshold or flawless:
-            candidate = {
-                "content": draft,
-                "score": content_quality,
-                "flawless": flawless
-            }
-
-        revision_round = 1
-        while not flawless and revision_round <= review_limit:
-            self.logger.log(f"Revision round {revision_round} ...")
-            draft = self.writer.revise_content(result["overall_score"], result["suggested_feedback"])
-            self.logger.debug_block("RESUBMITTED DRAFT", draft)
-
-            result = self.editor.review_content(draft)
-            self.logger.debug_block("FEEDBACK", result["suggested_feedback"])
-            
-            flawless = result["score"]['flawless']
-            content_quality = result["score"]['average_score']
-            self.logger.log(f"Writer received average score: {content_quality}")
-            
-            if content_quality >= quality_threshold or flawless:
-                if candidate is None:
-                    candidate = {
-                        "content": draft,
-                        "score": content_quality,
-                        "flawless": flawless
-                    }
-                else:
-                    # Keep the best candidate
-                    if content_quality > candidate["score"]:
-                        candidate = {
-                            "content": draft,
-                            "score": content_quality,
-                            "flawless": flawless
-                        }
-            revision_round += 1
+        while state["stage"] in ("review", "revise"):
+            if state["stage"] == "review":
+                state["result"] = yield from self.review_steps(editor, state["draft"], state.get("primary_keyword", ""))
+                self.record_review(state, quality_threshold)
+                state["stage"] = "revise"
+                self.save_checkpoint(state, writer, editor)
+                continue
+
+            revision_round = state["revision_round"]
+            if state["result"]["score"]["flawless"] or revision_round > review_limit:
+                state["stage"] = "metadata"
+                break
+            decision = self.stopping_policy.decide(RevisionState(state["scores"], revision_round, quality_threshold, state["candidate"] is not None))
+            if decision.stop:
+                self.logger.log(f"Stopping revisions: {decision.reason}")
+                state["stage"] = "metadata"
+                break
+            self.logger.log(f"Revision round {revision_round} ... ({decision.reason})")
+            state["draft"] = yield from writer.revise_content_steps(state["result"]["overall_score"], state["result"]["suggested_feedback"], state["draft"])
+            state["primary_keyword"] = writer.primary_keyword or state.get("primary_keyword", "")
+            self.logger.debug_block("RESUBMITTED DRAFT", state["draft"])
+            state["revision_round"] = revision_round + 1
+            state["stage"] = "review"
+            self.save_checkpoint(state, writer, editor)
 
+        candidate = state["candidate"]
         if candidate is not None:
-            draft = candidate["content"]
-            content_quality = candidate["score"]
-            flawless = candidate["flawless"]
-            if flawless:
+            if candidate["flawless"]:
                 self.logger.log(f"Content automatically approved with flawless score! Awesome job!")
             else:
                 self.logger.log(f"Content automatically approved with score below flawless threshold.")
-            metadata = self.marketer.create_metadata(draft)
-            return { "content": draft, "metadata": metadata }
-        self.logger.log("Failed to produce acceptable content within the review limit.")
-        return None
+            metadata = yield from self.marketer.create_metadata_steps(candidate["content"])
+            state["entry"] = { "content": candidate["content"], "metadata": metadata }
+        else:
+            self.logger.log("Failed to produce acceptable content within the review limit.")
+        state["stage"] = "done"
+        self.save_checkpoint(state, writer, editor)
+        return state["entry"]
+
+    def record_review(self, state: dict, quality_threshold: float):
+        """Logs the latest review and keeps its draft as the candidate when it is acceptable and the best so far."""
+        result = state["result"]
+        self.logger.debug_block("FEEDBACK", result["suggested_feedback"])
+        if result.get("prescreened"):
+            # Pre-screen rejections carry no editor score
+            return
+        flawless = result["score"]['flawless']
+        content_quality = result["score"]['average_score']
+        state["scores"].append(content_quality)
+        self.logger.log(f"Writer received average score: {content_quality}")
+
+        if content_quality >= quality_threshold or flawless:
+            candidate = state["candidate"]
+            # Keep the best candidate
+            if candidate is None or content_quality > candidate["score"]:
+                state["candidate"] = {
+                    "content": state["draft"],
+                    "score": content_quality,
+                    "flawless": flawless
+                }
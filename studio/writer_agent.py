@@ -1,34 +1,197 @@
+import os
+from llm.conversation import Conversation
 from llm.llm import LLM
 from extractor.section import extract_section
 from pen.pen import pen
 from logger.logger import Logger
+from .outline import Outline, find_primary_keyword, parse_outline
+from .patch import EDIT_INSTRUCTIONS, PatchError, apply_edits, parse_edits
+from .steps import Parallel, Prompt, Steps, run_steps, run_steps_async
+
+
+# Article replies are read up to the end of their metadata, which holds the primary keyword;
+# a stream cut at the end of the article would lose it and never reach the reply cache
+ARTICLE_LAST_SECTION = "METADATA"
 
 
 class WriterAgent():
-    def __init__(self, llm: LLM, log_level: str = "INFO"):
+    def __init__(self, llm: LLM, log_level: str = "INFO", revision_mode: str | None = None, draft_mode: str | None = None, cache_salt: str = ""):
         self.llm = llm
+        # Keeps this writer's cached replies apart from other writers sending the same prompts
+        self.cache_salt = cache_salt
+        self.conversation = Conversation(cache_salt=cache_salt)
         self.logger = Logger("writer", pen.blue_bright, log_level)
+        # Primary keyword of the current article, from the outline or the reply's metadata; "" when not known
+        self.primary_keyword = ""
+        # "rewrite" regenerates the whole article each round, "patch" asks for edits to the previous draft
+        self.revision_mode = revision_mode or os.getenv("WRITER_REVISION_MODE", "rewrite")
+        if self.revision_mode not in ("rewrite", "patch"):
+            raise ValueError(f"Unsupported writer revision mode: {self.revision_mode}")
+        # "single" writes the article in one completion, "sections" outlines it and writes the sections concurrently
+        self.draft_mode = draft_mode or os.getenv("WRITER_DRAFT_MODE", "single")
+        if self.draft_mode not in ("single", "sections"):
+            raise ValueError(f"Unsupported writer draft mode: {self.draft_mode}")
 
     def name(self) -> str:
         return self.llm.model_name
 
+    def clone(self, cache_salt: str = "") -> "WriterAgent":
+        """Returns an agent sharing this one's LLM client but with a conversation of its own."""
+        return WriterAgent(self.llm, self.logger.log_level, self.revision_mode, self.draft_mode, cache_salt)
+
+    def clear_history(self):
+        self.conversation = Conversation(cache_salt=self.cache_salt)
+        self.primary_keyword = ""
+
     def write_content(self, topic: str, preferred_language: str) -> str:
+        return run_steps(self.write_content_steps(topic, preferred_language))
+
+    async def write_content_async(self, topic: str, preferred_language: str) -> str:
+        return await run_steps_async(self.write_content_steps(topic, preferred_language))
+
+    def write_content_steps(self, topic: str, preferred_language: str) -> Steps:
+        if self.draft_mode == "sections":
+            content = yield from self.write_sections_steps(topic, preferred_language)
+            if content is not None:
+                return content
         self.logger.log(f"Writing content for topic: {pen.yellow_bright(topic)} ...")
-        content = self.llm.send_message(f"Write a blog entry about \"{topic}\" in {preferred_language} language following the PROFESSIONAL CONTENT MANDATE, SEO PROTOCOL, AD REVENUE OPTIMIZATION FOCUS, ARTICLE STRUCTURE, and OUTPUT CONSTRAINTS provided in your system instructions.")
+        content = yield Prompt(self.llm, f"Write a blog entry about \"{topic}\" in {preferred_language} language following the PROFESSIONAL CONTENT MANDATE, SEO PROTOCOL, AD REVENUE OPTIMIZATION FOCUS, ARTICLE STRUCTURE, and OUTPUT CONSTRAINTS provided in your system instructions.", section=ARTICLE_LAST_SECTION, conversation=self.conversation)
+        self.primary_keyword = find_primary_keyword(content) or self.primary_keyword
         content = extract_section(content, "ARTICLE")
         return content
     
-    def revise_content(self, overall_score: str, feedback: str) -> str:
+    def write_sections_steps(self, topic: str, preferred_language: str) -> Steps:
+        """Outlines the article, writes its sections concurrently, joins them and asks for edits that make the whole coherent.
+
+        Returns None when the outline cannot be read or a section fails, so the caller can write the article in one go.
+        """
+        self.logger.log(f"Outlining content for topic: {pen.yellow_bright(topic)} ...")
+        reply = yield Prompt(
+            self.llm,
+            f"""Plan a blog entry about "{topic}" in {preferred_language} language following the PROFESSIONAL CONTENT MANDATE, SEO PROTOCOL, AD REVENUE OPTIMIZATION FOCUS and ARTICLE STRUCTURE provided in your system instructions. Do NOT write the article yet. Reply with its outline in a section starting with a line of **START OF OUTLINE**, in this form:
+
+# Article title
+PRIMARY KEYWORD: the primary keyword
+## Section heading
+- what the section covers, one point per line
+
+List every ## section in order, from the introduction to the conclusion.""",
+            section="OUTLINE",
+            conversation=self.conversation
+        )
+        try:
+            outline = parse_outline(extract_section(reply, "OUTLINE") or reply)
+        except ValueError as error:
+            self.logger.log(f"Outline unusable ({error}), writing the article in one go instead ...")
+            return None
+        self.primary_keyword = outline.primary_keyword
+
+        self.logger.log(f"Writing {len(outline.sections)} sections concurrently ...")
+        bodies = yield Parallel([self.write_section_steps(outline, index, preferred_language) for index in range(len(outline.sections))])
+        failed = [outline.sections[index].heading for index, body in enumerate(bodies) if isinstance(body, Exception) or not body]
+        if failed:
+            self.logger.log(f"Sections failed ({', '.join(failed)}), writing the article in one go instead ...")
+            return None
+        content = outline.join(bodies)
+
+        self.logger.log("Checking that the sections read as one article ...")
+        reply = yield Prompt(
+            self.llm,
+            f"""The article below was assembled from sections written separately from this outline. Check that it reads as one coherent article: consistent terminology and facts, no points repeated across sections, smooth transitions, and the primary keyword placed as the SEO PROTOCOL requires. Fix problems only. {EDIT_INSTRUCTIONS}
+
+When nothing needs fixing, reply with the line **START OF EDITS** followed by the line NO EDITS.
+
+START OF CONTENT DRAFT--------------
+{content}
+END OF CONTENT DRAFT----------------""",
+            section="EDITS",
+            conversation=self.conversation
+        )
+        edits = parse_edits(extract_section(reply, "EDITS") or reply)
+        if edits:
+            try:
+                content = apply_edits(content, edits)
+            except PatchError as error:
+                self.logger.log(f"Coherence edits did not apply ({error}), keeping the joined sections")
+        return content
+
+    def write_section_steps(self, outline: Outline, index: int, preferred_language: str) -> Steps:
+        """Writes one section in a conversation of its own, given the outline and its neighbouring headings."""
+        section = outline.sections[index]
+        previous_heading = outline.sections[index - 1].heading if index > 0 else "(none, this section opens the article)"
+        next_heading = outline.sections[index + 1].heading if index + 1 < len(outline.sections) else "(none, this section closes the article)"
+        notes = "\n".join(f"- {note}" for note in section.notes) or "- (no notes)"
+        reply = yield Prompt(
+            self.llm,
+            f"""You are writing one section of the blog entry "{outline.title}" in {preferred_language} language, following the PROFESSIONAL CONTENT MANDATE, SEO PROTOCOL and AD REVENUE OPTIMIZATION FOCUS provided in your system instructions. Other writers are writing the other sections at the same time, so cover only this section's points and do not repeat the others.
+
+ARTICLE OUTLINE:
+{outline.render()}
+
+PRIMARY KEYWORD: {outline.primary_keyword}
+PREVIOUS SECTION: {previous_heading}
+NEXT SECTION: {next_heading}
+
+SECTION TO WRITE: ## {section.heading}
+{notes}
+
+Reply with the markdown body of this section only, without its ## heading, in a section starting with a line of **START OF SECTION**.""",
+            section="SECTION",
+            conversation=Conversation(cache_salt=self.cache_salt)
+        )
+        return extract_section(reply, "SECTION") or reply.strip()
+
+    def revise_content(self, overall_score: str, feedback: str, draft: str | None = None) -> str:
+        return run_steps(self.revise_content_steps(overall_score, feedback, draft))
+
+    async def revise_content_async(self, overall_score: str, feedback: str, draft: str | None = None) -> str:
+        return await run_steps_async(self.revise_content_steps(overall_score, feedback, draft))
+
+    def revise_content_steps(self, overall_score: str, feedback: str, draft: str | None = None) -> Steps:
+        """Revises the last draft; in patch mode, with `draft` given, edits it and only rewrites it when the edits do not apply."""
+        if self.revision_mode == "patch" and draft is not None:
+            self.logger.log("Editing content based on editor feedback ...")
+            edits = yield Prompt(
+                self.llm,
+                f"""Revise the content draft below based on the following editor feedback, maintaining the original language, and using the score in the feedback to guide your revisions. Do NOT repeat the whole article. {EDIT_INSTRUCTIONS}
+
+When the feedback needs no change to the text, reply with the line **START OF EDITS** followed by the line NO EDITS.
+
+OVERALL SCORE TO LAST SUBMISSION:
+{overall_score}
+
+EDITOR FEEDBACK TO LAST SUBMISSION:
+{feedback}
+
+START OF CONTENT DRAFT--------------
+{draft}
+END OF CONTENT DRAFT----------------""",
+                section="EDITS",
+                conversation=self.conversation
+            )
+            parsed_edits = parse_edits(extract_section(edits, "EDITS") or edits)
+            if not parsed_edits:
+                self.logger.log("No edits suggested, keeping the draft")
+                return draft
+            try:
+                return apply_edits(draft, parsed_edits)
+            except PatchError as error:
+                self.logger.log(f"Edits did not apply ({error}), rewriting the draft instead ...")
+
         self.logger.log("Revising content based on editor feedback ...")
-        revised_content = self.llm.send_message(
+        revised_content = yield Prompt(
+            self.llm,
             f"""Revise the content draft recently submitted based on the following editor feedback, maintaining the original language, and using the score in the feedback to guide your revisions:\n
             
 OVERALL SCORE TO LAST SUBMISSION:
 {overall_score}
 
 EDITOR FEEDBACK TO LAST SUBMISSION:
-{feedback}"""
+{feedback}""",
+            section=ARTICLE_LAST_SECTION,
+            conversation=self.conversation
         )
 
+        self.primary_keyword = find_primary_keyword(revised_content) or self.primary_keyword
         revised_content = extract_section(revised_content, "ARTICLE")
-        return revised_content
\ No newline at end of file
+        return revised_content
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from benchmark.bench import point_at
+from benchmark.mock_server import ARTICLE_REPLY, Latency, MockLLMServer
+from llm.aio import async_client
+from llm.conversation import Conversation
+from llm.factory import create_model
+from studio.factory import build_studio
+
+
+class AsyncTestCase(unittest.TestCase):
+    latency = "fixed:0"
+
+    def setUp(self):
+        self.server = MockLLMServer(latency=Latency(self.latency), initial_score=4.5, score_step=0.5).start()
+        self.env_patcher = patch.dict(os.environ, {"LLM_MAX_RETRIES": "0", "DRAFT_CANDIDATES": "1", "REVISION_STOPPING_POLICY": ""})
+        self.env_patcher.start()
+        point_at(self.server)
+        self.stdout_patcher = patch("builtins.print")
+        self.stdout_patcher.start()
+
+    def tearDown(self):
+        self.stdout_patcher.stop()
+        self.env_patcher.stop()
+        self.server.stop()
+
+
+class SendMessageAsyncTests(AsyncTestCase):
+    latency = "fixed:0.3"
+
+    def test_requests_overlap_on_one_loop(self):
+        llm = create_model("ollama://mock-model")
+
+        async def send_all():
+            return await asyncio.gather(*(llm.send_message_async("Write a blog entry about ducks", Conversation()) for _ in range(10)))
+
+        start_time = time.monotonic()
+        replies = asyncio.run(send_all())
+        self.assertEqual(replies, [ARTICLE_REPLY] * 10)
+        self.assertLess(time.monotonic() - start_time, 1.5)
+
+    def test_timeout_cancels_the_request(self):
+        llm = create_model("ollama://mock-model")
+
+        async def send_with_deadline():
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(llm.send_message_async("Write a blog entry about ducks"), 0.05)
+            return async_client().client.pending()
+
+        self.assertEqual(asyncio.run(send_with_deadline()), 0)
+
+    def test_preparing_runs_off_the_event_loop(self):
+        llm = create_model("ollama://mock-model")
+        prepare_message = llm.prepare_message
+        threads = []
+
+        def recording_prepare(prompt, conversation=None):
+            threads.append(threading.get_ident())
+            return prepare_message(prompt, conversation)
+
+        async def send():
+            return threading.get_ident(), await llm.send_message_async("Write a blog entry about ducks", Conversation())
+
+        with patch.object(llm, "prepare_message", side_effect=recording_prepare):
+            loop_thread, reply = asyncio.run(send())
+        self.assertEqual(reply, ARTICLE_REPLY)
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], loop_thread)
+
+
+class StudioAsyncTests(AsyncTestCase):
+    def test_create_entries_async(self):
+        studio = build_studio("ollama://mock-model", "ollama://mock-model", "ollama://mock-model")
+        entries = asyncio.run(studio.create_entries_async(["Ducks", "Geese", "Swans"], "English", concurrency=2))
+        self.assertEqual(len(entries), 3)
+        for entry in entries:
+            self.assertTrue(entry["content"].startswith("# Rubber Duck Debugging"))
+            self.assertEqual(entry["metadata"]["title"], "Rubber Duck Debugging, Reimagined")
+
+    def test_candidates_run_concurrently(self):
+        with patch.dict(os.environ, {"DRAFT_CANDIDATES": "3"}):
+            studio = build_studio("ollama://mock-model", "ollama://mock-model", "ollama://mock-model")
+            entry = asyncio.run(studio.create_entry_async("Ducks", "English"))
+        self.assertIsNotNone(entry)
+
+
+if __name__ == "__main__":
+    unittest.main()
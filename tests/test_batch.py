@@ -0,0 +1,84 @@
+import io
+import json
+import threading
+import unittest
+
+from batch import BatchWorker, read_jobs, run_batch
+
+
+class FakeStudio:
+    """Studio stand-in that records how it is used."""
+
+    builds = 0
+    lock = threading.Lock()
+
+    def __init__(self, writer_model, editor_model, marketer_model, log_level="INFO"):
+        with self.lock:
+            FakeStudio.builds += 1
+        self.writer_model = writer_model
+        self.cleared = 0
+
+    def clear_history(self):
+        self.cleared += 1
+
+    def create_entry(self, topic, preferred_language):
+        if topic == "explode":
+            raise RuntimeError("writer unavailable")
+        if topic == "reject":
+            return None
+        return {"content": f"{topic} in {preferred_language} by {self.writer_model}", "metadata": {}}
+
+
+class ReadJobsTests(unittest.TestCase):
+    def test_reads_jobs_with_defaults(self):
+        jobs = read_jobs([
+            '{"id": "a", "topic": "Ducks", "writer_llm": "openai://gpt-4"}\n',
+            "\n",
+            '{"request_id": "b", "title": "Geese", "language": "English"}\n',
+        ], "Thai")
+        self.assertEqual([job["id"] for job in jobs], ["a", "b"])
+        self.assertEqual(jobs[0]["language"], "Thai")
+        self.assertEqual(jobs[0]["writer_llm"], "openai://gpt-4")
+        self.assertEqual(jobs[1]["topic"], "Geese")
+        self.assertIsNone(jobs[1]["editor_llm"])
+
+    def test_malformed_lines_become_failed_jobs(self):
+        jobs = read_jobs(['{"topic": "Ducks"}', '{"topic": ', '["Geese"]'], "Thai")
+        output = io.StringIO()
+        counts = run_batch(jobs, output, workers=1, build=FakeStudio)
+        self.assertEqual(counts, {"ok": 1, "rejected": 0, "failed": 2})
+        records = {record["id"]: record for record in map(json.loads, output.getvalue().splitlines())}
+        self.assertEqual(records["1"]["status"], "ok")
+        self.assertEqual(records["2"]["status"], "failed")
+        self.assertIn("Line 2 is not a valid job", records["2"]["error"])
+        self.assertIn("Line 3 is not a valid job: expected a JSON object", records["3"]["error"])
+
+
+class BatchRunnerTests(unittest.TestCase):
+    def setUp(self):
+        FakeStudio.builds = 0
+
+    def test_worker_reuses_studio_per_model_combination(self):
+        worker = BatchWorker(FakeStudio)
+        jobs = read_jobs(['{"topic": "Ducks"}', '{"topic": "Geese"}', '{"topic": "Swans", "writer_llm": "openai://gpt-4"}'], "Thai")
+        records = [worker.run(job) for job in jobs]
+        self.assertEqual(FakeStudio.builds, 2)
+        self.assertEqual(worker.studios[(None, None, None)].cleared, 1)
+        self.assertEqual(records[2]["entry"]["content"], "Swans in Thai by openai://gpt-4")
+        self.assertIn("elapsed_seconds", records[0])
+
+    def test_writes_a_record_per_job(self):
+        topics = ["Ducks", "explode", "reject", "Geese", ""]
+        jobs = read_jobs([json.dumps({"topic": topic}) for topic in topics], "English")
+        output = io.StringIO()
+        counts = run_batch(jobs, output, workers=2, build=FakeStudio)
+        records = {record["id"]: record for record in map(json.loads, output.getvalue().splitlines())}
+        self.assertEqual(counts, {"ok": 2, "rejected": 1, "failed": 2})
+        self.assertEqual(records["2"]["error"], "writer unavailable")
+        self.assertEqual(records["3"]["status"], "rejected")
+        self.assertEqual(records["5"]["error"], "Job has no topic")
+        self.assertLessEqual(FakeStudio.builds, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
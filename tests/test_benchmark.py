@@ -0,0 +1,113 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import pycurl
+
+from benchmark.bench import DiscardSink, percentile, point_at, run_level
+from benchmark.mock_server import ARTICLE_REPLY, METADATA_REPLY, Latency, MockLLMServer
+from llm.cache import ResponseCache
+from llm.factory import create_model
+from llm.metrics import get_registry
+from logger.logger import set_sink
+from studio.writer_agent import WriterAgent
+
+
+class LatencyTests(unittest.TestCase):
+    def test_distributions(self):
+        rng = random.Random(1)
+        self.assertEqual(Latency("fixed:0.25").sample(rng), 0.25)
+        self.assertTrue(0.1 <= Latency("uniform:0.1:0.2").sample(rng) <= 0.2)
+        self.assertGreater(Latency("lognormal:0.1:0.5").sample(rng), 0)
+        with self.assertRaises(ValueError):
+            Latency("normal:1")
+
+    def test_percentile(self):
+        self.assertEqual(percentile([5, 1, 3, 2, 4], 0.5), 3)
+        self.assertEqual(percentile([5, 1, 3, 2, 4], 0.95), 5)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+
+class MockLLMServerTests(unittest.TestCase):
+    def setUp(self):
+        self.server = MockLLMServer(stream_chunks=5, initial_score=4.5, score_step=0.5).start()
+        self.env_patcher = patch.dict(os.environ, {})
+        self.env_patcher.start()
+        point_at(self.server)
+        self.stdout_patcher = patch("builtins.print")
+        self.stdout_patcher.start()
+
+    def tearDown(self):
+        self.stdout_patcher.stop()
+        self.env_patcher.stop()
+        self.server.stop()
+
+    def test_speaks_every_provider_format(self):
+        for model in ("ollama://mock-model", "openai://gpt-mock", "google://gemini-mock"):
+            with self.subTest(model=model):
+                llm = create_model(model)
+                self.assertEqual(llm.send_message("Write a blog entry about ducks"), ARTICLE_REPLY)
+                self.assertEqual(llm.send_message("Create metadata"), METADATA_REPLY)
+
+    def test_streams_every_provider_format(self):
+        for model in ("ollama://mock-model", "openai://gpt-mock", "google://gemini-mock"):
+            with self.subTest(model=model):
+                pieces = list(create_model(model).send_message_stream("Write a blog entry about ducks"))
+                self.assertEqual(len(pieces), 5)
+                self.assertEqual("".join(pieces), ARTICLE_REPLY)
+
+    def test_streamed_openai_calls_record_token_usage(self):
+        llm = create_model("openai://gpt-mock")
+        llm.with_role("stream-usage-test")
+        self.assertTrue(llm.prepare_stream_message("Hello")["stream_options"]["include_usage"])
+        self.assertEqual("".join(llm.send_message_stream("Write a blog entry about ducks")), ARTICLE_REPLY)
+        labels = ("openai", "gpt-mock", "stream-usage-test")
+        self.assertGreater(get_registry().histograms[("blogger_llm_prompt_tokens", labels)].sum, 0)
+        self.assertEqual(get_registry().histograms[("blogger_llm_completion_tokens", labels)].sum, len(ARTICLE_REPLY) // 4 + 1)
+
+    def test_streamed_writer_replies_are_cached(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResponseCache(os.path.join(directory, "cache.sqlite3"))
+            llm = create_model("ollama://mock-model")
+            llm.streaming = True
+            llm.with_cache(cache)
+            first = WriterAgent(llm).write_content("Ducks", "English")
+            self.assertEqual(WriterAgent(llm).write_content("Ducks", "English"), first)
+            self.assertEqual(cache.stats()["hits"], 1)
+            cache.close()
+
+    def test_feedback_score_rises_with_each_review(self):
+        llm = create_model("ollama://mock-model")
+        first = llm.send_message("START OF CONTENT DRAFT\ndraft\nEND OF CONTENT DRAFT")
+        second = llm.send_message("START OF CONTENT DRAFT\ndraft\nEND OF CONTENT DRAFT")
+        self.assertIn('"average_score": 4.5', first)
+        self.assertIn('"flawless": true', second)
+
+    def test_injects_errors(self):
+        self.server.error_rate = 1.0
+        self.server.error_status = 429
+        llm = create_model("ollama://mock-model")
+        curl_client = pycurl.Curl()
+        try:
+            llm.prepare_request(curl_client, {"messages": []}, lambda data: None)
+            curl_client.perform()
+            self.assertEqual(curl_client.getinfo(pycurl.RESPONSE_CODE), 429)
+        finally:
+            curl_client.close()
+
+    def test_benchmark_level_report(self):
+        set_sink(DiscardSink())
+        try:
+            report = run_level("ollama", articles=3, concurrency=3)
+        finally:
+            set_sink(None)
+        self.assertEqual(report["completed"], 3)
+        self.assertGreater(report["articles_per_minute"], 0)
+        self.assertLessEqual(report["p50_seconds"], report["p95_seconds"])
+        self.assertGreater(report["stage_seconds"]["writer"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from llm.cache import ResponseCache, cache_from_env
+from llm.conversation import Conversation
+from llm.factory import use_model
+from llm.openai import OpenAI
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache.sqlite3")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_miss_then_hit(self):
+        cache = ResponseCache(self.path)
+        self.assertIsNone(cache.get("k"))
+        cache.put("k", "reply", 2.5)
+        self.assertEqual(cache.get("k"), "reply")
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1, "saved_seconds": 2.5})
+        cache.close()
+
+    def test_entries_survive_reopening(self):
+        cache = ResponseCache(self.path)
+        cache.put("k", "reply", 1)
+        cache.close()
+        reopened = ResponseCache(self.path)
+        self.assertEqual(reopened.get("k"), "reply")
+        reopened.close()
+
+    def test_expired_entries_are_misses(self):
+        cache = ResponseCache(self.path, ttl_seconds=0)
+        cache.put("k", "reply", 1)
+        time.sleep(0.01)
+        self.assertIsNone(cache.get("k"))
+        cache.close()
+
+    def test_least_recently_used_entry_is_evicted_over_size_limit(self):
+        cache = ResponseCache(self.path, max_bytes=10)
+        cache.put("a", "12345", 1)
+        time.sleep(0.01)
+        cache.put("b", "12345", 1)
+        time.sleep(0.01)
+        cache.get("a")
+        time.sleep(0.01)
+        cache.put("c", "12345", 1)
+        self.assertEqual(cache.get("a"), "12345")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), "12345")
+        cache.close()
+
+    def test_key_depends_on_every_input(self):
+        base = ResponseCache.key("openai", "gpt-4", "be nice", {"messages": [1]})
+        self.assertNotEqual(base, ResponseCache.key("gemini", "gpt-4", "be nice", {"messages": [1]}))
+        self.assertNotEqual(base, ResponseCache.key("openai", "gpt-5", "be nice", {"messages": [1]}))
+        self.assertNotEqual(base, ResponseCache.key("openai", "gpt-4", "be terse", {"messages": [1]}))
+        self.assertNotEqual(base, ResponseCache.key("openai", "gpt-4", "be nice", {"messages": [1, 2]}))
+
+
+class LLMCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.env_patcher = patch.dict(os.environ, {
+            "OPENAI_API_KEY": "test-key",
+            "LLM_CACHE_PATH": os.path.join(self.directory.name, "cache.sqlite3"),
+        })
+        self.env_patcher.start()
+
+    def tearDown(self):
+        cache_from_env().close()
+        self.env_patcher.stop()
+        self.directory.cleanup()
+
+    def test_identical_conversation_is_served_from_cache(self):
+        first = use_model("openai://gpt-4")
+        with patch.object(first, "chat", return_value={"choices": [{"message": {"content": "Hi"}}]}), patch("builtins.print"):
+            self.assertEqual(first.send_message("Hello"), "Hi")
+
+        second = use_model("openai://gpt-4")
+        with patch.object(second, "chat") as mock_chat:
+            self.assertEqual(second.send_message("Hello"), "Hi")
+            mock_chat.assert_not_called()
+        self.assertEqual(cache_from_env().hits, 1)
+
+    def test_salted_conversations_get_replies_of_their_own(self):
+        llm = use_model("openai://gpt-4")
+        replies = [{"choices": [{"message": {"content": reply}}]} for reply in ("First", "Second")]
+        with patch.object(llm, "chat", side_effect=replies) as mock_chat, patch("builtins.print"):
+            self.assertEqual(llm.send_message("Hello", Conversation(cache_salt="candidate-0")), "First")
+            self.assertEqual(llm.send_message("Hello", Conversation(cache_salt="candidate-1")), "Second")
+            self.assertEqual(llm.send_message("Hello", Conversation(cache_salt="candidate-0")), "First")
+        self.assertEqual(mock_chat.call_count, 2)
+
+    def test_cache_disabled_without_path(self):
+        with patch.dict(os.environ, {"LLM_CACHE_PATH": ""}):
+            self.assertIsNone(use_model("openai://gpt-4").cache)
+
+    def test_stream_flag_does_not_change_key(self):
+        llm = OpenAI("gpt-4")
+        payload = llm.prepare_message("Hello")
+        self.assertEqual(llm.cache_key(payload), llm.cache_key(payload | {"stream": True, "stream_options": {"include_usage": True}}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import json
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+
+from daemon import StudioDaemon
+
+
+class FakeStudio:
+    """Studio stand-in that counts how often it is built."""
+
+    builds = 0
+    lock = threading.Lock()
+
+    def __init__(self, writer_model, editor_model, marketer_model, log_level="INFO"):
+        with self.lock:
+            FakeStudio.builds += 1
+
+    def clear_history(self):
+        pass
+
+    def create_entry(self, topic, preferred_language):
+        if topic == "reject":
+            return None
+        return {"content": f"{topic} in {preferred_language}", "metadata": {"title": topic}}
+
+
+def wait_for(daemon: StudioDaemon, job_id: str, timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = daemon.status(job_id)
+        if status["status"] not in ("queued", "running"):
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+class StudioDaemonTests(unittest.TestCase):
+    def setUp(self):
+        FakeStudio.builds = 0
+        self.daemon = StudioDaemon(workers=2, build=FakeStudio, default_language="English", max_jobs=3).start()
+
+    def tearDown(self):
+        self.daemon.stop()
+
+    def test_runs_submitted_jobs_on_warm_studios(self):
+        statuses = [self.daemon.submit({"topic": f"Ducks {index}"}) for index in range(4)]
+        self.assertTrue(all(status["status"] == "queued" for status in statuses))
+        results = [wait_for(self.daemon, status["id"]) for status in statuses]
+        self.assertEqual([result["status"] for result in results], ["ok"] * 4)
+        self.assertEqual(results[0]["entry"]["content"], "Ducks 0 in English")
+        # One studio per worker, built before the first job arrived
+        self.assertEqual(FakeStudio.builds, 2)
+
+    def test_rejects_jobs_without_topic(self):
+        with self.assertRaises(ValueError):
+            self.daemon.submit({"language": "Thai"})
+
+    def test_rejects_models_not_allowed(self):
+        with self.assertRaises(ValueError):
+            self.daemon.submit({"topic": "Ducks", "writer_llm": "ollama://anything"})
+        self.daemon.allowed_models.add("ollama://llama3.1")
+        job_id = self.daemon.submit({"topic": "Ducks", "writer_llm": "ollama://llama3.1"})["id"]
+        self.assertEqual(wait_for(self.daemon, job_id)["status"], "ok")
+
+    def test_keeps_unpolled_results(self):
+        ids = [self.daemon.submit({"topic": "reject"})["id"] for _ in range(3)]
+        deadline = time.monotonic() + 5
+        while any(job["status"] in ("queued", "running") for job in self.daemon.list_jobs()) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.daemon.submit({"topic": "Ducks"})
+        self.assertEqual(self.daemon.status(ids[0])["status"], "rejected")
+        self.daemon.keep_seconds = 0
+        self.daemon.submit({"topic": "Ducks"})
+        self.assertIsNone(self.daemon.status(ids[1]))
+
+    def test_keeps_only_recent_finished_jobs(self):
+        ids = [self.daemon.submit({"topic": "reject"})["id"] for _ in range(3)]
+        for job_id in ids:
+            wait_for(self.daemon, job_id)
+        self.daemon.submit({"topic": "Ducks"})
+        self.assertIsNone(self.daemon.status(ids[0]))
+        self.assertEqual(self.daemon.status(ids[1])["status"], "rejected")
+
+    def test_failed_startup_build_fails_jobs_instead_of_workers(self):
+        def broken_build(*models, log_level="INFO"):
+            raise ValueError("provider unreachable")
+
+        daemon = StudioDaemon(workers=1, build=broken_build, log_level="ERROR").start()
+        self.addCleanup(daemon.stop)
+        status = wait_for(daemon, daemon.submit({"topic": "Ducks"})["id"])
+        self.assertEqual(status["status"], "failed")
+        self.assertEqual(status["error"], "provider unreachable")
+
+    def test_http_api(self):
+        server = self.daemon.serve(0)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        base_url = f"http://127.0.0.1:{server.server_port}"
+
+        request = urllib.request.Request(f"{base_url}/jobs", data=json.dumps({"topic": "Ducks", "language": "Thai"}).encode("utf-8"), method="POST")
+        with urllib.request.urlopen(request) as response:
+            self.assertEqual(response.status, 202)
+            job_id = json.load(response)["id"]
+        wait_for(self.daemon, job_id)
+        with urllib.request.urlopen(f"{base_url}/jobs/{job_id}") as response:
+            status = json.load(response)
+        self.assertEqual(status["status"], "ok")
+        self.assertEqual(status["entry"]["metadata"], {"title": "Ducks"})
+        with urllib.request.urlopen(f"{base_url}/jobs") as response:
+            self.assertEqual([job["id"] for job in json.load(response)["jobs"]], [job_id])
+
+        with self.assertRaises(urllib.error.HTTPError) as missing:
+            urllib.request.urlopen(f"{base_url}/jobs/unknown")
+        self.assertEqual(missing.exception.code, 404)
+        with self.assertRaises(urllib.error.HTTPError) as invalid:
+            urllib.request.urlopen(urllib.request.Request(f"{base_url}/jobs", data=b"[]", method="POST"))
+        self.assertEqual(invalid.exception.code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
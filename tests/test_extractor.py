@@ -1,30 +1,55 @@
+import time
 import unittest
 
-from extractor.json_object import extract_json_objects
-from extractor.section import extract_section
+from extractor.json_object import parse_json_objects
+from extractor.section import SectionStream, extract_section, extract_section_stream, extract_sections
 
 
-class ExtractJsonObjectsTests(unittest.TestCase):
-    def test_single_object_is_returned(self):
-        text = 'prefix {"a": 1} suffix'
-        self.assertEqual(extract_json_objects(text), ['{"a": 1}'])
-
-    def test_multiple_objects_with_nested_content(self):
+class ParseJsonObjectsTests(unittest.TestCase):
+    def test_returns_parsed_objects(self):
         text = 'x {"a": {"b": 2}} y {"c": 3}'
-        self.assertEqual(
-            extract_json_objects(text),
-            ['{"a": {"b": 2}}', '{"c": 3}'],
-        )
+        self.assertEqual(parse_json_objects(text), [{"a": {"b": 2}}, {"c": 3}])
 
     def test_braces_inside_strings_are_ignored(self):
         text = '{"text": "{ not a brace }"}{"next": 1}'
+        self.assertEqual(parse_json_objects(text), [{"text": "{ not a brace }"}, {"next": 1}])
+
+    def test_first_only_stops_after_first_object(self):
+        self.assertEqual(parse_json_objects('{"a": 1} {"b": 2}', first_only=True), [{"a": 1}])
+
+    def test_skips_invalid_candidates(self):
+        self.assertEqual(parse_json_objects('use {braces} like {"a": 1}'), [{"a": 1}])
+
+    def test_unclosed_brace_returns_empty(self):
+        self.assertEqual(parse_json_objects('{"a": 1'), [])
+
+    def test_unquoted_keys_from_editor_prompt(self):
+        text = "**START OF FEEDBACK JSON**\n{flawless: false,average_score: 4.2}"
+        self.assertEqual(parse_json_objects(text), [{"flawless": False, "average_score": 4.2}])
+
+    def test_relaxed_outer_object_wins_over_strict_inner_ones(self):
+        text = '{flawless: false, average_score: 4.0, "sections": [{"id": "S1", "average_score": 5.0}]}'
         self.assertEqual(
-            extract_json_objects(text),
-            ['{"text": "{ not a brace }"}', '{"next": 1}'],
+            parse_json_objects(text, first_only=True),
+            [{"flawless": False, "average_score": 4.0, "sections": [{"id": "S1", "average_score": 5.0}]}],
         )
 
-    def test_unclosed_brace_returns_empty(self):
-        self.assertEqual(extract_json_objects('{"a": 1'), [])
+    def test_commented_object_with_trailing_comma(self):
+        text = """{
+    title: "Ducks: a guide", // string (max 60 characters)
+    suggested_url_slug: "https://example.com/ducks",
+    tags: ["duck", "debugging",],
+}"""
+        self.assertEqual(
+            parse_json_objects(text),
+            [{"title": "Ducks: a guide", "suggested_url_slug": "https://example.com/ducks", "tags": ["duck", "debugging"]}],
+        )
+
+    def test_many_unclosed_braces_stay_linear(self):
+        start_time = time.monotonic()
+        self.assertEqual(parse_json_objects('"{ note "' * 3000), [])
+        self.assertEqual(parse_json_objects("{" + "{ note " * 5000 + '{"a": 1}'), [{"a": 1}])
+        self.assertLess(time.monotonic() - start_time, 0.5)
 
 
 class ExtractSectionTests(unittest.TestCase):
@@ -57,5 +82,88 @@ END OF BODY"""
         self.assertEqual(extract_section(text, "INTRO"), "")
 
 
+class ExtractSectionsTests(unittest.TestCase):
+    FEEDBACK = """**START OF FEEDBACK JSON**
+{flawless: false, average_score: 4.2}
+**START OF OVERALL SCORE**
+Proofreading: 4.5
+Content Quality: 4
+**START OF SUGGESTED FEEDBACK**
+- Shorten the introduction."""
+
+    def test_returns_every_section(self):
+        self.assertEqual(
+            extract_sections(self.FEEDBACK),
+            {
+                "FEEDBACK JSON": "{flawless: false, average_score: 4.2}",
+                "OVERALL SCORE": "Proofreading: 4.5\nContent Quality: 4",
+                "SUGGESTED FEEDBACK": "- Shorten the introduction.",
+            },
+        )
+
+    def test_agrees_with_extract_section(self):
+        texts = [
+            self.FEEDBACK,
+            "Intro\nSTART OF INTRO\nHello there\nEND OF INTRO\nOutro",
+            "START OF A\none\nSTART OF B\ntwo\nEND OF A\nthree",
+            "START OF ARTICLE Here is the article\nSTART OF METADATA\nx",
+            "START OF CONTENT DRAFT--------------\nbody\nEND OF CONTENT DRAFT----------------",
+        ]
+        for text in texts:
+            with self.subTest(text=text):
+                for title, content in extract_sections(text).items():
+                    self.assertEqual(content, extract_section(text, title))
+
+    def test_first_occurrence_wins(self):
+        text = "START OF A\nfirst\nEND OF A\nSTART OF A\nsecond\nEND OF A"
+        self.assertEqual(extract_sections(text), {"A": "first"})
+
+    def test_no_sections(self):
+        self.assertEqual(extract_sections("plain text"), {})
+
+
+class ExtractSectionStreamTests(unittest.TestCase):
+    def test_matches_extract_section_for_chunked_input(self):
+        text = """**START OF ARTICLE**
+# Title
+Body text
+**START OF METADATA**
+words: 3"""
+        chunks = [text[i:i + 3] for i in range(0, len(text), 3)]
+        self.assertEqual(extract_section_stream(chunks, "ARTICLE"), extract_section(text, "ARTICLE"))
+
+    def test_stops_consuming_once_next_section_starts(self):
+        consumed = []
+
+        def chunks():
+            for chunk in ["START OF ARTICLE\nBody\n", "START OF METADATA\n", "ignored", "also ignored"]:
+                consumed.append(chunk)
+                yield chunk
+
+        self.assertEqual(extract_section_stream(chunks(), "ARTICLE"), "Body")
+        self.assertEqual(len(consumed), 2)
+
+    def test_drains_remaining_chunks_without_cancel(self):
+        consumed = []
+
+        def chunks():
+            for chunk in ["START OF ARTICLE\nBody\nEND OF ARTICLE\n", "tail"]:
+                consumed.append(chunk)
+                yield chunk
+
+        self.assertEqual(extract_section_stream(chunks(), "ARTICLE", cancel=False), "Body")
+        self.assertEqual(len(consumed), 2)
+
+    def test_start_marker_split_across_chunks(self):
+        section_stream = SectionStream("ARTICLE")
+        self.assertFalse(section_stream.feed("**START OF ART"))
+        self.assertFalse(section_stream.feed("ICLE**\nBody"))
+        self.assertTrue(section_stream.feed("\n**END OF ARTICLE**"))
+        self.assertEqual(section_stream.section(), "Body")
+
+    def test_missing_section_returns_empty_string(self):
+        self.assertEqual(extract_section_stream(["no markers here"], "ARTICLE"), "")
+
+
 if __name__ == "__main__":
     unittest.main()
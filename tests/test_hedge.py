@@ -0,0 +1,95 @@
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+from benchmark.mock_server import ARTICLE_REPLY, Latency, MockLLMServer
+from llm.conversation import Conversation
+from llm.factory import use_model
+from llm.hedge import HedgeBudget, HedgedLLM, LatencyTracker, tracker_for
+from llm.multi import MultiClient
+from llm.ollama import Ollama
+
+
+def ollama_at(server: MockLLMServer, model_name: str) -> Ollama:
+    with patch.dict(os.environ, {"OLLAMA_API_BASE_URL": server.url, "LLM_MAX_RETRIES": "0"}):
+        return Ollama(model_name)
+
+
+class LatencyTrackerTests(unittest.TestCase):
+    def test_percentile_needs_min_samples(self):
+        tracker = LatencyTracker()
+        for seconds in (0.1, 0.2, 0.3, 0.4):
+            tracker.observe(seconds)
+        self.assertIsNone(tracker.percentile(0.95, min_samples=5))
+        self.assertEqual(tracker.percentile(0.95, min_samples=4), 0.4)
+        self.assertEqual(tracker.percentile(0.5, min_samples=4), 0.2)
+
+
+class HedgeBudgetTests(unittest.TestCase):
+    def test_hedges_are_capped_by_ratio(self):
+        budget = HedgeBudget(0.5)
+        self.assertFalse(budget.try_spend())
+        budget.count_request()
+        budget.count_request()
+        self.assertTrue(budget.try_spend())
+        self.assertFalse(budget.try_spend())
+
+    def test_ratio_never_exceeds_one(self):
+        self.assertEqual(HedgeBudget(3).ratio, 1.0)
+
+
+class HedgedLLMTests(unittest.TestCase):
+    def setUp(self):
+        self.slow = MockLLMServer(latency=Latency("fixed:1.5")).start()
+        self.fast = MockLLMServer().start()
+
+    def tearDown(self):
+        self.slow.stop()
+        self.fast.stop()
+
+    def test_backup_answers_when_primary_is_slow(self):
+        hedged = HedgedLLM([ollama_at(self.slow, "slow-model"), ollama_at(self.fast, "fast-model")], budget_ratio=1.0, initial_delay_seconds=0.1)
+        start_time = time.monotonic()
+        conversation = Conversation()
+        self.assertEqual(hedged.send_message("Write a blog entry about ducks", conversation), ARTICLE_REPLY)
+        self.assertLess(time.monotonic() - start_time, 1.0)
+        # Both members saw the prompt, so either can carry the conversation on
+        self.assertEqual([len(branch) for branch in conversation.branches], [1, 1])
+        self.assertEqual(hedged.history, [])
+        # The cancelled primary still counts, with the time it had taken so far
+        [primary_seconds] = tracker_for(hedged.members[0]).durations
+        self.assertGreaterEqual(primary_seconds, 0.1)
+
+    def test_no_backup_without_budget(self):
+        hedged = HedgedLLM([ollama_at(self.slow, "slow-unbudgeted"), ollama_at(self.fast, "fast-unbudgeted")], budget_ratio=0.0, initial_delay_seconds=0.1)
+        start_time = time.monotonic()
+        self.assertEqual(hedged.send_message("Write a blog entry about ducks"), ARTICLE_REPLY)
+        self.assertGreaterEqual(time.monotonic() - start_time, 1.5)
+
+    def test_fails_over_when_primary_errors(self):
+        broken = MockLLMServer(error_rate=1.0, error_status=400).start()
+        self.addCleanup(broken.stop)
+        hedged = HedgedLLM([ollama_at(broken, "broken-model"), ollama_at(self.fast, "fast-failover")], budget_ratio=1.0, initial_delay_seconds=5)
+        self.assertEqual(hedged.send_message("Write a blog entry about ducks"), ARTICLE_REPLY)
+
+    def test_cancelled_hedge_leaves_nothing_pending(self):
+        hedged = HedgedLLM([ollama_at(self.slow, "slow-cancelled"), ollama_at(self.fast, "fast-cancelled")], budget_ratio=1.0, initial_delay_seconds=5)
+        client = MultiClient(select_timeout_seconds=0.05)
+        calls = []
+        handle = hedged.submit(client, hedged.prepare_message("Write a blog entry about ducks"), lambda resp, error: calls.append(error))
+        client.poll()
+        client.cancel(handle)
+        self.assertEqual(client.pending(), 0)
+        self.assertEqual(calls, [])
+
+    def test_use_model_hedges_models_separated_by_bar(self):
+        with patch.dict(os.environ, {"OLLAMA_API_BASE_URL": self.fast.url, "LLM_CACHE_PATH": ""}):
+            model = use_model("ollama://first | ollama://second")
+        self.assertIsInstance(model, HedgedLLM)
+        self.assertEqual(model.model_name, "first|second")
+        self.assertFalse(model.streaming)
+
+
+if __name__ == "__main__":
+    unittest.main()
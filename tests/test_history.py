@@ -0,0 +1,111 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from llm.gemini import Gemini
+from llm.history import (
+    ChainedPolicy,
+    DropSupersededDrafts,
+    KeepLast,
+    TokenBudget,
+    estimate_tokens,
+    history_policy_from_env,
+)
+from llm.openai import OpenAI
+
+
+def draft_prompt(draft: str) -> str:
+    return f"""Please review:
+START OF CONTENT DRAFT--------------
+{draft}
+END OF CONTENT DRAFT----------------"""
+
+
+class HistoryPolicyTests(unittest.TestCase):
+    def setUp(self):
+        self.patcher = patch.dict(os.environ, {"OPENAI_API_KEY": "test-key", "GEMINI_API_KEY": "test-key"})
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_default_policy_keeps_everything(self):
+        llm = OpenAI("gpt-4")
+        for index in range(5):
+            llm.prepare_message(f"Message {index}")
+        self.assertEqual(len(llm.history), 5)
+
+    def test_keep_last_keeps_original_request(self):
+        llm = OpenAI("gpt-4")
+        llm.with_history_policy(KeepLast(2))
+        for index in range(5):
+            llm.prepare_message(f"Message {index}")
+        self.assertEqual([message["content"] for message in llm.history], ["Message 0", "Message 3", "Message 4"])
+
+    def test_superseded_drafts_are_replaced(self):
+        llm = OpenAI("gpt-4")
+        llm.with_history_policy(DropSupersededDrafts())
+        llm.prepare_message(draft_prompt("first draft"))
+        llm.prepare_message(draft_prompt("second draft"))
+        self.assertNotIn("first draft", llm.history[0]["content"])
+        self.assertIn(DropSupersededDrafts.PLACEHOLDER, llm.history[0]["content"])
+        self.assertIn("END OF CONTENT DRAFT", llm.history[0]["content"])
+        self.assertIn("second draft", llm.history[1]["content"])
+
+    def test_superseded_drafts_for_gemini_parts(self):
+        llm = Gemini("gemini-pro")
+        llm.with_history_policy(DropSupersededDrafts())
+        llm.prepare_message(draft_prompt("first draft"))
+        llm.prepare_message(draft_prompt("second draft"))
+        self.assertNotIn("first draft", llm.message_text(llm.history[0]))
+
+    def test_token_budget_drops_oldest_messages_first(self):
+        llm = OpenAI("gpt-4")
+        llm.with_history_policy(TokenBudget(60))
+        for index in range(6):
+            llm.prepare_message(f"{index}" * 80)
+        self.assertEqual(llm.history[0]["content"], "0" * 80)
+        self.assertEqual(llm.history[-1]["content"], "5" * 80)
+        self.assertLess(len(llm.history), 6)
+        self.assertLessEqual(TokenBudget(60).size(llm.history, llm), 60)
+
+    def test_token_budget_truncates_original_request_last(self):
+        llm = OpenAI("gpt-4")
+        llm.with_history_policy(TokenBudget(40))
+        llm.prepare_message("a" * 400)
+        llm.prepare_message("b" * 40)
+        self.assertEqual(len(llm.history), 2)
+        self.assertTrue(llm.history[0]["content"].endswith(TokenBudget.TRUNCATION_NOTE))
+        self.assertEqual(llm.history[1]["content"], "b" * 40)
+
+    def test_payload_uses_bounded_history(self):
+        llm = OpenAI("gpt-4")
+        llm.with_history_policy(KeepLast(1, keep_first=False))
+        llm.prepare_message("old")
+        payload = llm.prepare_message("new")
+        self.assertEqual([message["content"] for message in payload["messages"][1:]], ["new"])
+
+    def test_estimate_tokens(self):
+        self.assertEqual(estimate_tokens("abcd" * 10), 11)
+
+
+class HistoryPolicyFromEnvTests(unittest.TestCase):
+    def test_builds_chain_from_environment(self):
+        with patch.dict(os.environ, {"EDITOR_HISTORY_POLICY": "drafts", "EDITOR_HISTORY_TOKEN_BUDGET": "1000"}):
+            policy = history_policy_from_env("editor")
+        self.assertIsInstance(policy, ChainedPolicy)
+        self.assertIsInstance(policy.policies[0], DropSupersededDrafts)
+        self.assertEqual(policy.policies[1].max_tokens, 1000)
+
+    def test_keep_last_spec(self):
+        with patch.dict(os.environ, {"WRITER_HISTORY_POLICY": "last:3"}):
+            self.assertEqual(history_policy_from_env("writer").policies[0].count, 3)
+
+    def test_unknown_policy_raises(self):
+        with patch.dict(os.environ, {"WRITER_HISTORY_POLICY": "everything"}):
+            with self.assertRaises(ValueError):
+                history_policy_from_env("writer")
+
+
+if __name__ == "__main__":
+    unittest.main()
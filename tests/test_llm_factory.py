@@ -3,6 +3,7 @@ import unittest
 from unittest.mock import patch, MagicMock, Mock
 import json
 
+from llm.conversation import Conversation
 from llm.factory import use_model
 from llm.openai import OpenAI
 from llm.gemini import Gemini
@@ -430,6 +431,28 @@ class MultiMessageConversationTests(unittest.TestCase):
                 self.assertEqual(llm.history[0]["parts"][0]["text"], "Message 1")
                 self.assertEqual(llm.history[1]["parts"][0]["text"], "Message 2")
 
+    def test_conversations_are_kept_apart_from_the_client(self):
+        """One client should carry several conversations without mixing them"""
+        with patch.dict(os.environ, {"OLLAMA_API_BASE_URL": "http://localhost:11434"}):
+            llm = Ollama("llama2:13b")
+            llm.with_instruction("You are helpful")
+            first, second = Conversation(), Conversation()
+
+            with patch.object(llm, 'chat') as mock_chat:
+                mock_chat.return_value = {
+                    "message": {"content": "Response"}
+                }
+
+                llm.send_message("First 1", first)
+                llm.send_message("Second 1", second)
+                llm.send_message("First 2", first)
+
+                self.assertEqual([message["content"] for message in first.messages], ["First 1", "First 2"])
+                self.assertEqual([message["content"] for message in second.messages], ["Second 1"])
+                self.assertEqual(llm.history, [])
+                sent_messages = mock_chat.call_args.args[0]["messages"]
+                self.assertEqual([message["content"] for message in sent_messages], ["You are helpful", "First 1", "First 2"])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,10 +1,12 @@
 import io
+import json
 import os
 import unittest
 from contextlib import redirect_stdout
 from unittest.mock import patch
 
-from logger.logger import Logger
+from logger.logger import Logger, set_sink
+from logger.sink import BufferedSink, ConsoleSink, JsonLinesSink, LogRecord, sink_from_env
 from pen.pen import pen
 
 
@@ -68,6 +70,75 @@ class LoggerTests(unittest.TestCase):
         out = self.capture_output(self.logger.debug_block, title, content)
         self.assertEqual(out, expected)
 
+    def test_deferred_debug_message_is_not_built_below_debug_level(self):
+        def build():
+            raise AssertionError("message should not be built")
+
+        out = self.capture_output(self.logger.debug_block, "TITLE", build)
+        self.assertEqual(out, "")
+
+    def test_deferred_message_is_built_when_enabled(self):
+        self.logger.set_level("DEBUG")
+        out = self.capture_output(self.logger.debug, lambda: "built")
+        self.assertEqual(out, f"[<APP>] {pen.gray('built')}\n")
+
+
+class SinkTests(unittest.TestCase):
+    def setUp(self):
+        self.logger = Logger("APP", pen.red)
+
+    def tearDown(self):
+        set_sink(None)
+
+    def test_json_lines_sink_writes_uncolored_records(self):
+        buf = io.StringIO()
+        set_sink(JsonLinesSink(buf))
+        self.logger.log(f"score {pen.yellow_bright('4.5')}")
+        self.logger.log_block("TITLE", "content")
+        first, second = [json.loads(line) for line in buf.getvalue().splitlines()]
+        self.assertEqual(first["namespace"], "APP")
+        self.assertEqual(first["level"], "INFO")
+        self.assertEqual(first["message"], "score 4.5")
+        self.assertEqual(second["title"], "TITLE")
+        self.assertEqual(second["message"], "content")
+
+    def test_json_lines_sink_flushes_each_record_unless_buffered(self):
+        buf = io.StringIO()
+        with patch.object(buf, "flush") as flush:
+            JsonLinesSink(buf).emit(LogRecord("APP", pen.red, "INFO", "hello"))
+            JsonLinesSink(buf, autoflush=False).emit(LogRecord("APP", pen.red, "INFO", "hello"))
+        self.assertEqual(flush.call_count, 1)
+        with patch.dict(os.environ, {"LOG_FORMAT": "json", "LOG_BUFFERED": "true"}):
+            self.assertFalse(sink_from_env().sink.autoflush)
+
+    def test_buffered_sink_writes_everything_on_flush(self):
+        buf = io.StringIO()
+        sink = BufferedSink(JsonLinesSink(buf))
+        set_sink(sink)
+        for index in range(100):
+            self.logger.log(f"message {index}")
+        sink.flush()
+        lines = buf.getvalue().splitlines()
+        self.assertEqual(len(lines), 100)
+        self.assertEqual(json.loads(lines[-1])["message"], "message 99")
+
+    def test_sink_from_environment(self):
+        with patch.dict(os.environ, {"LOG_FORMAT": "json", "LOG_BUFFERED": "false"}):
+            self.assertIsInstance(sink_from_env(), JsonLinesSink)
+        with patch.dict(os.environ, {"LOG_FORMAT": "text", "LOG_BUFFERED": "false"}):
+            self.assertIsInstance(sink_from_env(), ConsoleSink)
+        with patch.dict(os.environ, {"LOG_FORMAT": "json", "LOG_BUFFERED": "true"}):
+            self.assertIsInstance(sink_from_env(), BufferedSink)
+
+    def test_auto_format_uses_json_when_not_a_terminal(self):
+        with patch.dict(os.environ, {"LOG_FORMAT": "auto", "LOG_BUFFERED": "false"}), redirect_stdout(io.StringIO()):
+            self.assertIsInstance(sink_from_env(), JsonLinesSink)
+
+    def test_unknown_format_raises(self):
+        with patch.dict(os.environ, {"LOG_FORMAT": "xml"}):
+            with self.assertRaises(ValueError):
+                sink_from_env()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,106 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from llm.metrics import CallMetrics, Histogram, MetricsRegistry, get_registry
+from llm.ollama import Ollama
+
+
+def call(role: str = "writer", total_seconds: float = 0.3, prompt_tokens: int | None = 100) -> CallMetrics:
+    metrics = CallMetrics("ollama", "llama2", role)
+    metrics.total_seconds = total_seconds
+    metrics.prompt_tokens = prompt_tokens
+    return metrics
+
+
+class HistogramTests(unittest.TestCase):
+    def test_observations_fall_in_the_first_bucket_they_fit(self):
+        histogram = Histogram((1, 5))
+        for value in (0.5, 1, 3, 9):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [2, 1, 1])
+        self.assertEqual(histogram.sum, 13.5)
+        self.assertEqual(histogram.count, 4)
+
+
+class MetricsRegistryTests(unittest.TestCase):
+    def test_renders_prometheus_histograms_per_role(self):
+        registry = MetricsRegistry()
+        registry.record(call("writer", 0.3))
+        registry.record(call("writer", 3.0))
+        registry.record(call("editor", 0.3, prompt_tokens=None))
+        text = registry.render()
+        self.assertIn('blogger_llm_requests_total{provider="ollama",model="llama2",role="writer",status="ok"} 2', text)
+        self.assertIn('blogger_llm_request_seconds_bucket{provider="ollama",model="llama2",role="writer",le="0.5"} 1', text)
+        self.assertIn('blogger_llm_request_seconds_bucket{provider="ollama",model="llama2",role="writer",le="+Inf"} 2', text)
+        self.assertIn('blogger_llm_request_seconds_count{provider="ollama",model="llama2",role="editor"} 1', text)
+        self.assertNotIn('blogger_llm_prompt_tokens_count{provider="ollama",model="llama2",role="editor"}', text)
+        self.assertEqual(text.count("# TYPE blogger_llm_request_seconds histogram"), 1)
+
+    def test_label_values_are_escaped(self):
+        registry = MetricsRegistry()
+        registry.record(CallMetrics("ollama", 'odd"model', "writer"))
+        self.assertIn('model="odd\\"model"', registry.render())
+
+    def test_writes_textfile_and_serves_http(self):
+        registry = MetricsRegistry()
+        registry.record(call())
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "blogger.prom")
+            registry.write_textfile(path)
+            with open(path, encoding="utf-8") as textfile:
+                self.assertEqual(textfile.read(), registry.render())
+        server = registry.serve(0)
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics") as response:
+                self.assertEqual(response.read().decode("utf-8"), registry.render())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class UsageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = json.dumps({"message": {"content": "hello"}, "prompt_eval_count": 42, "eval_count": 7}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LLMCallMetricsTests(unittest.TestCase):
+    def test_chat_records_timings_and_token_usage(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), UsageHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            with patch.dict(os.environ, {"OLLAMA_API_BASE_URL": f"http://127.0.0.1:{server.server_port}"}):
+                llm = Ollama("metrics-model")
+            llm.with_role("metrics-test")
+            with patch("builtins.print"):
+                self.assertEqual(llm.send_message("hi"), "hello")
+        finally:
+            server.shutdown()
+            server.server_close()
+        labels = ("ollama", "metrics-model", "metrics-test")
+        registry = get_registry()
+        self.assertEqual(registry.requests[labels + ("ok",)], 1)
+        self.assertEqual(registry.histograms[("blogger_llm_prompt_tokens", labels)].sum, 42)
+        self.assertEqual(registry.histograms[("blogger_llm_completion_tokens", labels)].sum, 7)
+        self.assertGreater(registry.histograms[("blogger_llm_request_bytes", labels)].sum, 0)
+        self.assertGreater(registry.histograms[("blogger_llm_request_seconds", labels)].sum, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+from benchmark.bench import point_at
+from benchmark.mock_server import Latency, MockLLMServer
+from llm.factory import create_model
+from studio.outline import parse_outline, strip_heading
+from studio.writer_agent import WriterAgent
+
+
+OUTLINE = """# Rubber Ducks
+**Primary Keyword:** rubber duck debugging
+## Introduction
+- what the duck is for
+* who uses it
+## How to Start ##
+## Conclusion"""
+
+
+class ParseOutlineTests(unittest.TestCase):
+    def test_reads_title_keyword_and_sections(self):
+        outline = parse_outline(OUTLINE)
+        self.assertEqual(outline.title, "Rubber Ducks")
+        self.assertEqual(outline.primary_keyword, "rubber duck debugging")
+        self.assertEqual([section.heading for section in outline.sections], ["Introduction", "How to Start", "Conclusion"])
+        self.assertEqual(outline.sections[0].notes, ["what the duck is for", "who uses it"])
+
+    def test_rejects_outlines_without_enough_sections(self):
+        with self.assertRaises(ValueError):
+            parse_outline("# Rubber Ducks\n## Only one")
+        with self.assertRaises(ValueError):
+            parse_outline("## Untitled\n## Sections")
+
+    def test_join_uses_outline_headings(self):
+        outline = parse_outline(OUTLINE)
+        article = outline.join(["Ducks help.", "## How to start\n\nGet a duck.", "Talk to it."])
+        self.assertEqual(article, "# Rubber Ducks\n\n## Introduction\n\nDucks help.\n\n## How to Start\n\nGet a duck.\n\n## Conclusion\n\nTalk to it.")
+
+    def test_strip_heading_keeps_other_headings(self):
+        self.assertEqual(strip_heading("### Step one\nGet a duck.", "How to Start"), "### Step one\nGet a duck.")
+
+
+class SectionWritingTests(unittest.TestCase):
+    def setUp(self):
+        self.server = MockLLMServer(latency=Latency("fixed:0.3")).start()
+        self.env_patcher = patch.dict(os.environ, {"LLM_MAX_RETRIES": "0", "LLM_CACHE_PATH": ""})
+        self.env_patcher.start()
+        point_at(self.server)
+        self.stdout_patcher = patch("builtins.print")
+        self.stdout_patcher.start()
+
+    def tearDown(self):
+        self.stdout_patcher.stop()
+        self.env_patcher.stop()
+        self.server.stop()
+
+    def test_sections_are_written_concurrently(self):
+        writer = WriterAgent(create_model("ollama://mock-model"), draft_mode="sections")
+        start_time = time.monotonic()
+        content = writer.write_content("Rubber ducks", "English")
+        # Outline, both sections side by side, then the coherence check
+        self.assertLess(time.monotonic() - start_time, 1.2)
+        self.assertTrue(content.startswith("# Rubber Duck Debugging, Reimagined\n\n## Why it works\n\nExplaining a bug"))
+        self.assertIn("## Try it today", content)
+        self.assertEqual(len(writer.conversation.messages), 2)
+
+    def test_falls_back_to_one_completion_without_an_outline(self):
+        with patch.object(MockLLMServer, "reply_for", side_effect=["No outline today.", "START OF ARTICLE\n# Ducks\nQuack."]):
+            writer = WriterAgent(create_model("ollama://mock-model"), draft_mode="sections")
+            self.assertEqual(writer.write_content("Rubber ducks", "English"), "# Ducks\nQuack.")
+
+
+if __name__ == "__main__":
+    unittest.main()
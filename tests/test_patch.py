@@ -0,0 +1,48 @@
+import unittest
+
+from studio.patch import PatchError, apply_edits, parse_edits
+
+
+DRAFT = """# Rubber Ducks
+Talk to the duck.
+## Why it works
+Explaining forces you to slow down.
+## Try it
+Talk to the duck today."""
+
+
+def edit_block(search: str, replace: str) -> str:
+    return f"<<<<<<< SEARCH\n{search}\n=======\n{replace}\n>>>>>>> REPLACE"
+
+
+class ParseEditsTests(unittest.TestCase):
+    def test_reads_every_block(self):
+        edits = parse_edits("Some notes\n" + edit_block("a", "b") + "\n\n" + edit_block("c\nd", ""))
+        self.assertEqual([(edit.search, edit.replace) for edit in edits], [("a", "b"), ("c\nd", "")])
+
+    def test_ignores_text_without_blocks(self):
+        self.assertEqual(parse_edits(DRAFT), [])
+
+
+class ApplyEditsTests(unittest.TestCase):
+    def test_applies_edits_in_order(self):
+        edits = parse_edits(edit_block("## Why it works\nExplaining", "## Why it works\nSaying it out loud") + "\n" + edit_block("Saying it out loud", "Saying it aloud"))
+        revised = apply_edits(DRAFT, edits)
+        self.assertIn("## Why it works\nSaying it aloud forces you to slow down.", revised)
+        self.assertTrue(revised.startswith("# Rubber Ducks\nTalk to the duck.\n"))
+
+    def test_tolerates_trailing_whitespace(self):
+        revised = apply_edits(DRAFT, parse_edits(edit_block("## Try it   \nTalk to the duck today.", "## Try it\nTalk to a duck today.")))
+        self.assertTrue(revised.endswith("## Try it\nTalk to a duck today."))
+
+    def test_rejects_ambiguous_or_missing_search(self):
+        with self.assertRaises(PatchError):
+            apply_edits(DRAFT, parse_edits(edit_block("Talk to the duck", "Talk to a duck")))
+        with self.assertRaises(PatchError):
+            apply_edits(DRAFT, parse_edits(edit_block("Talk to the goose.", "Talk to a duck.")))
+        with self.assertRaises(PatchError):
+            apply_edits(DRAFT, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from llm.pool import ConnectionPool, close_pools, pool_for
+
+
+class ConnectionPoolTests(unittest.TestCase):
+    def test_released_handle_is_reused(self):
+        pool = ConnectionPool(max_size=2)
+        curl_client = pool.acquire()
+        pool.release(curl_client)
+        self.assertIs(pool.acquire(), curl_client)
+        pool.close()
+
+    def test_handles_beyond_max_size_are_not_kept(self):
+        pool = ConnectionPool(max_size=1)
+        first = pool.acquire()
+        second = pool.acquire()
+        pool.release(first)
+        pool.release(second)
+        self.assertEqual(len(pool.idle), 1)
+        pool.close()
+
+    def test_idle_handles_are_evicted(self):
+        pool = ConnectionPool(max_size=2, idle_seconds=0)
+        curl_client = pool.acquire()
+        pool.release(curl_client)
+        self.assertIsNot(pool.acquire(), curl_client)
+        self.assertEqual(pool.idle, [])
+        pool.close()
+
+
+class PoolForTests(unittest.TestCase):
+    def tearDown(self):
+        close_pools()
+
+    def test_same_host_shares_pool(self):
+        first = pool_for("https://api.example.com/v1/chat?key=a")
+        second = pool_for("https://api.example.com/v1/other?key=b")
+        self.assertIs(first, second)
+
+    def test_different_hosts_get_different_pools(self):
+        self.assertIsNot(pool_for("https://a.example.com/"), pool_for("https://b.example.com/"))
+
+    def test_pool_settings_from_environment(self):
+        with patch.dict(os.environ, {"CONNECTION_POOL_SIZE": "7", "CONNECTION_POOL_IDLE_SECONDS": "12"}):
+            pool = pool_for("http://localhost:11434/api/chat")
+        self.assertEqual(pool.max_size, 7)
+        self.assertEqual(pool.idle_seconds, 12)
+
+
+if __name__ == "__main__":
+    unittest.main()
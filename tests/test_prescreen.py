@@ -0,0 +1,80 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from studio.prescreen import HasArticle, HasTitle, KeywordDensity, MaximumParagraphWords, MinimumWords, PreScreen, prescreen_from_env
+from studio.steps import run_steps
+from tests.test_studio import ARTICLE_REPLY, METADATA_REPLY, build_studio, feedback_reply
+
+
+def article(paragraphs: int, words_per_paragraph: int = 50, keyword_every: int = 0) -> str:
+    words = []
+    for index in range(words_per_paragraph):
+        words.append("rubber duck" if keyword_every and index % keyword_every == 0 else "word")
+    return "# Rubber Ducks\n\n" + "\n\n".join(" ".join(words) for _ in range(paragraphs))
+
+
+class PreScreenRuleTests(unittest.TestCase):
+    def test_article_and_title(self):
+        self.assertIsNotNone(HasArticle().check("  ", "duck"))
+        self.assertIsNotNone(HasTitle().check("## Only a heading\nText.", "duck"))
+        self.assertIsNone(HasTitle().check("# Ducks\nText.", "duck"))
+
+    def test_minimum_words(self):
+        self.assertIn("has 102 words", MinimumWords(200).check(article(2), "duck"))
+        self.assertIsNone(MinimumWords(200).check(article(4), "duck"))
+
+    def test_long_paragraphs_are_named(self):
+        failure = MaximumParagraphWords(40).check(article(1), "duck")
+        self.assertIn("(50 words)", failure)
+        # Lists are not prose paragraphs
+        self.assertIsNone(MaximumParagraphWords(40).check("# Ducks\n\n" + "\n".join(["- word word word"] * 20), "duck"))
+
+    def test_keyword_density(self):
+        rule = KeywordDensity(0.8, 1.5)
+        self.assertIn("Use it naturally more often", rule.check(article(4), "rubber duck"))
+        self.assertIn("Use it less often", rule.check(article(4, keyword_every=2), "rubber duck"))
+        # One two-word keyword per paragraph of 200 words is about 1% of them
+        self.assertIsNone(rule.check(article(4, words_per_paragraph=199, keyword_every=199), "Rubber Duck"))
+
+    def test_keyword_density_is_skipped_without_a_keyword(self):
+        self.assertIsNone(KeywordDensity(0.8, 1.5).check(article(4), ""))
+
+    def test_spec_from_env(self):
+        with patch.dict(os.environ, {"DRAFT_PRESCREEN": "article,title,words:1200,paragraph:150,density:0.8:1.5"}):
+            self.assertEqual(len(prescreen_from_env().rules), 5)
+        with patch.dict(os.environ, {"DRAFT_PRESCREEN": "words"}):
+            with self.assertRaises(ValueError):
+                prescreen_from_env()
+        with patch.dict(os.environ, {"DRAFT_PRESCREEN": ""}):
+            self.assertEqual(prescreen_from_env().check("", "duck"), [])
+
+
+class StudioPreScreenTests(unittest.TestCase):
+    def setUp(self):
+        self.stdout_patcher = patch("builtins.print")
+        self.stdout_patcher.start()
+
+    def tearDown(self):
+        self.stdout_patcher.stop()
+
+    def test_failing_draft_skips_the_editor(self):
+        long_article = "START OF ARTICLE\n" + article(3)
+        studio = build_studio([ARTICLE_REPLY, long_article], [feedback_reply(5.0, True)], [METADATA_REPLY], prescreen=PreScreen(MinimumWords(100)))
+        entry = studio.create_entry("Rubber ducks", "English")
+        self.assertEqual(entry["content"], article(3))
+        self.assertEqual(len(studio.editor.conversation.messages), 1)
+        self.assertIn("far below the target", studio.writer.conversation.messages[-1])
+
+    def test_candidates_are_checked_with_the_writers_keyword(self):
+        reply = "START OF ARTICLE\n" + article(4) + "\nSTART OF METADATA\n- **Primary Keyword:** rubber duck"
+        studio = build_studio([reply], [], [], prescreen=PreScreen(KeywordDensity(0.8, 1.5)))
+        writer, editor, draft, result = run_steps(studio.draft_candidate_steps(studio.writer, studio.editor, "Ducks", "English"))
+        self.assertEqual(writer.primary_keyword, "rubber duck")
+        self.assertTrue(result["prescreened"])
+        self.assertIn("\"rubber duck\" appears 0 times", result["suggested_feedback"])
+        self.assertEqual(editor.conversation.messages, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
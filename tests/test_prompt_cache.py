@@ -0,0 +1,155 @@
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+from llm import gemini
+from llm.gemini import Gemini
+from llm.ollama import Ollama
+from llm.openai import OpenAI
+
+
+LONG_INSTRUCTION = "You are a meticulous editor. " * 200
+
+GENERATED = {"candidates": [{"content": {"parts": [{"text": "Hello"}]}}]}
+
+
+class GeminiContextCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.patchers = [
+            patch.dict(os.environ, {"GEMINI_API_KEY": "test-key"}),
+            patch.dict(gemini._cached_contexts, clear=True),
+            patch.object(gemini, "_creating_contexts", set()),
+            patch("builtins.print"),
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):
+        for patcher in reversed(self.patchers):
+            patcher.stop()
+
+    def test_long_instruction_is_sent_through_cached_content(self):
+        llm = Gemini("gemini-2.5-flash")
+        llm.with_instruction(LONG_INSTRUCTION)
+        with patch.object(llm, "chat") as mock_chat:
+            mock_chat.side_effect = [{"name": "cachedContents/abc"}, GENERATED, GENERATED]
+            llm.send_message("First")
+            llm.send_message("Second")
+        create_call, first_call, second_call = mock_chat.call_args_list
+        self.assertEqual(create_call.kwargs["url"], llm.cached_contents_url)
+        self.assertEqual(create_call.args[0]["systemInstruction"]["parts"][0]["text"], LONG_INSTRUCTION)
+        self.assertEqual(first_call.args[0]["cachedContent"], "cachedContents/abc")
+        self.assertNotIn("system_instruction", second_call.args[0])
+
+    def test_context_is_shared_by_clients_with_the_same_profile(self):
+        first = Gemini("gemini-2.5-flash")
+        first.with_instruction(LONG_INSTRUCTION)
+        second = Gemini("gemini-2.5-flash")
+        second.with_instruction(LONG_INSTRUCTION)
+        with patch.object(first, "chat", return_value={"name": "cachedContents/abc"}) as first_chat:
+            first.prepare_message("Hello")
+        with patch.object(second, "chat") as second_chat:
+            self.assertEqual(second.prepare_message("Hello")["cachedContent"], "cachedContents/abc")
+            second_chat.assert_not_called()
+        self.assertEqual(first_chat.call_count, 1)
+
+    def test_context_ttl_is_extended_before_expiry(self):
+        llm = Gemini("gemini-2.5-flash")
+        llm.with_instruction(LONG_INSTRUCTION)
+        with patch.object(llm, "chat", side_effect=[{"name": "cachedContents/abc"}, {"name": "cachedContents/abc"}]) as mock_chat:
+            llm.prepare_message("Hello")
+            for cached_context in gemini._cached_contexts.values():
+                cached_context.renew_at = time.time()
+            self.assertEqual(llm.prepare_message("Again")["cachedContent"], "cachedContents/abc")
+        renew_call = mock_chat.call_args_list[1]
+        self.assertEqual(renew_call.kwargs["method"], "PATCH")
+        self.assertIn("/cachedContents/abc?updateMask=ttl&", renew_call.kwargs["url"])
+        self.assertEqual(renew_call.args[0], {"ttl": f"{llm.prompt_cache_ttl_seconds}s"})
+        self.assertGreater(next(iter(gemini._cached_contexts.values())).renew_at, time.time())
+
+    def test_context_is_recreated_when_extending_fails(self):
+        llm = Gemini("gemini-2.5-flash")
+        llm.with_instruction(LONG_INSTRUCTION)
+        responses = [{"name": "cachedContents/old"}, {"error": {"message": "not found"}}, {"name": "cachedContents/new"}]
+        with patch.object(llm, "chat", side_effect=responses) as mock_chat:
+            llm.prepare_message("Hello")
+            for cached_context in gemini._cached_contexts.values():
+                cached_context.renew_at = time.time()
+            self.assertEqual(llm.prepare_message("Again")["cachedContent"], "cachedContents/new")
+        self.assertEqual(mock_chat.call_args_list[2].kwargs["url"], llm.cached_contents_url)
+
+    def test_failed_cache_creation_falls_back_to_inline_instruction(self):
+        llm = Gemini("gemini-2.5-flash")
+        llm.with_instruction(LONG_INSTRUCTION)
+        with patch.object(llm, "chat", return_value={"error": {"message": "too small"}}):
+            payload = llm.prepare_message("Hello")
+        self.assertEqual(payload["system_instruction"]["parts"][0]["text"], LONG_INSTRUCTION)
+
+    def test_failed_cache_creation_is_retried_after_a_backoff(self):
+        llm = Gemini("gemini-2.5-flash")
+        llm.with_instruction(LONG_INSTRUCTION)
+        with patch.object(llm, "chat", side_effect=[{"error": {"message": "unavailable"}}, {"name": "cachedContents/abc"}]) as mock_chat:
+            llm.prepare_message("Hello")
+            self.assertNotIn("cachedContent", llm.prepare_message("Again"))
+            self.assertEqual(mock_chat.call_count, 1)
+            with patch("time.time", return_value=time.time() + gemini.CACHE_RETRY_SECONDS):
+                self.assertEqual(llm.prepare_message("Later")["cachedContent"], "cachedContents/abc")
+
+    def test_context_being_created_is_not_waited_for(self):
+        llm = Gemini("gemini-2.5-flash")
+        llm.with_instruction(LONG_INSTRUCTION)
+        gemini._creating_contexts.add((llm.model_name, llm.instruction_fingerprint()))
+        with patch.object(llm, "chat") as mock_chat:
+            payload = llm.prepare_message("Hello")
+            mock_chat.assert_not_called()
+        self.assertIn("system_instruction", payload)
+
+    def test_short_instruction_is_sent_inline(self):
+        llm = Gemini("gemini-2.5-flash")
+        llm.with_instruction("Be brief.")
+        with patch.object(llm, "chat") as mock_chat:
+            payload = llm.prepare_message("Hello")
+            mock_chat.assert_not_called()
+        self.assertIn("system_instruction", payload)
+
+
+class PromptCacheHintTests(unittest.TestCase):
+    def test_openai_prompt_cache_key_follows_instruction(self):
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"}):
+            llm = OpenAI("gpt-4.1-mini")
+        llm.with_instruction("alice")
+        first_key = llm.prepare_message("Hello")["prompt_cache_key"]
+        self.assertEqual(llm.prepare_message("Again")["prompt_cache_key"], first_key)
+        llm.with_instruction("bob")
+        self.assertNotEqual(llm.prepare_message("Hello")["prompt_cache_key"], first_key)
+
+    def test_ollama_keep_alive(self):
+        with patch.dict(os.environ, {"OLLAMA_API_BASE_URL": "http://localhost:11434", "OLLAMA_KEEP_ALIVE": "1h"}):
+            llm = Ollama("llama2:13b")
+        self.assertEqual(llm.prepare_message("Hello")["keep_alive"], "1h")
+
+    def test_prompt_cache_can_be_disabled(self):
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test-key", "PROMPT_CACHE": "false"}):
+            llm = OpenAI("gpt-4.1-mini")
+        self.assertNotIn("prompt_cache_key", llm.prepare_message("Hello"))
+
+    def test_serialized_payloads_share_a_byte_stable_prefix(self):
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"}):
+            llm = OpenAI("gpt-4.1-mini")
+        llm.with_instruction(LONG_INSTRUCTION)
+        first = llm.serialize_payload(llm.prepare_message("First"))
+        second = llm.serialize_payload(llm.prepare_message("Second"))
+        prefix = first[:first.index("First")]
+        self.assertTrue(second.startswith(prefix))
+
+    def test_response_cache_key_ignores_provider_cache_hints(self):
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"}):
+            llm = OpenAI("gpt-4.1-mini")
+        payload = llm.prepare_message("Hello")
+        without_hint = {key: value for key, value in payload.items() if key != "prompt_cache_key"}
+        self.assertEqual(llm.cache_key(payload), llm.cache_key(without_hint))
+
+
+if __name__ == "__main__":
+    unittest.main()
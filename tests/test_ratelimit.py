@@ -0,0 +1,196 @@
+import json
+import os
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pycurl
+
+from llm.multi import MultiClient
+from llm.ollama import Ollama
+from llm.ratelimit import (
+    HTTPStatusError,
+    RateLimiter,
+    ResponseHeaders,
+    RetryPolicy,
+    TokenBucket,
+    is_retryable,
+    limiter_for,
+    parse_retry_after,
+    reset_limiters,
+)
+
+
+class TokenBucketTests(unittest.TestCase):
+    def test_waits_for_refill(self):
+        bucket = TokenBucket(60)
+        now = bucket.updated
+        self.assertEqual(bucket.wait_time(60, now), 0)
+        bucket.take(60)
+        self.assertAlmostEqual(bucket.wait_time(2, now), 2.0)
+        self.assertAlmostEqual(bucket.wait_time(2, now + 1), 1.0)
+
+    def test_oversized_request_waits_for_a_full_bucket(self):
+        bucket = TokenBucket(60)
+        self.assertEqual(bucket.wait_time(1000, bucket.updated), 0)
+
+
+class RateLimiterTests(unittest.TestCase):
+    def test_requests_per_minute(self):
+        limiter = RateLimiter(requests_per_minute=2)
+        self.assertEqual(limiter.try_acquire(), 0)
+        self.assertEqual(limiter.try_acquire(), 0)
+        self.assertGreater(limiter.try_acquire(), 0)
+
+    def test_tokens_per_minute_settle_against_usage(self):
+        limiter = RateLimiter(tokens_per_minute=100)
+        self.assertEqual(limiter.try_acquire(10), 0)
+        limiter.release(10, used_tokens=95)
+        self.assertGreater(limiter.try_acquire(10), 0)
+
+    def test_concurrency_limit_halves_on_throttling_and_grows_back(self):
+        limiter = RateLimiter(max_concurrency=4)
+        for _ in range(4):
+            self.assertEqual(limiter.try_acquire(), 0)
+        self.assertGreater(limiter.try_acquire(), 0)
+        limiter.release(error=HTTPStatusError(429, "slow down"))
+        self.assertEqual(limiter.concurrency_limit, 2)
+        for _ in range(3):
+            limiter.release()
+        self.assertGreater(limiter.concurrency_limit, 3)
+        self.assertLessEqual(limiter.concurrency_limit, 4)
+
+    def test_abandoned_requests_free_the_slot_without_growing_the_limit(self):
+        limiter = RateLimiter(max_concurrency=4)
+        for _ in range(4):
+            limiter.try_acquire()
+        limiter.release(error=HTTPStatusError(429, "slow down"))
+        limiter.abandon()
+        limiter.abandon()
+        self.assertEqual(limiter.concurrency_limit, 2)
+        self.assertEqual(limiter.in_flight, 1)
+
+    def test_first_throttle_starts_limiting_an_unbounded_provider(self):
+        limiter = RateLimiter()
+        for _ in range(6):
+            limiter.try_acquire()
+        limiter.release(error=HTTPStatusError(503, "overloaded"))
+        self.assertEqual(limiter.concurrency_limit, 3)
+
+    def test_retry_after_pauses_the_provider(self):
+        limiter = RateLimiter()
+        limiter.try_acquire()
+        limiter.release(error=HTTPStatusError(429, "slow down", retry_after=5))
+        self.assertGreater(limiter.try_acquire(), 4)
+
+    def test_limiter_is_shared_per_provider(self):
+        reset_limiters()
+        with patch.dict(os.environ, {"OPENAI_REQUESTS_PER_MINUTE": "30", "OPENAI_MAX_CONCURRENCY": "3"}):
+            limiter = limiter_for("openai")
+        self.assertIs(limiter_for("openai"), limiter)
+        self.assertEqual(limiter.requests.capacity, 30)
+        self.assertEqual(limiter.max_concurrency, 3)
+        reset_limiters()
+
+
+class RetryTests(unittest.TestCase):
+    def test_retry_after_parsing(self):
+        self.assertEqual(parse_retry_after("7"), 7)
+        self.assertIsNone(parse_retry_after("soon"))
+        headers = ResponseHeaders()
+        for line in (b"HTTP/1.1 100 Continue\r\n", b"\r\n", b"HTTP/1.1 429 Too Many Requests\r\n", b"Retry-After: 3\r\n"):
+            headers(line)
+        error = headers.error(b'{"error": "slow down"}')
+        self.assertEqual((error.status, error.retry_after), (429, 3))
+
+    def test_retryable_errors(self):
+        self.assertTrue(is_retryable(HTTPStatusError(503, "")))
+        self.assertFalse(is_retryable(HTTPStatusError(400, "")))
+        self.assertTrue(is_retryable(pycurl.error(pycurl.E_OPERATION_TIMEDOUT, "timeout")))
+        self.assertFalse(is_retryable(pycurl.error(pycurl.E_COULDNT_CONNECT, "refused")))
+
+    def test_backoff_is_jittered_and_capped(self):
+        policy = RetryPolicy(max_retries=3, base_seconds=1, max_seconds=4)
+        self.assertTrue(policy.should_retry(HTTPStatusError(429, ""), 2))
+        self.assertFalse(policy.should_retry(HTTPStatusError(429, ""), 3))
+        for _ in range(20):
+            self.assertLessEqual(policy.delay(HTTPStatusError(500, ""), 5), 4)
+        self.assertGreaterEqual(policy.delay(HTTPStatusError(429, "", retry_after=2), 0), 2)
+
+
+class ThrottlingHandler(BaseHTTPRequestHandler):
+    """Rejects the first `failures` requests with 429, then answers like Ollama."""
+
+    protocol_version = "HTTP/1.1"
+    failures = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        if ThrottlingHandler.failures > 0:
+            ThrottlingHandler.failures -= 1
+            status, body, extra = 429, b'{"error": "rate limited"}', {"Retry-After": "0"}
+        else:
+            status, body, extra = 200, json.dumps({"message": {"content": "hello"}}).encode("utf-8"), {}
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in extra.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RetryingClientTests(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), ThrottlingHandler)
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.env_patcher = patch.dict(os.environ, {
+            "OLLAMA_API_BASE_URL": f"http://127.0.0.1:{self.server.server_port}",
+            "LLM_MAX_RETRIES": "2",
+            "LLM_RETRY_BASE_SECONDS": "0.01",
+        })
+        self.env_patcher.start()
+        self.stdout_patcher = patch("builtins.print")
+        self.stdout_patcher.start()
+        reset_limiters()
+
+    def tearDown(self):
+        reset_limiters()
+        self.stdout_patcher.stop()
+        self.env_patcher.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_chat_retries_throttled_requests(self):
+        ThrottlingHandler.failures = 2
+        llm = Ollama("fake-model")
+        self.assertEqual(llm.send_message("hi"), "hello")
+        self.assertEqual(llm.rate_limiter.in_flight, 0)
+        # Halved to the minimum by the throttling, then grown by the success
+        self.assertEqual(llm.rate_limiter.concurrency_limit, 2)
+
+    def test_chat_gives_up_after_max_retries(self):
+        ThrottlingHandler.failures = 3
+        with self.assertRaises(HTTPStatusError) as raised:
+            Ollama("fake-model").send_message("hi")
+        self.assertEqual(raised.exception.status, 429)
+
+    def test_multi_client_retries_without_blocking(self):
+        ThrottlingHandler.failures = 1
+        llm = Ollama("fake-model")
+        results = []
+        client = MultiClient()
+        client.submit(llm, llm.prepare_message("hi"), lambda resp, error: results.append((resp, error)))
+        deadline = time.time() + 5
+        while client.pending() and time.time() < deadline:
+            client.poll()
+        self.assertEqual(results, [({"message": {"content": "hello"}}, None)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from studio.editor_agent import EditorAgent
+from studio.sections import section_digest, split_sections
+from tests.test_studio import ScriptedLLM
+
+
+DRAFT = """# Rubber Ducks
+Talk to the duck.
+
+## Why it works
+Explaining forces you to slow down.
+
+### A note
+It is a small one.
+
+## Try it
+Talk to the duck today."""
+
+
+def section_feedback_reply(sections: list[dict], average_score: float = 4.0, flawless: bool = False) -> str:
+    score = {"flawless": flawless, "average_score": average_score, "sections": sections}
+    return f"""START OF FEEDBACK JSON
+{json.dumps(score)}
+START OF OVERALL SCORE
+Proofreading: {average_score}
+START OF SUGGESTED FEEDBACK
+- Tighten the changed parts."""
+
+
+class RecordingLLM(ScriptedLLM):
+    def __init__(self, replies: list[str]):
+        super().__init__(replies)
+        self.prompts = []
+
+    def prepare_message(self, prompt, conversation=None) -> dict:
+        self.prompts.append(prompt)
+        return super().prepare_message(prompt, conversation)
+
+
+class SplitSectionsTests(unittest.TestCase):
+    def test_splits_at_second_level_headings(self):
+        sections = split_sections(DRAFT)
+        self.assertEqual([section.id for section in sections], ["S1", "S2", "S3"])
+        self.assertEqual([section.heading for section in sections], ["Rubber Ducks", "Why it works", "Try it"])
+        self.assertIn("### A note", sections[1].text)
+
+    def test_untitled_opening_is_kept(self):
+        sections = split_sections("Some intro.\n## Body\nText.")
+        self.assertEqual([section.heading for section in sections], ["(opening)", "Body"])
+
+    def test_digest_ignores_trailing_whitespace(self):
+        self.assertEqual(section_digest("## Try it  \nText.\n"), section_digest("## Try it\nText."))
+        self.assertNotEqual(section_digest("## Try it\nText."), section_digest("## Try it\nText!"))
+
+
+class IncrementalReviewTests(unittest.TestCase):
+    def setUp(self):
+        self.stdout_patcher = patch("builtins.print")
+        self.stdout_patcher.start()
+
+    def tearDown(self):
+        self.stdout_patcher.stop()
+
+    def test_only_changed_sections_are_sent_again(self):
+        llm = RecordingLLM([
+            section_feedback_reply([
+                {"id": "S1", "flawless": True, "average_score": 5.0},
+                {"id": "S2", "flawless": False, "average_score": 3.0, "feedback": "Needs an example."},
+                {"id": "S3", "flawless": True, "average_score": 5.0},
+            ]),
+            section_feedback_reply([{"id": "S2", "flawless": True, "average_score": 5.0}], 5.0, True),
+        ])
+        editor = EditorAgent(llm, review_mode="incremental")
+
+        first = editor.review_content(DRAFT)
+        self.assertFalse(first["score"]["flawless"])
+        self.assertLess(first["score"]["average_score"], 5.0)
+
+        revised = DRAFT.replace("slow down.", "slow down, for example when a test fails.")
+        second = editor.review_content(revised)
+        prompt = llm.prompts[-1]
+        submitted = prompt.split("START OF CONTENT DRAFT")[1]
+        self.assertIn("[S2]\n## Why it works", submitted)
+        self.assertNotIn("## Try it", submitted)
+        self.assertIn("[S3] Try it (flawless)", prompt)
+        self.assertEqual(second["score"], {"flawless": True, "average_score": 5.0})
+        # Partial reviews are sent on their own, so only the first review is in the conversation
+        self.assertEqual(len(editor.conversation.messages), 1)
+
+        # Nothing changed, so the cached scores answer without another prompt
+        third = editor.review_content(revised)
+        self.assertEqual(third["score"], second["score"])
+        self.assertEqual(len(llm.prompts), 2)
+
+        resumed = EditorAgent(RecordingLLM([]), review_mode="incremental")
+        resumed.restore_section_reviews(json.loads(json.dumps(editor.saved_section_reviews())))
+        self.assertEqual(resumed.review_content(revised)["score"], second["score"])
+
+    def test_unchanged_sections_keep_their_feedback(self):
+        llm = ScriptedLLM([
+            section_feedback_reply([
+                {"id": "S2", "flawless": False, "average_score": 3.0, "feedback": "Needs an example."},
+            ], 3.0),
+            section_feedback_reply([], 4.5),
+        ])
+        editor = EditorAgent(llm, review_mode="incremental")
+        editor.review_content(DRAFT)
+        result = editor.review_content(DRAFT.replace("Talk to the duck today.", "Talk to a duck today."))
+        self.assertIn("- Why it works: Needs an example.", result["suggested_feedback"])
+        self.assertFalse(result["score"]["flawless"])
+
+    def test_rejects_unknown_modes(self):
+        with self.assertRaises(ValueError):
+            EditorAgent(ScriptedLLM([]), review_mode="sometimes")
+
+
+if __name__ == "__main__":
+    unittest.main()
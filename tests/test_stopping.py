@@ -0,0 +1,57 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from studio.stopping import AcceptAfter, AnyPolicy, GainCap, Plateau, RevisionState, StoppingPolicy, stopping_policy_from_env
+
+
+def state(scores: list[float], has_candidate: bool = True) -> RevisionState:
+    return RevisionState(scores, revision_round=len(scores), quality_threshold=4.5, has_candidate=has_candidate)
+
+
+class StoppingPolicyTests(unittest.TestCase):
+    def test_default_policy_never_stops(self):
+        self.assertFalse(StoppingPolicy().decide(state([4.6, 4.6, 4.6])).stop)
+
+    def test_gains_count_only_improvements_over_the_best(self):
+        for gain, expected in zip(state([4.0, 4.5, 4.2, 4.7]).gains(), [0.5, 0.0, 0.2]):
+            self.assertAlmostEqual(gain, expected)
+
+    def test_plateau_stops_after_small_gains(self):
+        policy = Plateau(patience=2, min_delta=0.1)
+        self.assertFalse(policy.decide(state([4.5, 4.55])).stop)
+        decision = policy.decide(state([4.5, 4.55, 4.4]))
+        self.assertTrue(decision.stop)
+        self.assertIn("plateaued", decision.reason)
+
+    def test_plateau_keeps_going_without_an_acceptable_draft(self):
+        self.assertFalse(Plateau(patience=1).decide(state([3.0, 3.0], has_candidate=False)).stop)
+
+    def test_gain_cap_uses_recent_mean_gain(self):
+        policy = GainCap(min_gain=0.1, window=2)
+        self.assertFalse(policy.decide(state([4.0, 4.5, 4.55])).stop)
+        self.assertTrue(policy.decide(state([4.0, 4.5, 4.55, 4.6])).stop)
+
+    def test_accept_after_waits_for_k_rounds(self):
+        policy = AcceptAfter(2)
+        self.assertFalse(policy.decide(RevisionState([4.6, 4.6], 2, 4.5, True)).stop)
+        self.assertTrue(policy.decide(RevisionState([4.6, 4.6, 4.6], 3, 4.5, True)).stop)
+
+    def test_any_policy_reports_the_stopping_reason(self):
+        decision = AnyPolicy(Plateau(patience=3), AcceptAfter(0)).decide(state([4.6]))
+        self.assertTrue(decision.stop)
+        self.assertIn("accepted", decision.reason)
+
+    def test_policy_from_env(self):
+        with patch.dict(os.environ, {"REVISION_STOPPING_POLICY": "plateau:3:0.05,accept-after:1"}):
+            policy = stopping_policy_from_env()
+        self.assertIsInstance(policy.policies[0], Plateau)
+        self.assertEqual(policy.policies[0].patience, 3)
+        self.assertEqual(policy.policies[1].rounds, 1)
+        with patch.dict(os.environ, {"REVISION_STOPPING_POLICY": "forever"}):
+            with self.assertRaises(ValueError):
+                stopping_policy_from_env()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import json
+import os
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from llm.gemini import Gemini
+from llm.ollama import Ollama
+from llm.openai import OpenAI
+from llm.stream import StreamDecoder
+
+
+class StreamDecoderTests(unittest.TestCase):
+    def test_ndjson_lines_split_across_chunks(self):
+        decoder = StreamDecoder("ndjson")
+        self.assertEqual(decoder.feed(b'{"a": 1}\n{"b"'), [{"a": 1}])
+        self.assertEqual(decoder.feed(b': 2}\n'), [{"b": 2}])
+        self.assertEqual(decoder.close(), [])
+
+    def test_sse_data_lines_and_done_marker(self):
+        decoder = StreamDecoder("sse")
+        events = decoder.feed(b'event: x\ndata: {"a": 1}\n\ndata: [DONE]\n\n')
+        self.assertEqual(events, [{"a": 1}])
+
+    def test_multibyte_characters_split_across_chunks(self):
+        decoder = StreamDecoder("ndjson")
+        data = json.dumps({"text": "สวัสดี"}, ensure_ascii=False).encode("utf-8") + b"\n"
+        self.assertEqual(decoder.feed(data[:12]), [])
+        self.assertEqual(decoder.feed(data[12:]), [{"text": "สวัสดี"}])
+
+    def test_last_line_without_newline_is_flushed_on_close(self):
+        decoder = StreamDecoder("ndjson")
+        decoder.feed(b'{"done": true}')
+        self.assertEqual(decoder.close(), [{"done": True}])
+
+
+class ReadStreamEventTests(unittest.TestCase):
+    def test_ollama_event(self):
+        with patch.dict(os.environ, {"OLLAMA_API_BASE_URL": "http://localhost:11434"}):
+            llm = Ollama("llama2:13b")
+        self.assertEqual(llm.read_stream_event({"message": {"content": "Hi"}, "done": False}), "Hi")
+        self.assertTrue(llm.prepare_stream_message("Hello")["stream"])
+
+    def test_openai_event(self):
+        llm = OpenAI("gpt-4")
+        self.assertEqual(llm.read_stream_event({"choices": [{"delta": {"content": "Hi"}}]}), "Hi")
+        self.assertEqual(llm.read_stream_event({"choices": [{"delta": {}}]}), "")
+        self.assertEqual(llm.read_stream_event({"choices": [], "usage": {}}), "")
+        self.assertTrue(llm.prepare_stream_message("Hello")["stream"])
+
+    def test_gemini_event_and_stream_url(self):
+        llm = Gemini("gemini-pro")
+        self.assertEqual(llm.read_stream_event({"candidates": [{"content": {"parts": [{"text": "Hi"}]}}]}), "Hi")
+        self.assertIn(":streamGenerateContent?alt=sse", llm.stream_url)
+
+
+class StreamingOllamaHandler(BaseHTTPRequestHandler):
+    """Streams a reply as NDJSON chunks, one word at a time."""
+
+    protocol_version = "HTTP/1.0"
+    words = ["START OF ARTICLE\n", "Hello ", "world\n", "START OF METADATA\n", "words: 2"]
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        try:
+            for word in self.words:
+                self.wfile.write((json.dumps({"message": {"content": word}, "done": False}) + "\n").encode("utf-8"))
+                self.wfile.flush()
+            self.wfile.write(b'{"message": {"content": ""}, "done": true}\n')
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ChatStreamTests(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StreamingOllamaHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.env_patcher = patch.dict(os.environ, {"OLLAMA_API_BASE_URL": f"http://127.0.0.1:{self.server.server_port}"})
+        self.env_patcher.start()
+        self.print_patcher = patch("builtins.print")
+        self.print_patcher.start()
+
+    def tearDown(self):
+        self.print_patcher.stop()
+        self.env_patcher.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_send_message_stream_yields_every_chunk(self):
+        llm = Ollama("llama2:13b")
+        self.assertEqual("".join(llm.send_message_stream("Hello")), "".join(StreamingOllamaHandler.words))
+
+    def test_closing_stream_early_does_not_raise(self):
+        llm = Ollama("llama2:13b")
+        chunks = llm.send_message_stream("Hello")
+        self.assertEqual(next(chunks), "START OF ARTICLE\n")
+        chunks.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,320 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from llm.cache import ResponseCache
+from llm.llm import LLM
+from llm.ollama import Ollama
+from studio.checkpoint import CheckpointStore
+from studio.editor_agent import EditorAgent
+from studio.marketer_agent import MarketerAgent
+from studio.studio import Studio
+from studio.writer_agent import WriterAgent
+
+
+ARTICLE_REPLY = """START OF ARTICLE
+# Rubber Ducks
+Talk to the duck.
+START OF METADATA
+words: 5"""
+
+METADATA_REPLY = '{"title": "Rubber Ducks", "tags": ["duck"]}'
+
+
+def feedback_reply(average_score: float, flawless: bool = False) -> str:
+    return f"""START OF FEEDBACK JSON
+{{"flawless": {json.dumps(flawless)}, "average_score": {average_score}}}
+START OF OVERALL SCORE
+Proofreading: {average_score}
+START OF SUGGESTED FEEDBACK
+- Add an example."""
+
+
+class ScriptedLLM(LLM):
+    """LLM stand-in that answers from a fixed list of replies."""
+
+    def __init__(self, replies: list[str]):
+        super().__init__(provider_name="scripted", provider_color=str, url="http://localhost", headers={})
+        self.replies = list(replies)
+        self.model_name = "scripted-model"
+        self.streamed_chunks = 0
+
+    def prepare_message(self, prompt, conversation=None) -> dict:
+        self.conversation_for(conversation).messages.append(prompt)
+        return {"prompt": prompt}
+
+    def chat(self, payload) -> dict:
+        return {"text": self.replies.pop(0)}
+
+    def read_response(self, resp: dict) -> str:
+        return resp["text"]
+
+    def send_message_stream(self, prompt, conversation=None):
+        self.prepare_message(prompt, conversation)
+        reply = self.replies.pop(0)
+        for index in range(0, len(reply), 4):
+            self.streamed_chunks += 1
+            yield reply[index:index + 4]
+
+
+def build_studio(writer_replies, editor_replies, marketer_replies, **options) -> Studio:
+    return Studio(
+        writer=WriterAgent(ScriptedLLM(writer_replies)),
+        editor=EditorAgent(ScriptedLLM(editor_replies)),
+        marketer=MarketerAgent(ScriptedLLM(marketer_replies)),
+        **options
+    )
+
+
+class StudioCreateEntryTests(unittest.TestCase):
+    def setUp(self):
+        self.stdout_patcher = patch("builtins.print")
+        self.stdout_patcher.start()
+
+    def tearDown(self):
+        self.stdout_patcher.stop()
+
+    def test_flawless_first_draft_is_published(self):
+        studio = build_studio([ARTICLE_REPLY], [feedback_reply(5.0, True)], [METADATA_REPLY])
+        entry = studio.create_entry("Rubber ducks", "English")
+        self.assertEqual(entry["content"], "# Rubber Ducks\nTalk to the duck.")
+        self.assertEqual(entry["metadata"]["title"], "Rubber Ducks")
+
+    def test_revises_until_flawless(self):
+        studio = build_studio(
+            [ARTICLE_REPLY, ARTICLE_REPLY],
+            [feedback_reply(3.0), feedback_reply(5.0, True)],
+            [METADATA_REPLY],
+        )
+        entry = studio.create_entry("Rubber ducks", "English")
+        self.assertIsNotNone(entry)
+        self.assertEqual(len(studio.writer.conversation.messages), 2)
+
+    def test_patch_revision_edits_the_draft(self):
+        edits = "START OF EDITS\n<<<<<<< SEARCH\nTalk to the duck.\n=======\nTalk to the duck, out loud.\n>>>>>>> REPLACE"
+        with patch.dict(os.environ, {"WRITER_REVISION_MODE": "patch"}):
+            studio = build_studio(
+                [ARTICLE_REPLY, edits],
+                [feedback_reply(3.0), feedback_reply(5.0, True)],
+                [METADATA_REPLY],
+            )
+        entry = studio.create_entry("Rubber ducks", "English")
+        self.assertEqual(entry["content"], "# Rubber Ducks\nTalk to the duck, out loud.")
+        self.assertIn("START OF CONTENT DRAFT", studio.writer.conversation.messages[1])
+
+    def test_patch_revision_without_edits_keeps_the_draft(self):
+        with patch.dict(os.environ, {"WRITER_REVISION_MODE": "patch"}):
+            studio = build_studio(
+                [ARTICLE_REPLY, "START OF EDITS\nNO EDITS"],
+                [feedback_reply(3.0), feedback_reply(5.0, True)],
+                [METADATA_REPLY],
+            )
+        entry = studio.create_entry("Rubber ducks", "English")
+        self.assertEqual(entry["content"], "# Rubber Ducks\nTalk to the duck.")
+        self.assertEqual(len(studio.writer.conversation.messages), 2)
+
+    def test_patch_revision_falls_back_to_rewrite(self):
+        edits = "START OF EDITS\n<<<<<<< SEARCH\nTalk to the goose.\n=======\nTalk to the duck.\n>>>>>>> REPLACE"
+        with patch.dict(os.environ, {"WRITER_REVISION_MODE": "patch"}):
+            studio = build_studio(
+                [ARTICLE_REPLY, edits, ARTICLE_REPLY],
+                [feedback_reply(3.0), feedback_reply(5.0, True)],
+                [METADATA_REPLY],
+            )
+        entry = studio.create_entry("Rubber ducks", "English")
+        self.assertEqual(entry["content"], "# Rubber Ducks\nTalk to the duck.")
+        self.assertEqual(len(studio.writer.conversation.messages), 3)
+
+    def test_returns_none_when_quality_never_reached(self):
+        with patch.dict(os.environ, {"BLOG_REVIEW_LIMIT": "1"}):
+            studio = build_studio(
+                [ARTICLE_REPLY, ARTICLE_REPLY],
+                [feedback_reply(2.0), feedback_reply(2.5)],
+                [],
+            )
+            self.assertIsNone(studio.create_entry("Rubber ducks", "English"))
+
+    def test_stopping_policy_ends_revisions_early(self):
+        with patch.dict(os.environ, {"REVISION_STOPPING_POLICY": "accept-after:1"}):
+            studio = build_studio(
+                [ARTICLE_REPLY, ARTICLE_REPLY, ARTICLE_REPLY],
+                [feedback_reply(4.6), feedback_reply(4.7), feedback_reply(4.8)],
+                [METADATA_REPLY],
+            )
+        entry = studio.create_entry("Rubber ducks", "English")
+        self.assertIsNotNone(entry)
+        self.assertEqual(len(studio.editor.conversation.messages), 2)
+
+    def test_resume_continues_after_a_failed_review(self):
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoints = CheckpointStore(os.path.join(directory, "checkpoints.db"))
+            studio = build_studio(
+                [ARTICLE_REPLY, ARTICLE_REPLY],
+                [feedback_reply(3.0), "no feedback json"],
+                [],
+                checkpoints=checkpoints,
+            )
+            with self.assertRaises(IndexError):
+                studio.create_entry("Rubber ducks", "English", run_id="run-1")
+            state = checkpoints.load("run-1")
+            self.assertEqual(state["stage"], "review")
+            self.assertEqual(state["scores"], [3.0])
+            self.assertEqual(len(state["histories"]["writer"]), 2)
+
+            resumed = build_studio([], [feedback_reply(5.0, True)], [METADATA_REPLY], checkpoints=checkpoints)
+            entry = resumed.resume("run-1")
+            self.assertEqual(entry["metadata"]["title"], "Rubber Ducks")
+            self.assertEqual(len(resumed.writer.conversation.messages), 2)
+            self.assertEqual(len(resumed.editor.conversation.messages), 2)
+            self.assertEqual(checkpoints.load("run-1")["stage"], "done")
+            self.assertEqual(resumed.resume("run-1"), entry)
+            with self.assertRaises(KeyError):
+                resumed.resume("run-2")
+            checkpoints.close()
+
+    def test_resume_asks_again_after_a_cached_reply_failed_to_parse(self):
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoints = CheckpointStore(os.path.join(directory, "checkpoints.db"))
+            cache = ResponseCache(os.path.join(directory, "cache.sqlite3"))
+            studio = build_studio([ARTICLE_REPLY], ["no feedback json"], [], checkpoints=checkpoints)
+            studio.editor.llm.with_cache(cache)
+            with self.assertRaises(IndexError):
+                studio.create_entry("Rubber ducks", "English", run_id="run-1")
+
+            resumed = build_studio([], [feedback_reply(5.0, True)], [METADATA_REPLY], checkpoints=checkpoints)
+            resumed.editor.llm.with_cache(cache)
+            entry = resumed.resume("run-1")
+            self.assertEqual(entry["content"], "# Rubber Ducks\nTalk to the duck.")
+            self.assertEqual(resumed.editor.llm.replies, [])
+            self.assertEqual(cache.stats()["hits"], 0)
+            cache.close()
+            checkpoints.close()
+
+    def test_streaming_writer_stops_reading_after_metadata(self):
+        reply = ARTICLE_REPLY + "\n- **Primary Keyword:** rubber duck\nSTART OF NOTES\n" + "More text. " * 50
+        writer_llm = ScriptedLLM([reply])
+        writer_llm.streaming = True
+        writer = WriterAgent(writer_llm)
+        self.assertEqual(writer.write_content("Rubber ducks", "English"), "# Rubber Ducks\nTalk to the duck.")
+        self.assertEqual(writer.primary_keyword, "rubber duck")
+        self.assertLess(writer_llm.streamed_chunks * 4, len(reply) - 500)
+
+    def test_clone_shares_clients_but_not_conversations(self):
+        studio = build_studio([ARTICLE_REPLY], [feedback_reply(5.0, True)], [METADATA_REPLY])
+        cloned = studio.clone()
+        cloned.writer.conversation.messages.append("prompt")
+        self.assertEqual(studio.writer.conversation.messages, [])
+        self.assertIs(cloned.writer.llm, studio.writer.llm)
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    """Answers Ollama chat requests by role, after a short delay, tracking concurrent requests."""
+
+    protocol_version = "HTTP/1.1"
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.lock:
+            FakeOllamaHandler.in_flight += 1
+            FakeOllamaHandler.max_in_flight = max(FakeOllamaHandler.max_in_flight, FakeOllamaHandler.in_flight)
+        role = payload["messages"][0]["content"]
+        time.sleep(0.5 if role == "slow-writer" else 0.05)
+        replies = {
+            "writer": ARTICLE_REPLY,
+            "slow-writer": ARTICLE_REPLY,
+            "editor": feedback_reply(5.0, True),
+            "strict-editor": feedback_reply(4.0),
+            "marketer": METADATA_REPLY,
+        }
+        body = json.dumps({"message": {"content": replies[role]}}).encode("utf-8")
+        with self.lock:
+            FakeOllamaHandler.in_flight -= 1
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled the request
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StudioCreateEntriesTests(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllamaHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.env_patcher = patch.dict(os.environ, {"OLLAMA_API_BASE_URL": f"http://127.0.0.1:{self.server.server_port}"})
+        self.env_patcher.start()
+        self.stdout_patcher = patch("builtins.print")
+        self.stdout_patcher.start()
+        FakeOllamaHandler.max_in_flight = 0
+
+    def tearDown(self):
+        self.stdout_patcher.stop()
+        self.env_patcher.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def agent_llm(self, role: str) -> Ollama:
+        llm = Ollama("fake-model")
+        llm.with_instruction(role)
+        return llm
+
+    def build_studio(self, editor_role: str = "editor", **options) -> Studio:
+        return Studio(
+            writer=WriterAgent(self.agent_llm("writer")),
+            editor=EditorAgent(self.agent_llm(editor_role)),
+            marketer=MarketerAgent(self.agent_llm("marketer")),
+            **options
+        )
+
+    def test_creates_an_entry_per_topic_concurrently(self):
+        topics = ["Ducks", "Geese", "Swans", "Herons"]
+        entries = self.build_studio().create_entries(topics, "English", concurrency=4)
+        self.assertEqual(len(entries), len(topics))
+        for entry in entries:
+            self.assertEqual(entry["metadata"]["title"], "Rubber Ducks")
+        self.assertGreater(FakeOllamaHandler.max_in_flight, 1)
+
+    def test_concurrency_limits_requests_in_flight(self):
+        entries = self.build_studio().create_entries(["Ducks", "Geese", "Swans"], "English", concurrency=1)
+        self.assertEqual(len(entries), 3)
+        self.assertEqual(FakeOllamaHandler.max_in_flight, 1)
+
+    def test_failed_topic_yields_none(self):
+        with patch.dict(os.environ, {"OLLAMA_API_BASE_URL": "http://127.0.0.1:1"}):
+            studio = self.build_studio()
+        self.assertEqual(studio.create_entries(["Ducks"], "English"), [None])
+
+    def test_flawless_candidate_cancels_the_others(self):
+        studio = self.build_studio(
+            candidates=2,
+            candidate_writers=[WriterAgent(self.agent_llm("writer")), WriterAgent(self.agent_llm("slow-writer"))],
+        )
+        start_time = time.time()
+        entry = studio.create_entry("Ducks", "English")
+        self.assertEqual(entry["metadata"]["title"], "Rubber Ducks")
+        self.assertLess(time.time() - start_time, 0.4)
+
+    def test_best_candidate_goes_into_revision(self):
+        with patch.dict(os.environ, {"BLOG_REVIEW_LIMIT": "1", "MINIMUM_QUALITY_SCORE": "3.5"}):
+            studio = self.build_studio(editor_role="strict-editor", candidates=3)
+            entry = studio.create_entry("Ducks", "English")
+        self.assertEqual(entry["content"], "# Rubber Ducks\nTalk to the duck.")
+        self.assertEqual(studio.writer.conversation.messages, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+from benchmark.bench import point_at
+from benchmark.mock_server import MockLLMServer
+from llm.factory import create_model
+from llm.metrics import get_registry
+from llm.warmup import PINNED_KEEP_ALIVE, preload_models, release_models
+
+
+class OllamaWarmupTests(unittest.TestCase):
+    def setUp(self):
+        self.server = MockLLMServer(load_seconds=0.3).start()
+        self.env_patcher = patch.dict(os.environ, {"LLM_MAX_RETRIES": "0", "LLM_CACHE_PATH": "", "OLLAMA_KEEP_ALIVE": "30m"})
+        self.env_patcher.start()
+        point_at(self.server)
+        self.stdout_patcher = patch("builtins.print")
+        self.stdout_patcher.start()
+
+    def tearDown(self):
+        release_models()
+        self.stdout_patcher.stop()
+        self.env_patcher.stop()
+        self.server.stop()
+
+    def test_preloads_distinct_models_concurrently_and_pins_them(self):
+        llms = [create_model("ollama://warm-a"), create_model("ollama://warm-a"), create_model("ollama://warm-b"), create_model("openai://gpt-mock")]
+        start_time = time.monotonic()
+        load_seconds = preload_models(llms)
+        self.assertLess(time.monotonic() - start_time, 0.55)
+        self.assertEqual(sorted(load_seconds), ["warm-a", "warm-b"])
+        self.assertEqual(self.server.loaded_models, {"warm-a": PINNED_KEEP_ALIVE, "warm-b": PINNED_KEEP_ALIVE})
+        # Later requests keep the pin instead of resetting the unload timer
+        self.assertEqual(llms[1].prepare_message("Hello")["keep_alive"], PINNED_KEEP_ALIVE)
+
+        release_models()
+        self.assertEqual(self.server.loaded_models, {"warm-a": "30m", "warm-b": "30m"})
+        self.assertEqual(llms[0].keep_alive, "30m")
+
+    def test_reports_load_time_apart_from_generation(self):
+        llm = create_model("ollama://cold-model")
+        llm.with_role("writer")
+        llm.send_message("Write a blog entry about ducks")
+        load_histogram = get_registry().histograms[("blogger_llm_load_seconds", ("ollama", "cold-model", "writer"))]
+        request_histogram = get_registry().histograms[("blogger_llm_request_seconds", ("ollama", "cold-model", "writer"))]
+        self.assertAlmostEqual(load_histogram.sum, 0.3, places=2)
+        self.assertGreaterEqual(request_histogram.sum, load_histogram.sum)
+
+    def test_keep_alive_is_sent_without_prompt_caching(self):
+        with patch.dict(os.environ, {"PROMPT_CACHE": "false"}):
+            self.assertEqual(create_model("ollama://warm-a").prepare_message("Hello")["keep_alive"], "30m")
+
+
+if __name__ == "__main__":
+    unittest.main()